@@ -0,0 +1,92 @@
+"""
+Shared timing and reporting helpers for the benchmark scripts
+"""
+
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed=None):
+    """Throughput and latency percentiles (in ms) for a list of call latencies (in s)"""
+    elapsed = elapsed if elapsed is not None else sum(latencies)
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0
+    }
+
+
+def measure(func, argument_list):
+    """Call func once per argument tuple and summarize the latencies"""
+    latencies = []
+    start = time.perf_counter()
+    for args in argument_list:
+        call_start = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def code_version():
+    """Current git commit, so results can be compared across versions"""
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def write_results(path, suite, results, dataset=None):
+    """Write a benchmark run to a JSON file"""
+    document = {
+        "suite": suite,
+        "version": code_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "dataset": dataset or {},
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, default=str)
+    return document
+
+
+def print_results(results):
+    """Print a results table"""
+    print(f"\n{'Benchmark':<34} {'Calls':>7} {'ops/s':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}")
+    print("-" * 82)
+    for name, stats in results.items():
+        print(f"{name:<34} {stats['calls']:>7} {stats['ops_per_sec']:>10.1f} "
+              f"{stats['p50_ms']:>9.3f} {stats['p90_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+
+def compare_results(baseline_path, results):
+    """Print p50 and throughput changes against an earlier results file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline.get('version', '?')} ({baseline.get('timestamp', '?')}):")
+    for name, stats in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("p50_ms") or not old.get("ops_per_sec"):
+            continue
+        p50_change = (stats["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+        ops_change = (stats["ops_per_sec"] - old["ops_per_sec"]) / old["ops_per_sec"] * 100
+        print(f"  {name:<34} p50 {p50_change:+7.1f}%   ops/s {ops_change:+7.1f}%")
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Size and speed of invoice bill storage: text, zlib-compressed, or re-rendered
+
+Renders --invoices deterministic bills in chunks (bounded memory), loads them
+into scratch copies of the invoices table for each storage mode and reports
+the table size (heap, TOAST and index) and load time. Reads are timed as a
+stored text fetch, a fetch plus decompress, and a re-render from
+invoice_items through Database.get_invoice_bill on the synthetic dataset
+(generated without --with-bills, so it stores no bill text), with and
+without the render cache.
+
+    python benchmarks/bill_storage_benchmark.py --database shopping_cart_bench --invoices 1000000
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+from utils import BillStorage, PriceFormatter, RenderCache
+from bench_utils import measure, summarize, write_results, print_results
+from synthetic_data import FIRST_NAMES, LAST_NAMES, copy_rows, mobile_for, product_catalog
+
+MODES = {
+    "text": "bill_content TEXT",
+    "zlib": "bill_compressed BYTEA",
+    "none": None
+}
+
+
+def synthetic_bills(count, seed, chunk_size, customers):
+    """Yield chunks of (id, subtotal, discount, final, created_at, bill) like the checkout renders them
+
+    Bills with a customer name one of the synthetic customers numbered below customers.
+    """
+    rng = random.Random(seed)
+    catalog = product_catalog(seed)
+    start_date = datetime(2024, 1, 1)
+    chunk = []
+    for invoice_id in range(1, count + 1):
+        cart = []
+        for _ in range(rng.randint(1, 7)):
+            name, price = rng.choice(catalog)
+            quantity = rng.randint(1, 5)
+            cart.append({"name": name, "quantity": quantity, "price": price, "total": round(quantity * price, 2)})
+
+        subtotal = round(sum(item["total"] for item in cart), 2)
+        customer_name = customer_mobile = tier = None
+        discount = 0
+        if customers and rng.random() < 0.8:
+            customer_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            customer_mobile = mobile_for(rng.randrange(customers))
+            tier, rate = rng.choice((("Gold", 0.15), ("Silver", 0.10), ("Bronze", 0.05)))
+            discount = round(subtotal * rate, 2)
+        final = round(subtotal - discount, 2)
+        created_at = start_date + timedelta(seconds=rng.randint(0, 365 * 86400 - 1))
+
+        bill = PriceFormatter.format_bill(cart, subtotal, discount, final, customer_name, customer_mobile, tier)
+        chunk.append((invoice_id, subtotal, discount, final, created_at, bill))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def create_tables(db):
+    """Scratch tables shaped like invoices, one per storage mode"""
+    for mode, bill_column in MODES.items():
+        db.cursor.execute(f"DROP TABLE IF EXISTS bench_bills_{mode}")
+        columns = "id INTEGER PRIMARY KEY, total_amount NUMERIC(10,2), discount_amount NUMERIC(10,2), " \
+                  "final_amount NUMERIC(10,2), created_at TIMESTAMP"
+        if bill_column:
+            columns += f", {bill_column}"
+        db.cursor.execute(f"CREATE TABLE bench_bills_{mode} ({columns})")
+    db.conn.commit()
+
+
+def load(db, count, seed, chunk_size, customers):
+    """Render, compress and COPY the bills; return CPU and load timings"""
+    timings = {"render": 0.0, "compress": 0.0, "load text": 0.0, "load zlib": 0.0, "load none": 0.0}
+    text_bytes = zlib_bytes = 0
+    cursor = db.conn.cursor()
+    columns = ("id", "total_amount", "discount_amount", "final_amount", "created_at")
+
+    render_start = time.perf_counter()
+    for chunk in synthetic_bills(count, seed, chunk_size, customers):
+        timings["render"] += time.perf_counter() - render_start
+
+        start = time.perf_counter()
+        compressed = [BillStorage.compress(row[-1]) for row in chunk]
+        timings["compress"] += time.perf_counter() - start
+        text_bytes += sum(len(row[-1].encode("utf-8")) for row in chunk)
+        zlib_bytes += sum(len(data) for data in compressed)
+
+        for mode, rows, extra in (
+            ("text", [row for row in chunk], ("bill_content",)),
+            ("zlib", [row[:-1] + ("\\x" + data.hex(),) for row, data in zip(chunk, compressed)], ("bill_compressed",)),
+            ("none", [row[:-1] for row in chunk], ()),
+        ):
+            start = time.perf_counter()
+            copy_rows(cursor, f"bench_bills_{mode}", columns + extra, rows)
+            db.conn.commit()
+            timings[f"load {mode}"] += time.perf_counter() - start
+
+        render_start = time.perf_counter()
+
+    return timings, text_bytes, zlib_bytes
+
+
+def table_sizes(db):
+    """Total size (heap, TOAST and index) of each scratch table in bytes"""
+    sizes = {}
+    for mode in MODES:
+        db.cursor.execute("SELECT pg_total_relation_size(%s)", (f"bench_bills_{mode}",))
+        sizes[mode] = db.cursor.fetchone()[0]
+    db.conn.commit()
+    return sizes
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Compare bill storage modes by size and speed")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--invoices", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables")
+    parser.add_argument("--output", default="bench_bills.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config, bill_storage="none")
+    db.setup_database()
+
+    # Synthetic customers are numbered from id 1, so bills can name any of them
+    db.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM customers")
+    customers = db.cursor.fetchone()[0]
+    db.conn.commit()
+
+    print(f"Rendering and loading {args.invoices} bills...")
+    create_tables(db)
+    timings, text_bytes, zlib_bytes = load(db, args.invoices, args.seed, args.chunk_size, customers)
+    sizes = table_sizes(db)
+
+    rng = random.Random(args.seed)
+    ids = [(rng.randint(1, args.invoices),) for _ in range(args.lookups)]
+    results = {}
+
+    def fetch_text(invoice_id):
+        db.cursor.execute("SELECT bill_content FROM bench_bills_text WHERE id = %s", (invoice_id,))
+        return db.cursor.fetchone()[0]
+
+    def fetch_zlib(invoice_id):
+        db.cursor.execute("SELECT bill_compressed FROM bench_bills_zlib WHERE id = %s", (invoice_id,))
+        return BillStorage.decompress(db.cursor.fetchone()[0])
+
+    results["fetch text"] = measure(fetch_text, ids)
+    results["fetch zlib + decompress"] = measure(fetch_zlib, ids)
+    db.conn.commit()
+
+    # Re-render from invoice_items on the synthetic dataset
+    db.cursor.execute("SELECT id FROM invoices WHERE bill_content IS NULL AND bill_compressed IS NULL LIMIT %s",
+                      (args.lookups,))
+    invoice_ids = [(row[0],) for row in db.cursor.fetchall()]
+    db.conn.commit()
+    if invoice_ids:
+        db.bill_cache = RenderCache(0)
+        results["re-render (no cache)"] = measure(db.get_invoice_bill, invoice_ids)
+        db.bill_cache = RenderCache(256)
+        repeated = [invoice_ids[index % min(100, len(invoice_ids))] for index in range(len(invoice_ids))]
+        results["re-render (repeat views, cache)"] = measure(db.get_invoice_bill, repeated)
+    else:
+        print("No invoices without stored bills: generate the dataset with synthetic_data.py to time re-rendering")
+
+    per_bill_us = {name: round(seconds / args.invoices * 1e6, 2) for name, seconds in timings.items()}
+    sample =[BillStorage.compress(row[-1]) for row in next(synthetic_bills(min(args.invoices, 20000), args.seed, 20000, customers))]
+    decompress_start = time.perf_counter()
+    for data in sample:
+        BillStorage.decompress(data)
+    per_bill_us["decompress"] = round((time.perf_counter() - decompress_start) / len(sample) * 1e6, 2)
+
+    print(f"\n{'Mode':<8} {'Table size':>12} {'Bill bytes':>14} {'Load s':>9}")
+    print("-" * 46)
+    bill_bytes = {"text": text_bytes, "zlib": zlib_bytes, "none": 0}
+    for mode in MODES:
+        print(f"{mode:<8} {sizes[mode] / 1e6:>10.1f}MB {bill_bytes[mode] / 1e6:>12.1f}MB {timings[f'load {mode}']:>9.1f}")
+    print(f"\nzlib ratio {text_bytes / max(zlib_bytes, 1):.2f}x; per bill: " +
+          ", ".join(f"{name} {value} us" for name, value in per_bill_us.items() if not name.startswith("load")))
+    print_results(results)
+
+    if not args.keep:
+        for mode in MODES:
+            db.cursor.execute(f"DROP TABLE bench_bills_{mode}")
+        db.conn.commit()
+
+    write_results(args.output, "bill_storage", {
+        "lookups": results,
+        "table_bytes": sizes,
+        "bill_bytes": bill_bytes,
+        "per_bill_us": per_bill_us
+    }, {"invoices": args.invoices})
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
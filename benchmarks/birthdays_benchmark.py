@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Birthday lookups on text dates of birth against the DATE column and its index
+
+On a database whose customers.dob is still DD/MM/YYYY text (generated by
+a version before the DATE column, or turned back into text with
+--as-text), times finding the customers with a birthday in a day, a week
+and a week across New Year the only way text allows: reading every date
+of birth and parsing it in Python. It then converts the column batch by
+batch as `python birthdays.py migrate` does, timing each batch and the
+final swap, and times get_birthdays() over the same ranges, checking it
+finds the same customers, for the whole list and for its first --page
+customers. On a database already converted only the lookups are timed.
+
+    python benchmarks/synthetic_data.py --database birthdays_bench --customers 5000000 --invoices 0
+    python benchmarks/birthdays_benchmark.py --database birthdays_bench --as-text
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import DOB_BATCH_SIZE, DOB_FORMAT, Database
+from bench_utils import measure, summarize, write_results, print_results
+
+RANGES = {
+    "one day": ("2025-03-14", "2025-03-14"),
+    "one week": ("2025-06-02", "2025-06-08"),
+    "week across New Year": ("2025-12-29", "2026-01-04")
+}
+
+
+def birthdays_in(start, end):
+    """Every (month, day) birthday celebrated from start to end, 29 February on the 28th in other years"""
+    days = set()
+    day = date.fromisoformat(start)
+    while day <= date.fromisoformat(end):
+        days.add((day.month, day.day))
+        if (day.month, day.day) == (2, 28) and (day + timedelta(days=1)).month == 3:
+            days.add((2, 29))
+        day += timedelta(days=1)
+    return days
+
+
+def legacy_birthdays(db, start, end):
+    """Ids of the customers with a birthday from start to end, parsing every text date of birth"""
+    days = birthdays_in(start, end)
+    db.cursor.execute("SELECT id, dob FROM customers WHERE dob IS NOT NULL AND dob <> ''")
+    found = set()
+    for customer_id, dob in db.cursor.fetchall():
+        try:
+            dob = datetime.strptime(dob.strip(), DOB_FORMAT)
+        except ValueError:
+            continue
+        if (dob.month, dob.day) in days:
+            found.add(customer_id)
+    db.conn.commit()
+    return found
+
+
+def as_text(db):
+    """Turn customers.dob back into DD/MM/YYYY text, as it was before the DATE column"""
+    db.cursor.execute("DROP INDEX IF EXISTS idx_customers_birthday")
+    db.cursor.execute("ALTER TABLE customers ALTER COLUMN dob TYPE TEXT USING to_char(dob, 'DD/MM/YYYY')")
+    db.conn.commit()
+
+
+def analyze(db):
+    db.conn.commit()
+    db.conn.autocommit = True
+    db.cursor.execute("VACUUM ANALYZE customers")
+    db.conn.autocommit = False
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark birthday lookups on text against DATE dates of birth")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--as-text", action="store_true", help="First turn customers.dob back into text")
+    parser.add_argument("--batch-size", type=int, default=DOB_BATCH_SIZE, help="Customers parsed per transaction")
+    parser.add_argument("--legacy-repeat", type=int, default=3, help="Runs per range parsing every text date")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per range of get_birthdays()")
+    parser.add_argument("--page", type=int, default=100, help="Customers per page of a promotion list")
+    parser.add_argument("--output", default="bench_birthdays.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    results = {}
+    db.cursor.execute("SELECT COUNT(*) FROM customers")
+    dataset = {"database": db_config.get("database"), "customers": db.cursor.fetchone()[0]}
+    db.conn.commit()
+
+    if args.as_text and not db.customer_dobs_pending():
+        start = time.perf_counter()
+        as_text(db)
+        print(f"Turned customers.dob back into text in {time.perf_counter() - start:.1f}s")
+
+    before = {}
+    if db.customer_dobs_pending():
+        analyze(db)
+        for name, (start, end) in RANGES.items():
+            before[name] = legacy_birthdays(db, start, end)  # Warm the cache
+            results[f"text, parsed in Python: {name}"] = measure(legacy_birthdays,
+                                                                 [(db, start, end)] * args.legacy_repeat)
+
+        start = time.perf_counter()
+        db.setup_database(backfill=False)
+        dataset["schema_seconds"] = round(time.perf_counter() - start, 2)
+        batch_seconds = []
+        after = 0
+        parsed = 0
+        while True:
+            batch_start = time.perf_counter()
+            batch = db.parse_customer_dobs(after, args.batch_size)
+            if batch is None:
+                raise SystemExit(f"Parsing the dates of birth of customers after id {after} failed")
+            if batch[0] is None:
+                break
+            batch_seconds.append(time.perf_counter() - batch_start)
+            after, parsed = batch[0], parsed + batch[1]
+        convert_start = time.perf_counter()
+        if db.convert_customer_dobs() is None:
+            raise SystemExit("Could not make customers.dob a DATE")
+        dataset["convert_seconds"] = round(time.perf_counter() - convert_start, 1)
+        migrate_seconds = time.perf_counter() - start
+        results["migration, per batch"] = summarize(batch_seconds)
+        dataset.update(parsed=parsed, batch_size=args.batch_size, migrate_seconds=round(migrate_seconds, 1))
+        print(f"Converted {parsed:,} dates of birth in {migrate_seconds:.1f}s "
+              f"(swap and index {dataset['convert_seconds']}s)")
+    else:
+        print("customers.dob is already a DATE; timing get_birthdays() only")
+
+    analyze(db)
+    dataset["birthdays"] = {}
+    for name, (start, end) in RANGES.items():
+        found = db.get_birthdays(start, end)  # Warm the cache
+        dataset["birthdays"][name] = len(found)
+        if name in before and {customer["id"] for customer in found} != before[name]:
+            raise SystemExit(f"{name}: get_birthdays() found other customers than parsing the text")
+        results[f"DATE, indexed: {name}"] = measure(db.get_birthdays, [(start, end)] * args.repeat)
+        results[f"DATE, indexed: {name}, first {args.page}"] = measure(db.get_birthdays,
+                                                                       [(start, end, args.page)] * args.repeat)
+
+    print_results(results)
+    write_results(args.output, "birthdays", results, dataset)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Lookup throughput of the in-memory product catalog against per-scan SQL
+
+Loads every product into a ProductCatalog, then times barcode and SKU
+lookups (the add-to-cart path), name prefix searches, the same barcode
+lookup as an indexed SQL query, and how long a price change takes to reach
+a catalog kept current by a CacheListener (NOTIFY plus one refresh query).
+
+    python benchmarks/synthetic_data.py --database catalog_bench --customers 0 --invoices 0 --products 1000000
+    python benchmarks/catalog_benchmark.py --database catalog_bench
+"""
+
+import argparse
+import random
+import resource
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import ProductCatalog
+from customer_cache import CacheListener
+from models import Database
+from bench_utils import measure, summarize, write_results, print_results
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory product catalog")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--lookups", type=int, default=1000000, help="Catalog lookups to time")
+    parser.add_argument("--sql-lookups", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=50, help="Price changes to follow through NOTIFY")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="bench_catalog.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    db.setup_database()
+    rng = random.Random(args.seed)
+
+    catalog = ProductCatalog()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    count = catalog.load(db)
+    load_seconds = time.perf_counter() - start
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    if not count:
+        raise SystemExit("No products; generate them with synthetic_data.py --products")
+
+    rows = list(catalog.products.values())
+    barcodes = [rng.choice(rows)[1] for _ in range(args.lookups)]
+    skus = [rng.choice(rows)[0] for _ in range(args.lookups // 10)]
+    prefixes = [name[:rng.randint(3, 8)] for name in (rng.choice(rows)[2] for _ in range(10000))]
+
+    # Throughput of back-to-back lookups, without per-call timer overhead
+    start = time.perf_counter()
+    for code in barcodes:
+        catalog.lookup(code)
+    lookup_seconds = time.perf_counter() - start
+
+    results = {
+        "catalog lookup by barcode": measure(catalog.lookup, [(code,) for code in barcodes[:100000]]),
+        "catalog lookup by SKU": measure(catalog.lookup, [(sku,) for sku in skus]),
+        "catalog lookup, unknown code": measure(catalog.lookup, [(f"999{n:010d}",) for n in range(10000)]),
+        "catalog name prefix search": measure(catalog.search, [(prefix,) for prefix in prefixes]),
+        "sql lookup by barcode": measure(
+            lambda code: (db.cursor.execute(
+                "SELECT sku, barcode, name, price FROM products WHERE barcode = %s AND active", (code,)
+            ), db.cursor.fetchone(), db.conn.commit()),
+            [(code,) for code in barcodes[:args.sql_lookups]]
+        )
+    }
+
+    # A price change saved on another connection, until this catalog shows it
+    listener = CacheListener(None, db_config, poll_interval=0.05, catalog=catalog)
+    listener.start()
+    listener.connected.wait(120)
+    latencies = []
+    for _ in range(args.changes):
+        sku, barcode, name, price = rng.choice(rows)
+        new_price = round(price + 1, 2)
+        start = time.perf_counter()
+        db.save_products([{"sku": sku, "barcode": barcode, "name": name, "price": new_price}])
+        while catalog.lookup(sku)["price"] != new_price:
+            time.sleep(0.0005)
+        latencies.append(time.perf_counter() - start)
+    results["price change visible"] = summarize(latencies)
+    listener.stop()
+    db.close()
+
+    print(f"\n{count} products loaded in {load_seconds:.2f}s (~{rss_mb:.0f} MB)")
+    print_results(results)
+    results["back-to-back lookups"] = {"calls": len(barcodes), "seconds": round(lookup_seconds, 3),
+                                       "lookups_per_sec": round(len(barcodes) / lookup_seconds, 1)}
+    print(f"back-to-back barcode lookups: {results['back-to-back lookups']['lookups_per_sec']:.0f}/s")
+    sql = results["sql lookup by barcode"]["p50_ms"]
+    print(f"catalog lookup p50 is {sql / max(results['catalog lookup by barcode']['p50_ms'], 0.001):.0f}x "
+          f"faster than SQL")
+    write_results(args.output, "catalog", results, {
+        "database": db_config.get("database"), "products": count,
+        "load_seconds": round(load_seconds, 2), "load_rss_mb": round(rss_mb)
+    })
+
+
+if __name__ == "__main__":
+    main()
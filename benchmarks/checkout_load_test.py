@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load test for the local checkout service: N simulated lanes each run full checkouts
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from bench_utils import percentile
+
+
+class Lane:
+    def __init__(self, host, port, latencies):
+        """One simulated till holding a keep-alive connection to the service"""
+        self.host = host
+        self.port = port
+        self.latencies = latencies
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        """Send one request and record its latency"""
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n\r\n"
+
+        start = time.perf_counter()
+        self.writer.write(head.encode("latin-1") + data)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            if key.lower() == "content-length":
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else {}
+        endpoint = f"{method} " + re.sub(r"/\d+", "/{id}", path.split("?")[0])
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {payload.get('error')}")
+        return payload
+
+    async def checkout(self, mobiles):
+        """Run one full checkout like a cashier would"""
+        session_id = (await self.request("POST", "/sessions"))["session_id"]
+        for _ in range(random.randint(1, 6)):
+            await self.request("POST", f"/sessions/{session_id}/items", {
+                "name": random.choice(["Milk", "Bread", "Eggs", "Rice", "Tea", "Soap"]),
+                "quantity": random.randint(1, 3),
+                "price": random.choice([20, 45, 60, 120, 250])
+            })
+        if mobiles:
+            mobile = random.choice(mobiles)
+            await self.request("GET", f"/autocomplete/mobiles?prefix={mobile[:4]}")
+            await self.request("POST", f"/sessions/{session_id}/customer", {"name": "Load Test", "mobile": mobile})
+        await self.request("GET", f"/sessions/{session_id}/bill")
+        await self.request("POST", f"/sessions/{session_id}/checkout", {})
+        await self.request("DELETE", f"/sessions/{session_id}")
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+async def run(host, port, lanes, checkouts, mobiles):
+    latencies = {}
+    errors = []
+
+    async def lane_loop():
+        lane = Lane(host, port, latencies)
+        await lane.connect()
+        try:
+            for _ in range(checkouts):
+                try:
+                    await lane.checkout(mobiles)
+                except RuntimeError as e:
+                    errors.append(str(e))
+        finally:
+            lane.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lane_loop() for _ in range(lanes)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the checkout service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--lanes", type=int, default=8, help="Number of simulated lanes")
+    parser.add_argument("--checkouts", type=int, default=50, help="Checkouts per lane")
+    parser.add_argument("--mobile", action="append", default=[], help="Customer mobile to attach (repeatable)")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(run(args.host, args.port, args.lanes, args.checkouts, args.mobile))
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"Lanes: {args.lanes}  Checkouts: {args.lanes * args.checkouts}  Elapsed: {elapsed:.2f}s")
+    print(f"Requests: {len(all_latencies)}  Errors: {len(errors)}  Throughput: {len(all_latencies) / elapsed:.1f} req/s")
+    print(f"\n{'Endpoint':<34} {'Count':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    print("-" * 62)
+    for endpoint, values in sorted(latencies.items()):
+        print(f"{endpoint:<34} {len(values):>7} {percentile(values, 50) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}")
+    print("-" * 62)
+    print(f"{'all':<34} {len(all_latencies):>7} {percentile(all_latencies, 50) * 1000:>9.2f} {percentile(all_latencies, 99) * 1000:>9.2f}")
+
+    for error in errors[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Load time, memory and query latency of the in-memory sales cube
+
+Loads the whole synthetic dataset into a SalesCube, times an empty
+incremental refresh, then answers a set of ad-hoc questions from the cube
+and, for comparison, the same questions in SQL against the partitioned tables.
+
+    python benchmarks/synthetic_data.py --database cube_bench --customers 100000 --invoices 2000000
+    python benchmarks/cube_benchmark.py --database cube_bench
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+from sales_cube import SalesCube
+from bench_utils import measure, write_results, print_results
+
+# (name, cube query arguments, equivalent SQL)
+QUESTIONS = [
+    ("sales by hour of day", {"by": ("hour",)},
+     "SELECT EXTRACT(HOUR FROM created_at), COUNT(*), SUM(quantity), SUM(total) FROM invoice_items GROUP BY 1"),
+    ("item by week, one quarter", {"by": ("item", "week"), "start": "2024-04-01", "end": "2024-06-30"},
+     "SELECT item_id, date_trunc('week', created_at), COUNT(*), SUM(quantity), SUM(total) FROM invoice_items "
+     "WHERE created_at >= '2024-04-01' AND created_at < '2024-07-01' GROUP BY 1, 2"),
+    ("tier by month", {"by": ("tier", "month")},
+     "SELECT CASE WHEN i.discount_amount = 0 THEN 'None' ELSE round(i.discount_amount / i.total_amount, 2)::text END, "
+     "date_trunc('month', ii.created_at), COUNT(*), SUM(ii.quantity), SUM(ii.total) FROM invoice_items ii "
+     "JOIN invoices i ON i.id = ii.invoice_id AND i.created_at = ii.created_at GROUP BY 1, 2"),
+    ("top 10 items, one month", {"by": ("item",), "start": "2024-03-01", "end": "2024-03-31", "top": 10},
+     "SELECT item_id, COUNT(*), SUM(quantity), SUM(total) FROM invoice_items "
+     "WHERE created_at >= '2024-03-01' AND created_at < '2024-04-01' GROUP BY 1 ORDER BY 4 DESC LIMIT 10"),
+    ("daily totals, one week", {"by": ("day",), "start": "2024-05-06", "end": "2024-05-12"},
+     "SELECT created_at::date, COUNT(*), SUM(quantity), SUM(total) FROM invoice_items "
+     "WHERE created_at >= '2024-05-06' AND created_at < '2024-05-13' GROUP BY 1"),
+]
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory sales cube")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--repeat", type=int, default=20, help="Cube queries per question")
+    parser.add_argument("--sql-repeat", type=int, default=3, help="SQL queries per question")
+    parser.add_argument("--output", default="bench_cube.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    cube = SalesCube(db)
+    start = time.perf_counter()
+    rows = cube.refresh()
+    load_seconds = time.perf_counter() - start
+    memory = sum(values.nbytes for values in cube._columns.values())
+    print(f"Loaded {rows} lines in {load_seconds:.1f}s ({rows / load_seconds:,.0f} lines/s), "
+          f"{memory / 1e6:.0f} MB, {len(cube.item_codes)} items")
+
+    results = {"refresh (nothing new)": measure(cube.refresh, [()] * 5)}
+
+    def run_sql(query):
+        db.cursor.execute(query)
+        db.cursor.fetchall()
+        db.conn.commit()
+
+    for name, arguments, query in QUESTIONS:
+        results[f"cube: {name}"] = measure(lambda: cube.query(**arguments), [()] * args.repeat)
+        results[f"sql:  {name}"] = measure(run_sql, [(query,)] * args.sql_repeat)
+
+    print_results(results)
+    write_results(args.output, "sales_cube", results, {"lines": rows, "load_seconds": load_seconds, "bytes": memory})
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Invoice lines by item name against lines by item id, before and after the backfill
+
+On a database whose invoice lines still carry item names (generated by a
+version before the items table, or left un-backfilled), measures the size
+of invoice_items (heap and indexes) and times the top items query of the
+sales report for one month and the item totals over the whole --from/--to
+range, grouped by name. It then upgrades the schema, backfills the lines
+month by month as `python items.py backfill` does, timing each month, and
+measures the same again with the queries the app now runs (grouped by id,
+names joined afterwards), checking they return the same rows. On a
+database already backfilled only the after measurements are taken.
+
+    python benchmarks/synthetic_data.py --database items_bench --customers 100000 --invoices 10000000 --days 730
+    python benchmarks/items_benchmark.py --database items_bench
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import TOP_ITEMS_SQL, Database
+from bench_utils import measure, summarize, write_results, print_results
+
+# The same questions asked of lines that carry their item's name
+LEGACY_QUERIES = {
+    "top items, one month": """
+        SELECT item_name, SUM(quantity) as total_quantity, SUM(total) as total_sales
+        FROM invoice_items
+        WHERE created_at BETWEEN %s AND %s
+        GROUP BY item_name
+        ORDER BY total_quantity DESC
+        LIMIT 5
+    """,
+    "item totals, whole range": """
+        SELECT item_name, SUM(quantity), SUM(total)
+        FROM invoice_items
+        WHERE created_at BETWEEN %s AND %s
+        GROUP BY item_name
+    """
+}
+QUERIES = {
+    "top items, one month": TOP_ITEMS_SQL,
+    "item totals, whole range": """
+        SELECT items.name, totals.quantity, totals.sales
+        FROM (
+            SELECT item_id, SUM(quantity) AS quantity, SUM(total) AS sales
+            FROM invoice_items
+            WHERE created_at BETWEEN %s AND %s
+            GROUP BY item_id
+        ) totals
+        JOIN items ON items.id = totals.item_id
+    """
+}
+
+
+def table_size(db):
+    """Heap (with TOAST) and index bytes of all invoice_items partitions"""
+    db.cursor.execute("""
+        SELECT COALESCE(SUM(pg_table_size(inhrelid)), 0), COALESCE(SUM(pg_indexes_size(inhrelid)), 0)
+        FROM pg_inherits
+        WHERE inhparent = 'invoice_items'::regclass
+    """)
+    heap, indexes = db.cursor.fetchone()
+    db.conn.commit()
+    return {"heap_bytes": int(heap), "index_bytes": int(indexes), "total_bytes": int(heap + indexes)}
+
+
+def legacy_lines(db):
+    """True if invoice_items predates the items table or still has lines without an id"""
+    db.cursor.execute("""
+        SELECT NOT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = 'invoice_items'::regclass AND attname = 'item_id' AND attnotnull
+        )
+    """)
+    legacy = db.cursor.fetchone()[0]
+    db.conn.commit()
+    return legacy
+
+
+def run_queries(db, queries, ranges, repeat, results, label):
+    """Time each query over its range; returns the rows each one returned"""
+    rows = {}
+
+    def run(name, query, start, end):
+        db.cursor.execute(query, (start, end))
+        rows[name] = sorted(tuple(row) for row in db.cursor.fetchall())
+        db.conn.commit()
+
+    for name, query in queries.items():
+        run(name, query, *ranges[name])  # Warm the cache
+        results[f"{label}: {name}"] = measure(run, [(name, query, *ranges[name])] * repeat)
+    return rows
+
+
+def analyze(db):
+    db.conn.autocommit = True
+    db.cursor.execute("VACUUM ANALYZE invoice_items")
+    db.conn.autocommit = False
+
+
+def print_size(label, size):
+    print(f"{label}: heap {size['heap_bytes'] / 1e6:,.0f} MB, indexes {size['index_bytes'] / 1e6:,.0f} MB, "
+          f"total {size['total_bytes'] / 1e6:,.0f} MB")
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark invoice lines by item id against by item name")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--month", default="2024-03", help="Month of the top items query (YYYY-MM)")
+    parser.add_argument("--from", dest="start", default="2024-01-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default="2024-12-31", help="Last day (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query")
+    parser.add_argument("--output", default="bench_items.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    month = datetime.strptime(args.month, "%Y-%m")
+    following = (month + timedelta(days=32)).replace(day=1)
+    ranges = {
+        "top items, one month": (month, following - timedelta(microseconds=1)),
+        "item totals, whole range": (datetime.strptime(args.start, "%Y-%m-%d"),
+                                     datetime.strptime(args.end, "%Y-%m-%d") + timedelta(days=1)
+                                     - timedelta(microseconds=1))
+    }
+    results = {}
+    dataset = {"database": db_config.get("database")}
+
+    if legacy_lines(db):
+        analyze(db)
+        dataset["before"] = table_size(db)
+        print_size("Before", dataset["before"])
+        before = run_queries(db, LEGACY_QUERIES, ranges, args.repeat, results, "by name")
+
+        start = time.perf_counter()
+        db.setup_database(backfill=False)
+        dataset["schema_seconds"] = round(time.perf_counter() - start, 2)
+        month_seconds = []
+        lines = 0
+        for partition in db.get_invoice_partitions():
+            if partition["table"] != "invoice_items":
+                continue
+            month_start = time.perf_counter()
+            rewritten = db.backfill_item_ids(partition["month"])
+            if rewritten is None:
+                raise SystemExit(f"Backfill of {partition['month']:%Y-%m} failed")
+            if rewritten:
+                month_seconds.append(time.perf_counter() - month_start)
+                lines += rewritten
+        if db.backfill_item_ids() is None:
+            raise SystemExit("Could not make invoice_items.item_id NOT NULL")
+        backfill_seconds = time.perf_counter() - start
+        results["backfill, per month"] = summarize(month_seconds)
+        dataset.update(lines=lines, backfill_seconds=round(backfill_seconds, 1))
+        print(f"Backfilled {lines:,} lines in {backfill_seconds:.1f}s ({lines / backfill_seconds:,.0f} lines/s)")
+    else:
+        before = None
+        print("Every invoice line already has an item id; measuring the current layout only")
+
+    analyze(db)
+    dataset["after"] = table_size(db)
+    print_size("After", dataset["after"])
+    after = run_queries(db, QUERIES, ranges, args.repeat, results, "by id")
+    if before is not None:
+        for name, rows in before.items():
+            if rows != after[name]:
+                raise SystemExit(f"{name}: rows by id differ from rows by name")
+
+    print_results(results)
+    write_results(args.output, "items", results, dataset)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Throughput of in-memory PDF invoice rendering, single-process and in a process pool
+
+Renders --invoices synthetic invoices of --items lines each in this process,
+then with render_batch for each pool size in --workers, and reports
+invoices/s, MB/s of PDF produced and the per-invoice latency of the
+single-process run. With --database the invoices of a date range are read
+from the database instead (Database.get_invoice_documents).
+
+    python benchmarks/pdf_benchmark.py --invoices 20000 --workers 1,2,4
+    python benchmarks/pdf_benchmark.py --database cube_bench --from 2024-03-01 --to 2024-03-07
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_invoice import parse_day, render_batch, render_invoice_pdf
+from bench_utils import measure, print_results, write_results
+
+
+def synthetic_invoices(count, items, seed=42):
+    """Invoices in CheckoutEngine's format with items lines each"""
+    rng = random.Random(seed)
+    invoices = []
+    for invoice_id in range(1, count + 1):
+        lines = []
+        for _ in range(items):
+            quantity, price = rng.randint(1, 5), rng.choice((10, 25, 40, 99.5, 120, 349))
+            lines.append({"name": f"Item {rng.randint(1, 500)}", "quantity": quantity, "price": price,
+                          "total": quantity * price})
+        subtotal = sum(line["total"] for line in lines)
+        discount = round(subtotal * rng.choice((0, 0, 0.05, 0.10)), 2)
+        invoices.append({
+            "id": invoice_id, "date": "2024-03-01 10:00:00", "customer_name": "Customer", "customer_mobile": "9000000000",
+            "subtotal": subtotal, "discount": discount, "total": subtotal - discount, "items": lines,
+            "reward_tier_applied": "Silver" if discount else None
+        })
+    return invoices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF invoice rendering")
+    parser.add_argument("--invoices", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=8, help="Lines per synthetic invoice")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="Comma-separated pool sizes")
+    parser.add_argument("--database", help="Render stored invoices from this database instead")
+    parser.add_argument("--from", dest="start", type=parse_day, help="First day with --database")
+    parser.add_argument("--to", dest="end", type=parse_day, help="Last day with --database")
+    parser.add_argument("--output", default="bench_pdf.json")
+    args = parser.parse_args()
+
+    if args.database:
+        from config import DB_CONFIG
+        from models import Database
+
+        db = Database(dict(DB_CONFIG, database=args.database))
+        invoices = db.get_invoice_documents(args.start, args.end)
+        db.close()
+    else:
+        invoices = synthetic_invoices(args.invoices, args.items)
+    print(f"{len(invoices)} invoices, {sum(len(invoice['items']) for invoice in invoices)} lines")
+
+    results = {"render (one process)": measure(render_invoice_pdf, [(invoice,) for invoice in invoices])}
+    size = sum(len(render_invoice_pdf(invoice)) for invoice in invoices[:1000]) / min(len(invoices), 1000)
+    throughput = {}
+    for workers in sorted({int(value) for value in args.workers.split(",")}):
+        start = time.perf_counter()
+        written = sum(len(pdf) for _, pdf in render_batch(invoices, workers))
+        seconds = time.perf_counter() - start
+        throughput[workers] = {"invoices_per_sec": round(len(invoices) / seconds, 1),
+                               "mb_per_sec": round(written / 1e6 / seconds, 2), "seconds": round(seconds, 3)}
+
+    print_results(results)
+    print(f"\nAverage document {size / 1024:.1f} KB")
+    for workers, stats in throughput.items():
+        print(f"pool of {workers:<3} {stats['invoices_per_sec']:>9.0f} invoices/s  {stats['mb_per_sec']:6.2f} MB/s  "
+              f"({stats['seconds']:.2f}s)")
+    results["batch"] = throughput
+    write_results(args.output, "pdf_invoices", results,
+                  {"invoices": len(invoices), "items": args.items, "database": args.database, "cpus": os.cpu_count()})
+
+
+if __name__ == "__main__":
+    main()
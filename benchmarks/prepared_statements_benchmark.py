@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of the hot checkout queries with and without server-side prepared statements
+
+Replays a checkout mix (customer lookup, invoice insert with items, points
+update) at a 10k-checkouts/hour profile. Use --rate 0 to run unpaced.
+
+    python benchmarks/prepared_statements_benchmark.py --database shopping_cart_bench --checkouts 1000
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+from bench_utils import summarize, write_results, print_results
+from synthetic_data import product_catalog
+
+
+def checkout_mix(db, mobiles, checkouts, rate, seed):
+    """Run the checkout query mix and return latencies per query"""
+    rng = random.Random(seed)
+    catalog = product_catalog(42)
+    interval = 3600.0 / rate if rate else 0
+    latencies = {"get_customer_by_mobile": [], "save_invoice": [], "update_customer_points": []}
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        latencies[name].append(time.perf_counter() - start)
+        return result
+
+    next_start = time.perf_counter()
+    for _ in range(checkouts):
+        mobile = rng.choice(mobiles)
+        customer = timed("get_customer_by_mobile", db.get_customer_by_mobile, mobile)
+
+        cart = []
+        for _ in range(rng.randint(1, 7)):
+            name, price = rng.choice(catalog)
+            quantity = rng.randint(1, 5)
+            cart.append({"name": name, "quantity": quantity, "price": price, "total": round(quantity * price, 2)})
+        subtotal = round(sum(item["total"] for item in cart), 2)
+
+        timed("save_invoice", db.save_invoice, mobile, subtotal, 0, subtotal, cart)
+        if customer:
+            timed("update_customer_points", db.update_customer_points, mobile, customer["points"] + 10)
+
+        if interval:
+            next_start += interval
+            time.sleep(max(0.0, next_start - time.perf_counter()))
+
+    return latencies
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark prepared statements for hot queries")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--checkouts", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=10000, help="Checkouts per hour (0 = unpaced)")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--output", default="bench_prepared.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+
+    results = {}
+    for label, prepared in (("plain", False), ("prepared", True)):
+        db = Database(db_config, prepared_statements=prepared)
+        db.cursor.execute("SELECT mobile FROM customers ORDER BY id LIMIT 5000")
+        mobiles = [row[0] for row in db.cursor.fetchall()]
+        db.conn.commit()
+
+        # Warm up caches so both runs start from the same state
+        checkout_mix(db, mobiles, min(200, args.checkouts), 0, args.seed + 1)
+        print(f"Running {args.checkouts} checkouts ({label})...")
+        for name, values in checkout_mix(db, mobiles, args.checkouts, args.rate, args.seed).items():
+            results[f"{name} ({label})"] = summarize(values)
+        db.close()
+
+    print_results(results)
+    print("\nPer-call latency reduction (mean):")
+    for name in ("get_customer_by_mobile", "save_invoice", "update_customer_points"):
+        plain = results[f"{name} (plain)"]["mean_ms"]
+        prepared = results[f"{name} (prepared)"]["mean_ms"]
+        if plain:
+            print(f"  {name:<26} {plain:.3f} ms -> {prepared:.3f} ms ({(plain - prepared) / plain * 100:+.1f}%)")
+
+    write_results(args.output, "prepared_statements", results, {"checkouts": args.checkouts, "rate_per_hour": args.rate})
+
+
+if __name__ == "__main__":
+    main()
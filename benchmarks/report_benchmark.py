@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Speedup of the date-sharded sales report against the single-query report
+
+Times Database.generate_sales_report over a long date range, then
+parallel_report.generate_sales_report_parallel with each shard count in
+--shards (a pool of two connections per shard, so the summary and item
+aggregates of every shard run at once), checks that every sharded report
+equals the single-query one and reports the speedup. The database server's
+cores bound the speedup; max_parallel_workers_per_gather lets the single
+query use some of them too.
+
+    python benchmarks/synthetic_data.py --database cube_bench --customers 100000 --invoices 2000000
+    python benchmarks/report_benchmark.py --database cube_bench --from 2024-01-01 --to 2024-12-31
+"""
+
+import argparse
+import sys
+import os
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import DatabasePool
+from parallel_report import generate_sales_report_parallel, to_datetime
+from bench_utils import measure, write_results, print_results
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark the date-sharded sales report")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--from", dest="start", default="2024-01-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default="2024-12-31", help="Last day (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--shards", default="2,4,8,12", help="Comma-separated shard counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Reports per configuration")
+    parser.add_argument("--output", default="bench_report.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    start = to_datetime(args.start)
+    end = to_datetime(args.end) + timedelta(days=1) - timedelta(microseconds=1)
+    shard_counts = sorted({int(value) for value in args.shards.split(",")})
+
+    pool = DatabasePool(db_config, max_connections=2 * max(shard_counts))
+    expected = pool.generate_sales_report(start, end)
+    results = {"single query": measure(pool.generate_sales_report, [(start, end)] * args.repeat)}
+
+    for shards in shard_counts:
+        report = generate_sales_report_parallel(pool, start, end, shards, min_days=0)
+        report.pop("shards")
+        if report != expected:
+            raise SystemExit(f"{shards} shards: report differs from the single-query report")
+        results[f"{shards} shards"] = measure(
+            lambda: generate_sales_report_parallel(pool, start, end, shards, min_days=0), [()] * args.repeat
+        )
+    pool.close()
+
+    print(f"\nSales report {args.start} to {args.end}: {expected['invoice_count']} invoices")
+    print_results(results)
+    single = results["single query"]["p50_ms"]
+    for shards in shard_counts:
+        print(f"{shards:>3} shards: {single / results[f'{shards} shards']['p50_ms']:.2f}x")
+    write_results(args.output, "sharded_report", results,
+                  {"database": db_config.get("database"), "from": args.start, "to": args.end})
+
+
+if __name__ == "__main__":
+    main()
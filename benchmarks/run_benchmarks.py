@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Database operations used by the till
+
+Run against a database filled by synthetic_data.py (use a dedicated
+database, save_invoice and save_customer add rows):
+
+    python benchmarks/synthetic_data.py --database shopping_cart_bench
+    python benchmarks/run_benchmarks.py --database shopping_cart_bench --output bench_results.json
+    python benchmarks/run_benchmarks.py --database shopping_cart_bench --compare bench_results.json
+"""
+
+import argparse
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+from bench_utils import measure, write_results, print_results, compare_results
+from synthetic_data import FIRST_NAMES, product_catalog
+
+
+def sample_rows(db, query, count, rng):
+    """Pick count deterministic random values from a single-column id range query"""
+    db.cursor.execute(query)
+    low, high = db.cursor.fetchone()
+    if low is None:
+        return []
+    return [rng.randint(low, high) for _ in range(count)]
+
+
+def lookup(db, query, ids):
+    """Map sampled ids to column values"""
+    db.cursor.execute(query, (ids,))
+    values = [row[0] for row in db.cursor.fetchall()]
+    db.conn.commit()
+    return values
+
+
+def dataset_size(db):
+    """Row counts of the benchmarked tables"""
+    sizes = {}
+    for table in ("customers", "invoices", "invoice_items"):
+        # Summed over partitions for the partitioned tables
+        db.cursor.execute("""
+            SELECT SUM(GREATEST(c.reltuples, 0))::bigint
+            FROM pg_partition_tree(%s) t
+            JOIN pg_class c ON c.oid = t.relid
+        """, (table,))
+        row = db.cursor.fetchone()
+        sizes[table] = int(row[0] or 0) if row else 0
+    db.conn.commit()
+    return sizes
+
+
+def run_suite(db, iterations=1000, seed=7):
+    """Run every benchmark and return a results dictionary"""
+    rng = random.Random(seed)
+    catalog = product_catalog(42)
+
+    customer_ids = sample_rows(db, "SELECT MIN(id), MAX(id) FROM customers", iterations, rng)
+    mobiles = lookup(db, "SELECT mobile FROM customers WHERE id = ANY(%s)", customer_ids) or ["0000000000"]
+    invoice_ids = sample_rows(db, "SELECT MIN(id), MAX(id) FROM invoices", iterations, rng) or [0]
+
+    db.cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM invoices")
+    first_sale, last_sale = db.cursor.fetchone()
+    db.conn.commit()
+    first_sale = first_sale or datetime.now()
+    last_sale = last_sale or datetime.now()
+
+    def report_ranges(days, count):
+        span = max(0, (last_sale - first_sale).days - days)
+        ranges = []
+        for _ in range(count):
+            start = first_sale + timedelta(days=rng.randint(0, span))
+            ranges.append((start, start + timedelta(days=days)))
+        return ranges
+
+    def random_cart():
+        cart = []
+        for _ in range(rng.randint(1, 7)):
+            name, price = rng.choice(catalog)
+            quantity = rng.randint(1, 5)
+            cart.append({"name": name, "quantity": quantity, "price": price, "total": round(quantity * price, 2)})
+        return cart
+
+    def invoice_args():
+        cart = random_cart()
+        subtotal = round(sum(item["total"] for item in cart), 2)
+        discount = round(subtotal * 0.05, 2)
+        return (rng.choice(mobiles), subtotal, discount, subtotal - discount, cart)
+
+    new_mobile_base = 6000000000 + rng.randrange(10 ** 8)
+    results = {}
+
+    print("Running benchmarks...")
+    results["get_customer_by_mobile"] = measure(db.get_customer_by_mobile, [(m,) for m in mobiles])
+    results["search_customers_by_name"] = measure(
+        db.search_customers_by_name, [(rng.choice(FIRST_NAMES)[:rng.randint(2, 4)],) for _ in range(iterations)]
+    )
+    results["search_customers_by_mobile"] = measure(
+        db.search_customers_by_mobile, [(m[:rng.randint(3, 8)],) for m in mobiles]
+    )
+    results["get_invoices_by_mobile"] = measure(db.get_invoices_by_mobile, [(m,) for m in mobiles])
+    results["get_invoice_details"] = measure(db.get_invoice_details, [(i,) for i in invoice_ids])
+    results["save_customer (new)"] = measure(
+        db.save_customer,
+        [(f"Bench Customer {n}", str(new_mobile_base + n), "01/01/1990", None) for n in range(iterations)]
+    )
+    results["save_customer (update)"] = measure(
+        db.save_customer, [(f"Updated {m}", m, "02/02/1991", None) for m in mobiles]
+    )
+    results["save_invoice"] = measure(db.save_invoice, [invoice_args() for _ in range(iterations)])
+
+    report_iterations = max(1, iterations // 100)
+    for label, days in (("day", 1), ("week", 7), ("month", 30), ("year", 365)):
+        results[f"generate_sales_report ({label})"] = measure(
+            db.generate_sales_report, report_ranges(days, report_iterations)
+        )
+
+    return results
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Run the Database benchmark suite")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--iterations", type=int, default=1000, help="Calls per benchmark (reports run 1/100th)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write results to")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    dataset = dataset_size(db)
+    print(f"Dataset: {dataset}")
+    results = run_suite(db, args.iterations, args.seed)
+    print_results(results)
+
+    if args.compare:
+        compare_results(args.compare, results)
+
+    write_results(args.output, "database", results, dataset)
+    print(f"\nResults written to {args.output}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Replay barcode scanner keystrokes through the scanner input mode
+
+Feeds recorded (or generated) scan bursts through scanner.ScanInput and the
+checkout engine's catalog path on a simulated Tk event loop: keys arrive at
+their recorded times and queue while the single UI thread is busy, each
+handler takes as long as it really does, and after() timers fire in time
+order with the keys. Reports scans dropped (a code scanned but not added),
+extra scans (a code added that was not scanned), latency from each code's
+Enter to the frame that shows it, and how far the UI thread fell behind.
+
+Two cart refresh modes are compared: "per-scan" redraws the whole cart view
+after every code, as Add to Cart does, and "coalesced" appends the new rows
+once per frame. Without --tk the cart view is not drawn; each row inserted
+or deleted costs --row-ms instead. With --tk (needs a display, e.g.
+xvfb-run) rows go into a real ttk.Treeview and every redraw is timed.
+
+A recording is JSON lines, one per scan ({"code": ..., "keys": [[ms, key], ...]})
+or per word typed by hand ({"typed": ..., "keys": [...]}), with "\\n" for Enter.
+
+    python benchmarks/scanner_replay.py --database catalog_bench --scans 5000 --save scans.jsonl
+    python benchmarks/scanner_replay.py --database catalog_bench --recording scans.jsonl --max-gap-ms 20
+"""
+
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+import os
+import time
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import ProductCatalog
+from checkout import CheckoutEngine
+from models import Database
+from scanner import FrameCoalescer, ScanInput
+from utils import PriceFormatter
+from bench_utils import summarize, write_results
+
+WORDS = ("milk", "bread", "eggs", "loose onions", "carry bag", "tomato")
+
+
+def parse_range(text):
+    low, high = (float(part) for part in text.split(","))
+    return low, high
+
+
+def generate(codes, args, rng):
+    """Scans at scanner speed, some back to back, with the odd USB stall and words typed by hand between them"""
+    segments = []
+    t = 0.0
+    for _ in range(args.scans):
+        if rng.random() < args.typing:
+            word = rng.choice(WORDS) + "\n"
+            keys = []
+            for char in word:
+                t += rng.uniform(*args.human_gap_ms)
+                keys.append([round(t), char])
+            segments.append({"typed": word, "keys": keys})
+            t += rng.uniform(*args.scan_gap_ms)
+        code = rng.choice(codes)
+        keys = []
+        for char in code + "\n":
+            t += rng.uniform(*args.key_gap_ms)
+            if rng.random() < args.stall:
+                t += rng.uniform(40, 80)
+            keys.append([round(t), char])
+        segments.append({"code": code, "keys": keys})
+        t += rng.uniform(*(args.rapid_gap_ms if rng.random() < args.rapid else args.scan_gap_ms))
+    return segments
+
+
+class ReplayLoop:
+    def __init__(self):
+        """A single-threaded event loop on a simulated clock (ms) standing in for Tk's mainloop"""
+        self.now = 0.0
+        self.modeled_ms = 0.0  # Cost added by a modeled cart view during the current call
+        self.max_backlog_ms = 0.0
+        self._timers = []
+        self._seq = 0
+        self._call_start = None
+
+    def after(self, delay_ms, function):
+        self._seq += 1
+        heapq.heappush(self._timers, (self.time() + delay_ms, self._seq, function))
+
+    def time(self):
+        """The simulated time, including the part of the current call that has run so far"""
+        if self._call_start is None:
+            return self.now
+        return self.now + (time.perf_counter() - self._call_start) * 1000 + self.modeled_ms
+
+    def _call(self, function, *args):
+        self.modeled_ms = 0.0
+        self._call_start = time.perf_counter()
+        function(*args)
+        self.now = self.time()
+        self._call_start = None
+
+    def run(self, keys, on_key):
+        """Deliver keys ([ms, key] in time order) and timers until both run out"""
+        index = 0
+        while index < len(keys) or self._timers:
+            next_key = keys[index][0] if index < len(keys) else math.inf
+            next_timer = self._timers[0][0] if self._timers else math.inf
+            if next_key <= next_timer:
+                self.max_backlog_ms = max(self.max_backlog_ms, self.now - next_key)
+                self.now = max(self.now, next_key)
+                self._call(on_key, keys[index][1], next_key)
+                index += 1
+            else:
+                _, _, function = heapq.heappop(self._timers)
+                self.now = max(self.now, next_timer)
+                self._call(function)
+
+
+class CartView:
+    def __init__(self, loop, row_ms, tree=None):
+        """The cart view: a real ttk.Treeview, or formatted rows costing row_ms each"""
+        self.loop = loop
+        self.row_ms = row_ms
+        self.tree = tree
+        self.rows = []
+        self.redraws = 0
+
+    def _insert(self, items):
+        for item in items:
+            values = (item["name"], item["quantity"], PriceFormatter.format_price(item["price"]),
+                      PriceFormatter.format_price(item["total"]))
+            self.rows.append(self.tree.insert("", "end", values=values) if self.tree else values)
+        self.loop.modeled_ms += 0 if self.tree else len(items) * self.row_ms
+
+    def _clear(self):
+        if self.tree:
+            self.tree.delete(*self.rows)
+        self.loop.modeled_ms += 0 if self.tree else len(self.rows) * self.row_ms
+        self.rows = []
+
+    def _done(self):
+        self.redraws += 1
+        if self.tree:
+            self.tree.update_idletasks()
+
+    def redraw(self, cart):
+        """Like ShoppingCartUI.update_cart_view"""
+        self._clear()
+        self._insert(cart)
+        self._done()
+
+    def append(self, cart):
+        """Like ShoppingCartUI.append_cart_view"""
+        if len(self.rows) > len(cart):
+            self._clear()
+        self._insert(cart[len(self.rows):])
+        self._done()
+
+
+def replay(engine, segments, mode, args, tree=None):
+    """Run one replay; returns its drop counts and latencies"""
+    loop = ReplayLoop()
+    view = CartView(loop, args.row_ms, tree)
+    session = engine.open_session()
+    added = []
+    waiting = []  # Enter times of codes added but not drawn yet
+    latencies = []
+    typed = []
+    current = {}
+
+    def add_code(code):
+        if len(session.cart) >= args.cart_size:
+            session.reset_cart()  # Checkout; the next redraw clears the view
+        try:
+            session.add_product(code)
+        except Exception:
+            return False
+        added.append(code)
+        waiting.append(current["time"])
+        return True
+
+    def refresh():
+        if mode == "per-scan":
+            view.redraw(session.cart)
+        else:
+            view.append(session.cart)
+        drawn = loop.time()
+        latencies.extend((drawn - when) / 1000 for when in waiting)
+        waiting.clear()
+
+    scan_input = ScanInput(add_code, refresh, typed.append, loop.after, max_gap_ms=args.max_gap_ms,
+                           min_length=args.min_length, frame_ms=args.frame_ms, clock=loop.time)
+    if mode == "per-scan":
+        scan_input.refresher = FrameCoalescer(lambda delay, function: function(), refresh, 0, loop.time)
+
+    def on_key(char, time_ms):
+        current["time"] = time_ms
+        scan_input.key(char, time_ms)
+
+    keys = sorted((key for segment in segments for key in segment["keys"]), key=lambda key: key[0])
+    start = time.perf_counter()
+    loop.run(keys, on_key)
+    elapsed = time.perf_counter() - start
+    engine.close_session(session.session_id)
+
+    expected = Counter(segment["code"] for segment in segments if "code" in segment)
+    got = Counter(added)
+    typed_by_hand = sum(len(segment["typed"]) for segment in segments if "typed" in segment)
+    return {
+        "scans": sum(expected.values()),
+        "added": len(added),
+        "dropped": sum((expected - got).values()),
+        "extra": sum((got - expected).values()),
+        "rejected": scan_input.rejected,
+        "stray_keys": len("".join(typed)) - typed_by_hand,  # Keys of broken-up scans typed into the field
+        "redraws": view.redraws,
+        "max_backlog_ms": round(loop.max_backlog_ms, 2),
+        "replay_seconds": round(elapsed, 3),
+        "latency": summarize(latencies)
+    }
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Replay scanner keystrokes through the scanner input mode")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--recording", help="Replay this recording instead of generating scans")
+    parser.add_argument("--save", help="Write the generated recording here")
+    parser.add_argument("--scans", type=int, default=5000)
+    parser.add_argument("--key-gap-ms", type=parse_range, default=(1, 8), help="Scanner time between keys")
+    parser.add_argument("--scan-gap-ms", type=parse_range, default=(150, 900), help="Time between scans")
+    parser.add_argument("--rapid-gap-ms", type=parse_range, default=(5, 40), help="Time between back-to-back scans")
+    parser.add_argument("--rapid", type=float, default=0.3, help="Fraction of scans straight after the previous")
+    parser.add_argument("--human-gap-ms", type=parse_range, default=(80, 250), help="Time between typed keys")
+    parser.add_argument("--typing", type=float, default=0.02, help="Fraction of scans preceded by a typed word")
+    parser.add_argument("--stall", type=float, default=0.001, help="Chance of a 40-80 ms stall between keys")
+    parser.add_argument("--max-gap-ms", type=float, default=30)
+    parser.add_argument("--min-length", type=int, default=4)
+    parser.add_argument("--frame-ms", type=int, default=16)
+    parser.add_argument("--row-ms", type=float, default=0.05, help="Modeled cost of a cart view row")
+    parser.add_argument("--cart-size", type=int, default=60, help="Items per cart before it is checked out")
+    parser.add_argument("--tk", action="store_true", help="Draw into a real ttk.Treeview (needs a display)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="bench_scanner.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    catalog = ProductCatalog()
+    if not catalog.load(db):
+        raise SystemExit("No products; generate them with synthetic_data.py --products")
+    engine = CheckoutEngine(db, catalog=catalog)
+
+    if args.recording:
+        with open(args.recording, encoding="utf-8") as f:
+            segments = [json.loads(line) for line in f if line.strip()]
+    else:
+        rng = random.Random(args.seed)
+        rows = rng.sample(list(catalog.products.values()), min(len(catalog), 10000))
+        segments = generate([row[1] or row[0] for row in rows], args, rng)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(segment) + "\n" for segment in segments)
+
+    tree = None
+    if args.tk:
+        import tkinter as tk
+        from tkinter import ttk
+        root = tk.Tk()
+        tree = ttk.Treeview(root, columns=("Item", "Quantity", "Price", "Total"), show="headings", height=10)
+        tree.pack(fill="both", expand=True)
+        root.update()
+
+    results = {}
+    print(f"\n{'Mode':<10} {'Scans':>7} {'Dropped':>8} {'Extra':>6} {'Redraws':>8} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'Backlog ms':>11}")
+    print("-" * 82)
+    for mode in ("per-scan", "coalesced"):
+        result = results[mode] = replay(engine, segments, mode, args, tree)
+        latency = result["latency"]
+        print(f"{mode:<10} {result['scans']:>7} {result['dropped']:>8} {result['extra']:>6} {result['redraws']:>8} "
+              f"{latency['p50_ms']:>8.2f} {latency['p99_ms']:>8.2f} {latency['max_ms']:>8.2f} "
+              f"{result['max_backlog_ms']:>11.2f}")
+        if result["stray_keys"]:
+            print(f"  {mode}: {result['stray_keys']} keys of broken-up scans were typed into the item field")
+    db.close()
+    write_results(args.output, "scanner", results, {
+        "database": db_config.get("database"), "recording": args.recording, "segments": len(segments),
+        "max_gap_ms": args.max_gap_ms, "row_ms": None if args.tk else args.row_ms, "cart_size": args.cart_size
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Time from launching the Tk application to its first interactive window
+
+Starts the application --runs times in fresh interpreters and reports, from
+process spawn: imports done, window built, first interactive frame (the main
+loop is idle with the window mapped) and database ready (connected and schema
+checked on the worker thread). --eager times the previous startup path for
+comparison: database modules and smtplib imported up front, every tab built
+and setup_database run with its DDL before the first frame. Needs a display
+(e.g. xvfb-run).
+
+    xvfb-run python benchmarks/startup_benchmark.py --runs 20
+    xvfb-run python benchmarks/startup_benchmark.py --runs 20 --eager
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from bench_utils import summarize, write_results, print_results
+
+PHASES = ("imports", "window built", "first interactive", "database ready")
+
+
+def launch(args):
+    """Child process: start the application, record the phases and quit"""
+    start = float(os.environ["STARTUP_BENCH_T0"])
+    marks = {}
+
+    from config import DB_CONFIG, EMAIL_CONFIG
+    from controller import ShoppingCartController
+    if args.eager:
+        import smtplib  # noqa: F401
+        import models  # noqa: F401
+    marks["imports"] = time.time() - start
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    app = ShoppingCartController(db_config=db_config, email_config=EMAIL_CONFIG)
+    if args.eager:
+        for tab in (app.ui.view_tab, app.ui.bill_tab, app.ui.history_tab):
+            app.ui.build_tab(tab)
+        app.db_executor.submit(app.db.setup_database, force=True).result()
+    marks["window built"] = time.time() - start
+
+    def interactive():
+        marks["first interactive"] = time.time() - start
+        wait_for_database()
+
+    def wait_for_database():
+        if app.db_executor.is_busy():
+            app.root.after(5, wait_for_database)
+            return
+        marks["database ready"] = time.time() - start
+        app.root.destroy()
+
+    app.root.bind("<Map>", lambda event: app.root.after_idle(interactive) if event.widget is app.root else None)
+    app.run()
+    print(json.dumps(marks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first interactive window")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--eager", action="store_true", help="Time the eager startup path")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", default="bench_startup.json")
+    args = parser.parse_args()
+
+    if args.child:
+        launch(args)
+        return
+
+    command = [sys.executable, os.path.abspath(__file__), "--child"]
+    if args.database:
+        command += ["--database", args.database]
+    if args.eager:
+        command.append("--eager")
+
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(args.runs):
+        env = dict(os.environ, STARTUP_BENCH_T0=repr(time.time()))
+        output = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        marks = json.loads(output.strip().splitlines()[-1])
+        for phase in PHASES:
+            samples[phase].append(marks[phase])
+
+    results = {phase: summarize(samples[phase]) for phase in PHASES}
+    print(f"\nStartup ({'eager' if args.eager else 'fast'}), {args.runs} runs; latencies from process spawn")
+    print_results(results)
+    write_results(args.output, "startup", results, {"mode": "eager" if args.eager else "fast", "runs": args.runs})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic dataset generator for benchmarks
+
+The same seed and sizes always produce the same rows. Rows are written with
+COPY in chunks, so a full-size dataset (1M customers, 10M invoices, 40M
+items) loads in bounded memory:
+
+    python benchmarks/synthetic_data.py --customers 1000000 --invoices 10000000 --items-per-invoice 4
+"""
+
+import argparse
+import io
+import random
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Akash", "Alice", "Amit", "Ananya", "Arjun", "Bob", "Charlie", "Deepa",
+    "Diana", "Edward", "Farah", "Fiona", "George", "Gita", "Harsh", "Helen", "Ishaan", "Jane",
+    "John", "Kavya", "Kiran", "Lakshmi", "Manoj", "Meera", "Neha", "Nikhil", "Pooja", "Priya",
+    "Rahul", "Ravi", "Riya", "Rohan", "Sanjay", "Sara", "Shreya", "Suresh", "Tara", "Vikram"
+]
+LAST_NAMES = [
+    "Anderson", "Bhat", "Brown", "Das", "Davis", "Garcia", "Gupta", "Iyer", "Johnson", "Joshi",
+    "Kapoor", "Khan", "Kumar", "Menon", "Miller", "Nair", "Patel", "Rao", "Reddy", "Shah",
+    "Sharma", "Singh", "Smith", "Taylor", "Verma", "Wilson"
+]
+PRODUCTS = [
+    "Milk", "Bread", "Eggs", "Butter", "Cheese", "Rice", "Wheat Flour", "Sugar", "Salt", "Tea",
+    "Coffee", "Biscuits", "Chips", "Soap", "Shampoo", "Toothpaste", "Detergent", "Cooking Oil",
+    "Lentils", "Chickpeas", "Tomatoes", "Onions", "Potatoes", "Apples", "Bananas", "Mangoes",
+    "Yogurt", "Paneer", "Juice", "Water Bottle", "Noodles", "Pasta", "Ketchup", "Jam", "Honey",
+    "Spices Mix", "Chocolate", "Ice Cream", "Dish Wash", "Tissue Paper"
+]
+MOBILE_BASE = 7000000000
+
+# Default dataset: small enough for a laptop run, same shape as the full-size one
+DEFAULT_CUSTOMERS = 10000
+DEFAULT_INVOICES = 100000
+DEFAULT_ITEMS_PER_INVOICE = 4
+
+
+def mobile_for(number):
+    """Mobile number of synthetic customer number (its customers.id - 1)"""
+    return str(MOBILE_BASE + number)
+
+
+def product_catalog(seed):
+    """Products with fixed sizes and prices, e.g. 'Milk Large'"""
+    rng = random.Random(seed)
+    catalog = []
+    for product in PRODUCTS:
+        for size in ("Small", "Regular", "Large", "Family Pack"):
+            catalog.append((f"{product} {size}", round(rng.uniform(10, 500), 2)))
+    return catalog
+
+
+def copy_value(value):
+    """Encode one value for COPY text format"""
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY tab-separated rows into a table"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def next_id(cursor, table):
+    """First free id in a table"""
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def sync_sequence(cursor, table):
+    """Move a SERIAL sequence past the explicitly inserted ids"""
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {table}))"
+    )
+
+
+def generate_customers(db, count, seed=42, start_date=None, chunk_size=50000):
+    """Insert count synthetic customers and return the first inserted id
+
+    Mobiles and emails are numbered by customers.id, so generating into a
+    table that already has synthetic customers adds new ones.
+    """
+    rng = random.Random(seed)
+    start_date = start_date or datetime(2023, 1, 1)
+    cursor = db.conn.cursor()
+    first_id = next_id(cursor, "customers")
+
+    for chunk_start in range(0, count, chunk_size):
+        rows = []
+        for index in range(chunk_start, min(count, chunk_start + chunk_size)):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            day, month = rng.randint(1, 28), rng.randint(1, 12)
+            dob = date(rng.randint(1950, 2005), month, day)
+            number = first_id - 1 + index
+            email = f"customer{number}@example.com" if rng.random() < 0.6 else None
+            created_at = start_date + timedelta(seconds=rng.randint(0, 365 * 86400))
+            rows.append((first_id + index, name, mobile_for(number), dob, email, rng.choice([0, 50, 200, 600, 1200]), created_at))
+
+        copy_rows(cursor, "customers", ("id", "name", "mobile", "dob", "email", "points", "created_at"), rows)
+        db.conn.commit()
+
+    sync_sequence(cursor, "customers")
+    db.conn.commit()
+    return first_id
+
+
+def generate_invoices(db, count, customer_first_id, customer_count, items_per_invoice=DEFAULT_ITEMS_PER_INVOICE,
+                      seed=42, start_date=None, days=365, with_bills=False, chunk_size=20000):
+    """Insert count synthetic invoices with on average items_per_invoice items each"""
+    from utils import PriceFormatter
+
+    rng = random.Random(seed + 1)
+    catalog = product_catalog(seed)
+    start_date = start_date or datetime(2024, 1, 1)
+    cursor = db.conn.cursor()
+    db.ensure_invoice_partitions(start_date, start_date + timedelta(days=days))
+    invoice_id = next_id(cursor, "invoices")
+    # Lines are copied with their item ids, so the legacy item_name trigger is not run per line
+    names = [name for name, _ in catalog]
+    item_ids = dict(zip(names, db._item_ids(names)))
+    max_items = max(1, items_per_invoice * 2 - 1)
+
+    for chunk_start in range(0, count, chunk_size):
+        invoice_rows = []
+        item_rows = []
+        for _ in range(chunk_start, min(count, chunk_start + chunk_size)):
+            # About one sale in five is a walk-in without customer details
+            customer_id = None
+            if customer_count and rng.random() < 0.8:
+                customer_id = customer_first_id + rng.randrange(customer_count)
+
+            cart = []
+            for _ in range(rng.randint(1, max_items)):
+                name, price = rng.choice(catalog)
+                quantity = rng.randint(1, 5)
+                cart.append({"name": name, "quantity": quantity, "price": price, "total": round(quantity * price, 2)})
+
+            subtotal = round(sum(item["total"] for item in cart), 2)
+            discount = round(subtotal * 0.05, 2) if customer_id else 0
+            final = round(subtotal - discount, 2)
+            created_at = start_date + timedelta(seconds=rng.randint(0, days * 86400 - 1))
+            bill = None
+            if with_bills:
+                bill = PriceFormatter.format_bill(cart, subtotal, discount, final)
+
+            invoice_rows.append((invoice_id, customer_id, subtotal, discount, final, bill, created_at))
+            for item in cart:
+                item_rows.append((invoice_id, item_ids[item["name"]], item["quantity"], item["price"], item["total"], created_at))
+            invoice_id += 1
+
+        copy_rows(cursor, "invoices",
+                  ("id", "customer_id", "total_amount", "discount_amount", "final_amount", "bill_content", "created_at"),
+                  invoice_rows)
+        copy_rows(cursor, "invoice_items", ("invoice_id", "item_id", "quantity", "price", "total", "created_at"),
+                  item_rows)
+        db.conn.commit()
+
+    sync_sequence(cursor, "invoices")
+    db.conn.commit()
+
+
+def generate_products(db, count, seed=42, chunk_size=50000):
+    """Insert count catalog products with SKUs SKU0000000.., EAN-13 style barcodes and sized names"""
+    rng = random.Random(seed + 2)
+    cursor = db.conn.cursor()
+    first_id = next_id(cursor, "products")
+    sizes = ("Small", "Regular", "Large", "Family Pack")
+
+    for chunk_start in range(0, count, chunk_size):
+        rows = []
+        for index in range(chunk_start, min(count, chunk_start + chunk_size)):
+            name = f"{rng.choice(PRODUCTS)} {rng.choice(sizes)} {index:07d}"
+            rows.append((first_id + index, f"SKU{index:07d}", f"890{index:010d}", name, round(rng.uniform(10, 500), 2)))
+
+        copy_rows(cursor, "products", ("id", "sku", "barcode", "name", "price"), rows)
+        db.conn.commit()
+
+    sync_sequence(cursor, "products")
+    db.conn.commit()
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic dataset")
+    parser.add_argument("--customers", type=int, default=DEFAULT_CUSTOMERS)
+    parser.add_argument("--invoices", type=int, default=DEFAULT_INVOICES)
+    parser.add_argument("--items-per-invoice", type=int, default=DEFAULT_ITEMS_PER_INVOICE)
+    parser.add_argument("--products", type=int, default=0, help="Catalog products to generate")
+    parser.add_argument("--days", type=int, default=365, help="Spread invoices over this many days from 2024-01-01")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--with-bills", action="store_true", help="Also store rendered bill_content text")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+
+    db = Database(db_config)
+    db.setup_database()
+
+    start = time.perf_counter()
+    print(f"Generating {args.customers} customers...")
+    first_id = generate_customers(db, args.customers, seed=args.seed)
+    print(f"Generating {args.invoices} invoices (~{args.invoices * args.items_per_invoice} items)...")
+    generate_invoices(db, args.invoices, first_id, args.customers, args.items_per_invoice,
+                      seed=args.seed, days=args.days, with_bills=args.with_bills)
+    if args.products:
+        print(f"Generating {args.products} products...")
+        generate_products(db, args.products, seed=args.seed)
+    db.cursor.execute("ANALYZE")
+    db.conn.commit()
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bulk reward tier recomputation on a large customer table
+
+Clears the stored tiers, runs tier_recompute once from scratch (every tier
+changes, so the write-back is at its largest) and once more in the steady
+state (nothing changes), and times the tier evaluation vectorized with NumPy
+against RewardSystem.get_reward_tier per row. The tier distribution is then
+read from the stored tiers and, for comparison, computed from live balances.
+
+    python benchmarks/synthetic_data.py --database tier_bench --customers 5000000 --invoices 0
+    python benchmarks/tier_benchmark.py --database tier_bench
+"""
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from models import BALANCE_SQL, Database
+from tier_recompute import DEFAULT_PAGE_SIZE, compute_tiers, load_balances, load_tiers, recompute_tiers
+from utils import RewardSystem
+from bench_utils import write_results
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Benchmark bulk reward tier recomputation")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Rows per UPDATE statement")
+    parser.add_argument("--skip-live", action="store_true", help="Skip the tier distribution from live balances")
+    parser.add_argument("--output", default="bench_tiers.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    db.setup_database()
+    results = {}
+
+    print("Clearing stored tiers...")
+    db.cursor.execute("UPDATE customers SET tier = NULL WHERE tier IS NOT NULL")
+    db.conn.commit()
+    db.conn.autocommit = True
+    db.cursor.execute("VACUUM customers")
+    db.conn.autocommit = False
+
+    first = recompute_tiers(db, args.page_size)
+    steady = recompute_tiers(db, args.page_size)
+    for name, stats in (("first run", first), ("steady state", steady)):
+        results[name] = {key: value for key, value in stats.items() if key != "distribution"}
+        print(f"{name:<13} {stats['customers']} customers, {stats['changed']} changed: "
+              f"load {stats['load_seconds']:.2f}s, compute {stats['compute_seconds']:.3f}s, "
+              f"write {stats['write_seconds']:.2f}s")
+
+    # Tier evaluation alone: vectorized against per row
+    names, minimums = load_tiers(db)
+    _, balances, _ = load_balances(db, names)
+    db.conn.commit()
+    _, vectorized = timed(compute_tiers, balances, minimums)
+    _, per_row = timed(lambda values: [RewardSystem.get_reward_tier(points) for points in values], balances.tolist())
+    results["evaluate"] = {"customers": len(balances), "numpy_seconds": vectorized, "per_row_seconds": per_row}
+    print(f"evaluate      numpy {vectorized * 1000:.1f} ms, per row {per_row * 1000:.1f} ms "
+          f"({per_row / max(vectorized, 1e-9):.0f}x)")
+
+    # Tier distribution: stored tiers against live balances
+    distribution, stored = timed(db.get_tier_distribution)
+    db.conn.commit()
+    results["distribution"] = {"stored_seconds": stored, "counts": {row["tier"]: row["customers"] for row in distribution}}
+    print(f"distribution  stored tiers {stored * 1000:.0f} ms: " +
+          ", ".join(f"{row['tier']} {row['customers']}" for row in distribution))
+    if not args.skip_live:
+        query = f"SELECT {RewardSystem.tier_sql(BALANCE_SQL)} AS tier, COUNT(*) FROM customers c GROUP BY 1"
+        _, live = timed(db.cursor.execute, query)
+        db.conn.commit()
+        results["distribution"]["live_seconds"] = live
+        print(f"distribution  live balances {live * 1000:.0f} ms")
+
+    write_results(args.output, "reward_tiers", results, {"customers": first["customers"], "page_size": args.page_size})
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Accuracy and cost of the streaming top-selling items tracker against exact SQL
+
+Streams every invoice line of a date range through a TopItemsTracker in
+time order, as checkouts would arrive. At the end of each day the tracker's
+top N for the day and for its last hour are compared with the exact GROUP BY
+over the same lines: how many of the true top N it reports, the largest
+overestimate against its bound (total / capacity), and whether the reported
+order is exact. Also times tracker updates, top N reads and the SQL query.
+
+    python benchmarks/synthetic_data.py --database cube_bench --customers 100000 --invoices 2000000
+    python benchmarks/top_items_benchmark.py --database cube_bench --from 2024-03-01 --to 2024-03-31
+"""
+
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Database
+from top_items import DEFAULT_CAPACITY, TopItemsTracker
+from bench_utils import measure, write_results, print_results
+
+EXACT_TOP_SQL = """
+    SELECT items.name, SUM(quantity) AS quantity FROM invoice_items
+    JOIN items ON items.id = invoice_items.item_id
+    WHERE created_at >= %s AND created_at < %s
+    GROUP BY items.name ORDER BY quantity DESC, items.name LIMIT %s
+"""
+
+
+def compare(db, rows, start, end, n):
+    """Recall, exact order and overestimates of tracker rows against SQL for start..end"""
+    db.cursor.execute(EXACT_TOP_SQL, (start, end, n))
+    exact = db.cursor.fetchall()
+    db.conn.commit()
+    if not exact:
+        return None
+    db.cursor.execute(
+        "SELECT items.name, SUM(quantity) FROM invoice_items JOIN items ON items.id = invoice_items.item_id "
+        "WHERE created_at >= %s AND created_at < %s AND items.name = ANY(%s) GROUP BY items.name",
+        (start, end, [row["name"] for row in rows])
+    )
+    true = dict(db.cursor.fetchall())
+    db.conn.commit()
+    return {
+        "recall": len({name for name, _ in exact} & {row["name"] for row in rows}) / len(exact),
+        "same_order": [name for name, _ in exact] == [row["name"] for row in rows],
+        "overestimate": max(row["quantity"] - true.get(row["name"], 0) for row in rows),
+        "within_bound": all(0 <= row["quantity"] - true.get(row["name"], 0) <= row["error"] for row in rows),
+        "guaranteed": sum(row["guaranteed"] for row in rows)
+    }
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Validate the top items tracker against SQL")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--from", dest="start", default="2024-03-01", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default="2024-03-31", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="Counters per sketch")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default="bench_top_items.json")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    stream = Database(db_config)
+    first = datetime.strptime(args.start, "%Y-%m-%d")
+    last = datetime.strptime(args.end, "%Y-%m-%d") + timedelta(days=1)
+
+    tracker = TopItemsTracker(capacity=args.capacity, source="benchmark")
+    cursor = stream.conn.cursor(name="top_items_stream")  # Server-side: lines arrive in batches
+    cursor.itersize = 20000
+    cursor.execute("SELECT created_at, items.name, quantity FROM invoice_items "
+                   "JOIN items ON items.id = invoice_items.item_id "
+                   "WHERE created_at >= %s AND created_at < %s ORDER BY created_at", (first, last))
+
+    checks = {"day": [], "hour": []}
+    update_seconds = 0.0
+    lines = 0
+    day = first
+
+    def check_day():
+        now = day + timedelta(days=1) - timedelta(microseconds=1)
+        for window, start, length in (("day", day, timedelta(days=1)),
+                                      ("hour", now.replace(minute=0, second=0, microsecond=0), timedelta(hours=1))):
+            result = compare(db, tracker.top(args.top, window, now=now), start, start + length, args.top)
+            if result:
+                checks[window].append(result)
+
+    for created_at, name, quantity in cursor:
+        while created_at >= day + timedelta(days=1):
+            check_day()
+            day += timedelta(days=1)
+        start = time.perf_counter()
+        tracker.record(({"name": name, "quantity": quantity},), created_at)
+        update_seconds += time.perf_counter() - start
+        lines += 1
+    check_day()
+    stream.conn.rollback()
+    stream.close()
+
+    results = {
+        "tracker top N": measure(lambda: tracker.top(args.top, "day", now=day), [()] * 1000),
+        "sql top N, one day": measure(
+            lambda: (db.cursor.execute(EXACT_TOP_SQL, (day, day + timedelta(days=1), args.top)), db.conn.commit()),
+            [()] * 20
+        )
+    }
+    db.close()
+
+    print(f"\n{lines} lines, {args.start} to {args.end}, capacity {args.capacity}, top {args.top}")
+    print_results(results)
+    results["updates"] = {"lines": lines, "seconds": round(update_seconds, 3),
+                          "lines_per_sec": round(lines / update_seconds, 1) if update_seconds else 0.0}
+    print(f"tracker updates: {results['updates']['lines_per_sec']:.0f} lines/s")
+    accuracy = {}
+    for window, rows in checks.items():
+        accuracy[window] = {
+            "windows": len(rows),
+            "mean_recall": round(sum(row["recall"] for row in rows) / len(rows), 4),
+            "exact_order": sum(row["same_order"] for row in rows),
+            "max_overestimate": max(row["overestimate"] for row in rows),
+            "within_bound": all(row["within_bound"] for row in rows),
+            "mean_guaranteed": round(sum(row["guaranteed"] for row in rows) / len(rows), 2)
+        }
+        print(f"{window:<5} {len(rows)} windows: recall {accuracy[window]['mean_recall']:.3f}, "
+              f"exact order in {accuracy[window]['exact_order']}, largest overestimate "
+              f"{accuracy[window]['max_overestimate']} ({'within' if accuracy[window]['within_bound'] else 'OUTSIDE'} "
+              f"its error bound), {accuracy[window]['mean_guaranteed']:.1f} of {args.top} certain on average")
+    results["accuracy"] = accuracy
+    write_results(args.output, "top_items", results,
+                  {"database": db_config.get("database"), "lines": lines, "capacity": args.capacity})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# birthdays.py - Birthday promotion lists, and the conversion of customers.dob from text to DATE
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    from config import DB_CONFIG
+    from models import DOB_BATCH_SIZE, Database
+
+    parser = argparse.ArgumentParser(description="List customer birthdays, or convert text dates of birth to DATE")
+    parser.add_argument("command", choices=["migrate", "status", "list"])
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--batch-size", type=int, default=DOB_BATCH_SIZE, help="Customers parsed per transaction")
+    parser.add_argument("--from", dest="start", help="First day of the list (YYYY-MM-DD, defaults to today)")
+    parser.add_argument("--to", dest="end", help="Last day of the list (YYYY-MM-DD, defaults to a week from --from)")
+    parser.add_argument("--limit", type=int, help="At most this many customers")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    try:
+        if args.command == "list":
+            start = date.fromisoformat(args.start) if args.start else date.today()
+            end = date.fromisoformat(args.end) if args.end else start + timedelta(days=6)
+            for customer in db.get_birthdays(start, end, args.limit):
+                print(f"{customer['birthday']:%d/%m} {customer['name']} ({customer['mobile']}) "
+                      f"turns {customer['age']}, {customer['points']} points")
+            return
+
+        if args.command == "status":
+            print("customers.dob is still text; run `python birthdays.py migrate`" if db.customer_dobs_pending()
+                  else "customers.dob is a DATE")
+            return
+
+        if not db.customer_dobs_pending():
+            print("customers.dob is already a DATE")
+            return
+        # Adds customers.dob_date and the trigger that fills it, leaving existing customers to the loop below
+        db.setup_database(backfill=False)
+        start = time.perf_counter()
+        after = 0
+        parsed = unparsed = 0
+        while True:
+            batch = db.parse_customer_dobs(after, args.batch_size)
+            if batch is None:
+                raise SystemExit(f"Parsing the dates of birth of customers after id {after} failed")
+            last_id, batch_parsed, batch_unparsed = batch
+            if last_id is None:
+                break
+            after = last_id
+            parsed += batch_parsed
+            unparsed += batch_unparsed
+            print(f"Up to customer {after}: {parsed} parsed, {unparsed} not DD/MM/YYYY")
+        cleared = db.convert_customer_dobs()
+        if cleared is None:
+            raise SystemExit("Could not make customers.dob a DATE")
+        print(f"Converted the dates of birth of {parsed} customers in {time.perf_counter() - start:.1f}s"
+              + (f", clearing {cleared} that were not DD/MM/YYYY (kept in dob_unparsed)" if cleared else ""))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
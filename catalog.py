@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# catalog.py - In-memory product catalog indexed by barcode, SKU and name prefix
+
+import argparse
+import bisect
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Channel Database notifies when products change; the payload is a SKU, or
+# RELOAD_ALL after a bulk import
+PRODUCTS_CHANNEL = "product_changes"
+RELOAD_ALL = "*"
+
+
+class ProductCatalog:
+    def __init__(self):
+        """Every active product, indexed so adding an item to a cart needs no database round trip
+
+        products maps SKU to (sku, barcode, name, price) and codes maps every
+        SKU and barcode to its SKU, so lookup() is two dict probes. names
+        is the sorted list of (lowercase name, sku) that search() bisects
+        for a name prefix. load() builds fresh indexes and swaps them in;
+        refresh() updates single products in place when a CacheListener
+        hears they changed.
+        """
+        self.products = {}
+        self.codes = {}
+        self.names = []
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.products)
+
+    def load(self, db):
+        """Replace the catalog with every active product; returns the count, or None on error"""
+        rows = db.get_products()
+        if rows is None:
+            return None
+        products, codes = {}, {}
+        for row in rows:
+            sku, barcode = row[0], row[1]
+            products[sku] = row
+            codes[sku] = sku
+            if barcode:
+                codes[barcode] = sku
+        names = sorted((row[2].lower(), row[0]) for row in rows)
+        with self._lock:
+            self.products, self.codes, self.names = products, codes, names
+            self.loaded_at = time.time()
+        return len(products)
+
+    def refresh(self, db, skus):
+        """Reload the given SKUs (all products if skus is None); False if the query failed"""
+        if skus is None:
+            return self.load(db) is not None
+        skus = list(skus)
+        rows = db.get_products(skus)
+        if rows is None:
+            return False
+        self.apply(rows, skus)
+        return True
+
+    def apply(self, rows, skus):
+        """Update skus in place: those with a row in rows are added or changed, the rest removed
+
+        A changed product's new entries are in place before its old ones go,
+        so lookup(), which takes no lock, never misses it mid-update.
+        """
+        current = {row[0]: row for row in rows}
+        with self._lock:
+            for sku in skus:
+                old = self.products.get(sku)
+                row = current.get(sku)
+                if row is not None:
+                    self.products[sku] = row
+                    self.codes[sku] = sku
+                    if row[1]:
+                        self.codes[row[1]] = sku
+                    if old is None or old[2] != row[2]:
+                        bisect.insort(self.names, (row[2].lower(), sku))
+                else:
+                    self.products.pop(sku, None)
+                if old is not None:
+                    self._unindex(old, row)
+
+    def _unindex(self, old, row):
+        """Drop the index entries of old that its replacement row (None if removed) no longer has"""
+        sku, barcode, name = old[0], old[1], old[2]
+        if row is None and self.codes.get(sku) == sku:
+            del self.codes[sku]
+        if barcode and (row is None or row[1] != barcode) and self.codes.get(barcode) == sku:
+            del self.codes[barcode]
+        if row is None or row[2] != name:
+            key = (name.lower(), sku)
+            index = bisect.bisect_left(self.names, key)
+            if index < len(self.names) and self.names[index] == key:
+                del self.names[index]
+
+    def lookup(self, code):
+        """The product with this barcode or SKU as a dict, or None"""
+        sku = self.codes.get(code)
+        row = self.products.get(sku) if sku is not None else None
+        if row is None:
+            return None
+        return {"sku": row[0], "barcode": row[1], "name": row[2], "price": row[3]}
+
+    def search(self, prefix, limit=10):
+        """Products whose name starts with prefix (case-insensitive), by name"""
+        prefix = prefix.lower()
+        results = []
+        with self._lock:
+            index = bisect.bisect_left(self.names, (prefix,))
+            while index < len(self.names) and len(results) < limit:
+                name, sku = self.names[index]
+                if not name.startswith(prefix):
+                    break
+                row = self.products[sku]
+                results.append({"sku": row[0], "barcode": row[1], "name": row[2], "price": row[3]})
+                index += 1
+        return results
+
+
+def main():
+    from config import DB_CONFIG
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Look up products in the catalog")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("code", nargs="?", help="Barcode or SKU")
+    parser.add_argument("--search", help="Name prefix")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    try:
+        catalog = ProductCatalog()
+        start = time.perf_counter()
+        print(f"Loaded {catalog.load(db)} products in {time.perf_counter() - start:.2f}s")
+        if args.search:
+            products = catalog.search(args.search)
+        else:
+            products = [product for product in [catalog.lookup(args.code or "")] if product]
+            if args.code and not products:
+                print(f"No product with barcode or SKU {args.code}")
+        for product in products:
+            print(f"{product['sku']:<16} {product['barcode'] or '':<15} {product['name']:<40} {product['price']:>10.2f}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
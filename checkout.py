@@ -0,0 +1,443 @@
+# checkout.py - Headless checkout engine shared by the Tk UI and other front ends
+
+import itertools
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+from utils import Validator, RewardSystem, PriceFormatter, BillStorage, RenderCache
+
+
+class CheckoutError(Exception):
+    """Raised when a checkout request is invalid"""
+
+
+class CheckoutSession:
+    def __init__(self, engine, session_id):
+        """Create an empty checkout session (one lane, kiosk or handheld)"""
+        self.engine = engine
+        self.session_id = session_id
+        self.cart = []
+        self.customer_info = {"name": "", "mobile": "", "dob": "", "email": ""}
+        self.lock = threading.RLock()
+
+    def add_item(self, name, quantity, price, sku=None):
+        """Validate and add an item to the cart"""
+        name = str(name).strip()
+        if not name:
+            raise CheckoutError("Item name cannot be empty")
+
+        try:
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise CheckoutError("Quantity must be a valid number")
+        if quantity <= 0:
+            raise CheckoutError("Quantity must be a positive number")
+
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            raise CheckoutError("Price must be a valid number")
+        if price <= 0:
+            raise CheckoutError("Price must be a positive number")
+
+        item = {
+            "name": name,
+            "quantity": quantity,
+            "price": price,
+            "total": quantity * price
+        }
+        if sku:
+            item["sku"] = sku
+        with self.lock:
+            self.cart.append(item)
+        return item
+
+    def add_product(self, code, quantity=1):
+        """Add a catalog product by barcode or SKU, priced from the in-memory catalog"""
+        product = self.engine.lookup_product(code)
+        if product is None:
+            raise CheckoutError(f"No product with barcode or SKU {code}")
+        return self.add_item(product["name"], quantity, product["price"], sku=product["sku"])
+
+    def reset_cart(self):
+        """Remove all items from the cart"""
+        with self.lock:
+            self.cart = []
+
+    def set_customer(self, name, mobile, dob="", email=""):
+        """Validate and attach customer information to the session"""
+        name, mobile, dob, email = (str(v or "").strip() for v in (name, mobile, dob, email))
+
+        for valid, message in (
+            Validator.validate_name(name),
+            Validator.validate_mobile(mobile),
+            Validator.validate_date(dob),
+            Validator.validate_email(email)
+        ):
+            if not valid:
+                raise CheckoutError(message)
+
+        with self.lock:
+            self.customer_info = {"name": name, "mobile": mobile, "dob": dob, "email": email}
+        return dict(self.customer_info)
+
+    def clear_customer(self):
+        """Detach customer information from the session"""
+        with self.lock:
+            self.customer_info = {"name": "", "mobile": "", "dob": "", "email": ""}
+
+    def quote(self):
+        """Price the cart with reward discounts and render the bill"""
+        with self.lock:
+            if not self.cart:
+                raise CheckoutError("The cart is empty")
+            cart = [item.copy() for item in self.cart]
+            customer_info = dict(self.customer_info)
+
+        customer = None
+        if customer_info["mobile"]:
+            customer = self.engine.lookup_customer(customer_info["mobile"])
+
+        return self.engine.price(cart, customer_info, customer)
+
+    def checkout(self, bill_content=None):
+        """Price the cart, accrue reward points and record the invoice
+
+        The session is reset afterwards. Returns the invoice dictionary.
+        """
+        with self.lock:
+            if not self.cart:
+                raise CheckoutError("The cart is empty")
+            cart = [item.copy() for item in self.cart]
+            customer_info = dict(self.customer_info)
+
+            invoice = self.engine.record_checkout(cart, customer_info, bill_content)
+
+            self.cart = []
+            self.clear_customer()
+        return invoice
+
+
+class CheckoutEngine:
+    def __init__(self, db, email_service=None, bill_storage="zlib", journal=None, top_items=None,
+                 sales_counters=None, customer_cache=None, catalog=None, max_invoices=1000):
+        """Create the engine
+
+        db may be a Database (single-threaded use, e.g. behind the Tk
+        worker thread) or a DatabasePool when sessions run concurrently.
+        bill_storage (see BillStorage.MODES) sets how stored invoices keep
+        their bill text; get_bill returns it either way.
+        With a local_journal.CheckoutJournal, checkouts are committed to the
+        journal without a server round trip and replayed later by a
+        JournalSyncer; customers are priced from their last known balance.
+        top_items is an optional top_items.TopItemsTracker counting every
+        checkout's items, and sales_counters an optional
+        sales_counters.SalesCounters adding up every checkout's amounts.
+        With a customer_cache.CustomerCache, customer lookups and autocomplete
+        suggestions are served from it (a CacheListener keeps it coherent).
+        catalog is the catalog.ProductCatalog that add_product looks items up in.
+        Only the last max_invoices invoices are kept for get_invoice, get_bill
+        and send_bill; older ones are read from the database (see
+        Database.get_invoices_by_mobile) once the journal has replayed them.
+        """
+        if bill_storage not in BillStorage.MODES:
+            raise ValueError(f"Unknown bill storage mode: {bill_storage}")
+        self.db = db
+        self.email_service = email_service
+        self.journal = journal
+        self.top_items = top_items
+        self.sales_counters = sales_counters
+        self.customer_cache = customer_cache
+        self.catalog = catalog
+        self.bill_storage = bill_storage
+        self.bill_cache = RenderCache(64)
+        self.sessions = {}
+        self.max_invoices = max_invoices
+        self.invoices = {}  # invoice id -> invoice, oldest first, shared by all sessions
+        self._invoices_by_mobile = {}  # customer mobile -> deque of its kept invoice ids, oldest first
+        self._bills = {}  # kept invoice id -> compressed bill text (bill_storage "zlib")
+        self._session_ids = itertools.count(1)
+        self._invoice_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def open_session(self):
+        """Start a new checkout session"""
+        with self._lock:
+            session = CheckoutSession(self, next(self._session_ids))
+            self.sessions[session.session_id] = session
+        return session
+
+    def get_session(self, session_id):
+        """Return an open session by id"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise CheckoutError(f"Unknown session: {session_id}")
+        return session
+
+    def close_session(self, session_id):
+        """Discard a session and its cart"""
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def lookup_customer(self, mobile):
+        """Get a customer by mobile, from the journal's cache if the server has no answer"""
+        if self.journal is None:
+            return self._get_customer(mobile)
+
+        try:
+            customer = self._get_customer(mobile)
+        except Exception as e:
+            print(f"Database error: {e}")
+            customer = None
+
+        if customer:
+            self.journal.remember_customer(customer)
+            return customer
+        return self.journal.cached_customer(mobile)
+
+    def _get_customer(self, mobile):
+        if self.customer_cache is None:
+            return self.db.get_customer_by_mobile(mobile)
+        return self.customer_cache.customer(mobile, self.db.get_customer_by_mobile)
+
+    def _invalidate_customer(self, mobile, details=False):
+        """Drop this process's cached copy now rather than when the notification arrives"""
+        if self.customer_cache is not None and mobile:
+            self.customer_cache.invalidate(mobile, details)
+
+    def price(self, cart, customer_info, customer):
+        """Compute totals, reward tier and bill text for a cart"""
+        subtotal = sum(item["total"] for item in cart)
+
+        # Get reward tier and discount if customer exists
+        discount = 0
+        reward_tier = "None"
+        if customer:
+            reward_tier = RewardSystem.get_reward_tier(customer["points"])
+            discount = subtotal * RewardSystem.get_discount_percentage(reward_tier)
+
+        final_amount = subtotal - discount
+
+        bill = PriceFormatter.format_bill(
+            cart,
+            subtotal,
+            discount,
+            final_amount,
+            customer_info.get("name", ""),
+            customer_info.get("mobile", ""),
+            reward_tier
+        )
+
+        return {
+            "items": cart,
+            "subtotal": subtotal,
+            "discount": discount,
+            "final": final_amount,
+            "reward_tier": reward_tier,
+            "customer": customer,
+            "bill": bill
+        }
+
+    def record_checkout(self, cart, customer_info, bill_content=None):
+        """Apply rewards for a priced cart and store the invoice
+
+        Returns the invoice including its bill_content.
+        """
+        customer_mobile = customer_info.get("mobile", "")
+        customer_name = customer_info.get("name", "")
+        customer_email = customer_info.get("email", "")
+
+        customer = None
+        accrual = None
+        if self.journal is not None:
+            # Local-first: price from the last known balance, accrue when the journal is replayed
+            if customer_mobile:
+                customer = self.journal.cached_customer(customer_mobile) or self.lookup_customer(customer_mobile)
+            quote = self.price(cart, customer_info, customer)
+            if customer:
+                earned = RewardSystem.calculate_points(quote["final"])
+                points = customer["points"] + earned
+                accrual = {"points_earned": earned, "points": points, "tier": RewardSystem.get_reward_tier(points)}
+                self.journal.remember_customer(dict(customer, points=points))
+        else:
+            # One atomic round trip: discount from the current balance, then accrue points
+            if customer_mobile:
+                accrual = self.db.accrue_points(customer_mobile, sum(item["total"] for item in cart))
+                self._invalidate_customer(customer_mobile)
+                if accrual:
+                    # Price with the tier the customer had before this purchase
+                    customer = dict(accrual, mobile=customer_mobile, points=accrual["previous_points"])
+
+            quote = self.price(cart, customer_info, customer)
+
+        if customer:
+            # Fill in customer details from the database if needed
+            customer_name = customer_name or customer.get("name", "")
+            customer_email = customer_email or customer.get("email", "")
+
+        created_at = datetime.now()
+        invoice = {
+            "id": None,
+            "date": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "customer_name": customer_name,
+            "customer_mobile": customer_mobile,
+            "customer_email": customer_email,
+            "subtotal": quote["subtotal"],
+            "discount": quote["discount"],
+            "total": quote["final"],
+            "items": cart,
+            "reward_tier_applied": quote["reward_tier"],
+            "points_earned": accrual["points_earned"] if accrual else 0,
+            "points_balance": accrual["points"] if accrual else None,
+            "reward_tier": accrual["tier"] if accrual else None
+        }
+
+        bill = bill_content or quote["bill"]
+        if self.journal is not None:
+            invoice["invoice_key"] = uuid.uuid4().hex
+            self.journal.record({
+                "invoice_key": invoice["invoice_key"],
+                "created_at": created_at.isoformat(sep=" "),
+                "customer_mobile": customer_mobile,
+                "subtotal": quote["subtotal"],
+                "discount": quote["discount"],
+                "final": quote["final"],
+                "items": cart,
+                "bill_content": bill,
+                "points_earned": invoice["points_earned"]
+            })
+
+        with self._lock:
+            invoice["id"] = next(self._invoice_ids)
+            if self.bill_storage == "text":
+                invoice["bill_content"] = bill
+            elif self.bill_storage == "zlib":
+                self._bills[invoice["id"]] = BillStorage.compress(bill)
+            self.invoices[invoice["id"]] = invoice
+            self._invoices_by_mobile.setdefault(customer_mobile, deque()).append(invoice["id"])
+            while len(self.invoices) > self.max_invoices:
+                self._evict_oldest_invoice()
+        if self.top_items is not None:
+            self.top_items.record(cart, created_at)
+        if self.sales_counters is not None:
+            self.sales_counters.record(invoice, created_at)
+        return dict(invoice, bill_content=bill)
+
+    def _evict_oldest_invoice(self):
+        """Forget the oldest kept invoice and its compressed bill (the caller holds the lock)"""
+        invoice = self.invoices.pop(next(iter(self.invoices)))
+        self._bills.pop(invoice["id"], None)
+        mobile = invoice["customer_mobile"]
+        invoice_ids = self._invoices_by_mobile[mobile]
+        invoice_ids.popleft()
+        if not invoice_ids:
+            del self._invoices_by_mobile[mobile]
+
+    def get_bill(self, invoice_id):
+        """Return the bill text of a stored invoice, re-rendering it if not kept"""
+        invoice = self.get_invoice(invoice_id)
+        if invoice is None:
+            raise CheckoutError(f"Unknown invoice: {invoice_id}")
+        if "bill_content" in invoice:
+            return invoice["bill_content"]
+
+        bill = self.bill_cache.get(invoice_id)
+        if bill is None:
+            if invoice_id in self._bills:
+                bill = BillStorage.decompress(self._bills[invoice_id])
+            else:
+                bill = PriceFormatter.format_bill(
+                    invoice["items"],
+                    invoice["subtotal"],
+                    invoice["discount"],
+                    invoice["total"],
+                    invoice["customer_name"],
+                    invoice["customer_mobile"],
+                    invoice["reward_tier_applied"]
+                )
+            self.bill_cache.put(invoice_id, bill)
+        return bill
+
+    def save_customer(self, name, mobile, dob="", email=""):
+        """Validate and store a customer, returning the customer id"""
+        for valid, message in (
+            Validator.validate_name(name),
+            Validator.validate_mobile(mobile),
+            Validator.validate_date(dob),
+            Validator.validate_email(email)
+        ):
+            if not valid:
+                raise CheckoutError(message)
+        customer_id = self.db.save_customer(name, mobile, dob, email)
+        self._invalidate_customer(mobile, details=True)
+        return customer_id
+
+    def get_invoice(self, invoice_id):
+        """Return a kept invoice by id, None if unknown or no longer kept"""
+        return self.invoices.get(invoice_id)
+
+    def get_invoices_by_mobile(self, mobile):
+        """Get kept invoices for a mobile number, newest first"""
+        with self._lock:
+            invoice_ids = reversed(self._invoices_by_mobile.get(mobile, ()))
+            matching_invoices = [self.invoices[invoice_id] for invoice_id in invoice_ids]
+        matching_invoices.sort(key=lambda x: x["date"], reverse=True)
+        return matching_invoices
+
+    def can_email(self, invoice):
+        """Return True if the invoice can be sent by email"""
+        return bool(
+            invoice.get("customer_email")
+            and self.email_service is not None
+            and self.email_service.is_configured
+        )
+
+    def send_bill(self, invoice_id, attach_pdf=False):
+        """Email a stored invoice to its customer, optionally as an attached PDF"""
+        invoice = self.get_invoice(invoice_id)
+        if invoice is None:
+            raise CheckoutError(f"Unknown invoice: {invoice_id}")
+        if not self.can_email(invoice):
+            return False
+
+        if attach_pdf:
+            from pdf_invoice import render_invoice_pdf
+            return self.email_service.send_bill_with_pdf(
+                invoice["customer_email"],
+                invoice["customer_name"],
+                self.get_bill(invoice_id),
+                invoice["id"],
+                render_invoice_pdf(invoice)
+            )
+        return self.email_service.send_bill(
+            invoice["customer_email"],
+            invoice["customer_name"],
+            self.get_bill(invoice_id),
+            invoice["id"]
+        )
+
+    def lookup_product(self, code):
+        """A product by barcode or SKU, or None (without a catalog there are no products)"""
+        if self.catalog is None:
+            return None
+        return self.catalog.lookup(str(code).strip())
+
+    def search_products(self, prefix, limit=10):
+        """Catalog products whose name starts with prefix"""
+        if self.catalog is None:
+            return []
+        return self.catalog.search(prefix, limit)
+
+    def get_customer_name_suggestions(self, prefix):
+        """Get customer name suggestions for autocomplete"""
+        if self.customer_cache is None:
+            return self.db.search_customers_by_name(prefix)
+        return self.customer_cache.suggestions("name", prefix, self.db.search_customers_by_name)
+
+    def get_customer_mobile_suggestions(self, prefix):
+        """Get customer mobile suggestions for autocomplete"""
+        if self.customer_cache is None:
+            return self.db.search_customers_by_mobile(prefix)
+        return self.customer_cache.suggestions("mobile", prefix, self.db.search_customers_by_mobile)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# checkout_service.py - Local HTTP/JSON checkout service shared by several lanes
+
+import argparse
+import asyncio
+import json
+import re
+import socket
+import sys
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlsplit, parse_qs
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import ProductCatalog
+from checkout import CheckoutEngine, CheckoutError
+from customer_cache import CacheListener, CustomerCache
+from db_metrics import QueryMetrics
+from db_pool import DatabasePool
+from parallel_report import DEFAULT_SHARDS, MAX_SHARDS, generate_sales_report_parallel, to_datetime
+from points_rollup import PointsRollup
+from top_items import WINDOWS, TopItemsTracker, store_top_items
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """Raised by a route to return an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json(value):
+    """Convert database values that json cannot encode"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+class CheckoutService:
+    def __init__(self, engine, max_workers=10):
+        """Expose a CheckoutEngine over HTTP
+
+        Database work is blocking, so each request runs its engine call on a
+        thread pool sized like the database pool while the event loop keeps
+        serving other lanes.
+        """
+        self.engine = engine
+        self.workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="checkout")
+        # Shard queries of all sales reports together use at most half the pool, leaving the rest to checkouts
+        pool_size = getattr(engine.db, "max_connections", max_workers)
+        self.report_slots = threading.BoundedSemaphore(max(1, pool_size // 2))
+        self.routes = [
+            ("POST", r"/sessions", self.open_session),
+            ("DELETE", r"/sessions/(\d+)", self.close_session),
+            ("POST", r"/sessions/(\d+)/items", self.add_item),
+            ("POST", r"/sessions/(\d+)/customer", self.set_customer),
+            ("GET", r"/sessions/(\d+)/bill", self.calculate_bill),
+            ("POST", r"/sessions/(\d+)/checkout", self.save_invoice),
+            ("GET", r"/invoices/(\d+)/bill", self.get_bill),
+            ("GET", r"/customers/(\d+)", self.get_customer),
+            ("GET", r"/products", self.search_products),
+            ("GET", r"/products/([^/]+)", self.get_product),
+            ("GET", r"/autocomplete/names", self.name_suggestions),
+            ("GET", r"/autocomplete/mobiles", self.mobile_suggestions),
+            ("GET", r"/reports/sales", self.sales_report),
+            ("GET", r"/reports/top-items", self.top_items),
+            ("GET", r"/metrics", self.query_metrics),
+        ]
+
+    # Routes (run on the worker threads)
+
+    def open_session(self, body, query):
+        session = self.engine.open_session()
+        return 201, {"session_id": session.session_id}
+
+    def close_session(self, body, query, session_id):
+        self.engine.close_session(int(session_id))
+        return 200, {"closed": True}
+
+    def add_item(self, body, query, session_id):
+        session = self.engine.get_session(int(session_id))
+        if body.get("code"):
+            item = session.add_product(body["code"], body.get("quantity", 1))
+        else:
+            item = session.add_item(body.get("name", ""), body.get("quantity"), body.get("price"))
+        return 201, {"item": item, "items": len(session.cart)}
+
+    def set_customer(self, body, query, session_id):
+        session = self.engine.get_session(int(session_id))
+        customer = session.set_customer(body.get("name"), body.get("mobile"), body.get("dob"), body.get("email"))
+        return 200, {"customer": customer}
+
+    def calculate_bill(self, body, query, session_id):
+        return 200, self.engine.get_session(int(session_id)).quote()
+
+    def save_invoice(self, body, query, session_id):
+        invoice = self.engine.get_session(int(session_id)).checkout(body.get("bill_content"))
+        return 201, {"invoice": invoice}
+
+    def get_bill(self, body, query, invoice_id):
+        return 200, {"bill": self.engine.get_bill(int(invoice_id))}
+
+    def get_customer(self, body, query, mobile):
+        customer = self.engine.lookup_customer(mobile)
+        if customer is None:
+            raise HTTPError(404, f"No customer with mobile {mobile}")
+        return 200, {"customer": customer}
+
+    def get_product(self, body, query, code):
+        product = self.engine.lookup_product(code)
+        if product is None:
+            raise HTTPError(404, f"No product with barcode or SKU {code}")
+        return 200, {"product": product}
+
+    def search_products(self, body, query):
+        prefix = query.get("prefix", [""])[0]
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            raise HTTPError(400, "limit must be a number")
+        return 200, {"products": self.engine.search_products(prefix, limit)}
+
+    def name_suggestions(self, body, query):
+        prefix = query.get("prefix", [""])[0]
+        return 200, {"suggestions": self.engine.get_customer_name_suggestions(prefix)}
+
+    def mobile_suggestions(self, body, query):
+        prefix = query.get("prefix", [""])[0]
+        return 200, {"suggestions": self.engine.get_customer_mobile_suggestions(prefix)}
+
+    def sales_report(self, body, query):
+        try:
+            start, end = to_datetime(query["from"][0]), to_datetime(query["to"][0])
+            shards = int(query.get("shards", [DEFAULT_SHARDS])[0])
+        except (KeyError, ValueError):
+            raise HTTPError(400, "from and to (YYYY-MM-DD[ HH:MM:SS]) are required")
+        if not 1 <= shards <= MAX_SHARDS:
+            raise HTTPError(400, f"shards must be from 1 to {MAX_SHARDS}")
+        report = generate_sales_report_parallel(self.engine.db, start, end, shards, slots=self.report_slots)
+        if report is None:
+            raise HTTPError(500, "Sales report failed")
+        return 200, {"report": report}
+
+    def top_items(self, body, query):
+        window = query.get("window", ["day"])[0]
+        if window not in WINDOWS:
+            raise HTTPError(400, f"window must be one of {', '.join(WINDOWS)}")
+        try:
+            n = int(query.get("n", [5])[0])
+        except ValueError:
+            raise HTTPError(400, "n must be a number")
+        if query.get("scope", ["service"])[0] == "store":
+            return 200, {"items": store_top_items(self.engine.db, n, window)}
+        if self.engine.top_items is None:
+            raise HTTPError(404, "Top items are not tracked by this service")
+        return 200, {"items": self.engine.top_items.top(n, window)}
+
+    def query_metrics(self, body, query):
+        metrics = getattr(self.engine.db, "metrics", None)
+        if metrics is None:
+            raise HTTPError(404, "Query metrics are not enabled (start with --metrics)")
+        return 200, metrics.snapshot()
+
+    # HTTP plumbing (runs on the event loop)
+
+    def dispatch(self, method, target, body):
+        """Find and run the route for a request"""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        path_matched = False
+
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if not match:
+                continue
+            path_matched = True
+            if route_method == method:
+                return handler(body, query, *match.groups())
+
+        if path_matched:
+            raise HTTPError(405, f"{method} not allowed on {url.path}")
+        raise HTTPError(404, f"No route for {url.path}")
+
+    async def handle_connection(self, reader, writer):
+        """Serve keep-alive HTTP/1.1 requests from one client"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Malformed request line"}, close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                # Without a valid length the body cannot be skipped, so the connection is closed
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.respond(writer, 400, {"error": "Invalid Content-Length"}, close=True)
+                    break
+                raw_body = await reader.readexactly(length) if length else b""
+                close = headers.get("connection", "").lower() == "close"
+
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    if not isinstance(body, dict):
+                        raise HTTPError(400, "The request body must be a JSON object")
+                    status, payload = await loop.run_in_executor(self.workers, self.dispatch, method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (CheckoutError, json.JSONDecodeError, UnicodeDecodeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    print(f"Service error: {e}")
+                    status, payload = 500, {"error": str(e)}
+
+                await self.respond(writer, status, payload, close=close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, close=False):
+        """Write a JSON response"""
+        data = json.dumps(payload, default=to_json).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Run the service until cancelled"""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Checkout service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Run the local checkout service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=10, help="Number of database connections")
+    parser.add_argument("--metrics", help="Record query metrics and write them here on exit (.json or .prom)")
+    parser.add_argument("--slow-query-log", help="Append statements slower than --slow-query-ms to this file")
+    parser.add_argument("--slow-query-ms", type=float, default=100)
+    parser.add_argument("--replica", action="append", default=[], metavar="DSN",
+                        help="Send reads to this streaming replica (repeatable)")
+    parser.add_argument("--max-replica-lag", type=float, default=5.0,
+                        help="Seconds a replica may lag before reads fall back to the primary")
+    parser.add_argument("--bill-storage", choices=("zlib", "text", "none"), default="zlib",
+                        help="How invoice bill text is kept (none re-renders it from the items)")
+    parser.add_argument("--rollup-interval", type=float, default=60,
+                        help="Seconds between folding the points ledger into balances (0 to disable)")
+    parser.add_argument("--top-items-interval", type=float, default=30,
+                        help="Seconds between checkpoints of the top-selling items sketches (0 to disable)")
+    parser.add_argument("--customer-cache-ttl", type=float, default=300,
+                        help="Seconds to cache customers and suggestions, invalidated on change by NOTIFY (0 to disable)")
+    args = parser.parse_args()
+
+    metrics = None
+    if args.metrics or args.slow_query_log:
+        metrics = QueryMetrics(slow_query_ms=args.slow_query_ms, slow_query_log=args.slow_query_log)
+
+    pool = DatabasePool(DB_CONFIG, max_connections=args.pool_size, metrics=metrics,
+                        replicas=args.replica, max_replica_lag=args.max_replica_lag,
+                        bill_storage=args.bill_storage)
+    pool.setup_database()
+    top_items = TopItemsTracker(source=f"{socket.gethostname()}:{args.port}")
+    top_items.restore(pool)
+    customer_cache = None
+    if args.customer_cache_ttl > 0:
+        customer_cache = CustomerCache(ttl=args.customer_cache_ttl,
+                                       replica_lag=args.max_replica_lag if args.replica else 0.0)
+    # The listener loads the product catalog, then keeps it and the customer cache up to date
+    catalog = ProductCatalog()
+    listener = CacheListener(customer_cache, DB_CONFIG, catalog=catalog)
+    listener.start()
+    listener.connected.wait(60)
+    engine = CheckoutEngine(pool, bill_storage=args.bill_storage, top_items=top_items, customer_cache=customer_cache,
+                            catalog=catalog)
+    service = CheckoutService(engine, max_workers=args.pool_size)
+    if args.top_items_interval > 0:
+        top_items.start(pool, args.top_items_interval)
+
+    rollup = None
+    if args.rollup_interval > 0:
+        rollup = PointsRollup(pool, interval=args.rollup_interval)
+        rollup.start()
+
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if rollup:
+            rollup.stop()
+        top_items.stop(pool)
+        listener.stop()
+        if metrics and args.metrics:
+            metrics.dump(args.metrics)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
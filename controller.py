@@ -3,32 +3,65 @@
 import tkinter as tk
 from datetime import datetime
 
+from checkout import CheckoutEngine, CheckoutError
+from db_executor import DatabaseExecutor
+from catalog import ProductCatalog
+from customer_cache import CacheListener, CustomerCache
+from db_pool import DatabasePool
 from email_service import EmailService
-from models import Database
-from utils import Validator, RewardSystem, PriceFormatter
+from local_journal import CheckoutJournal, JournalSyncer
+from sales_counters import SalesCounters
+from scanner import ScanInput
+from utils import Validator, PriceFormatter
 
 class ShoppingCartController:
-    def __init__(self, db_config=None, email_config=None):
-        # Initialize cart and customer info
-        self.cart = []
-        self.customer_info = {
-            "name": "",
-            "mobile": "",
-            "dob": "",
-            "email": ""
-        }
+    def __init__(self, db_config=None, email_config=None, metrics=None, metrics_path=None, db_replicas=None,
+                 bill_storage="zlib", journal_path=None, sync_interval=2.0, email_pdf=False,
+                 dashboard_interval=1.0, reconcile_interval=60.0, customer_cache_ttl=None, scanner_gap_ms=None,
+                 scanner_min_length=4):
         self.current_user = {"username": "master", "is_admin": True}
         
-        # Initialize Python-side invoice storage
-        self.invoices = []  # Store invoices in memory
-        self.invoice_counter = 1  # Counter for invoice IDs
-        
-        # Initialize database with configuration
-        self.db = Database(db_config)
-        self.db.setup_database()
-        
-        # Initialize email service with configuration
+        # Initialize database with configuration (metrics optionally times every query)
+        self.metrics = metrics
+        self.metrics_path = metrics_path
+        # A pool of one reconnects on the next call after the server comes back. It connects
+        # on first use, which is on the worker thread once the window is up (see connect_database)
+        self.db = DatabasePool(db_config, max_connections=1, metrics=metrics, replicas=db_replicas,
+                               bill_storage=bill_storage)
+
+        # Optionally commit checkouts to a local journal and replay them to the server in the background
+        self.journal = None
+        self.syncer = None
+        if journal_path:
+            self.journal = CheckoutJournal(journal_path)
+            self.syncer = JournalSyncer(self.journal, db_config, interval=sync_interval, bill_storage=bill_storage)
+            self.syncer.start()
+        
+        # Initialize email service with configuration; with email_pdf bills are sent as PDF attachments
         self.email_service = EmailService(email_config)
+        self.email_pdf = email_pdf
+        
+        # Optionally cache customers and suggestions, dropping entries when any till changes them. The listener
+        # thread also loads the product catalog in the background and keeps it current
+        self.customer_cache = None
+        if customer_cache_ttl:
+            self.customer_cache = CustomerCache(ttl=customer_cache_ttl,
+                                                replica_lag=self.db.max_replica_lag if db_replicas else 0.0)
+        self.catalog = ProductCatalog()
+        self.cache_listener = CacheListener(self.customer_cache, db_config, catalog=self.catalog)
+        self.cache_listener.start()
+        
+        # Live dashboard counters: added to on every checkout, checked against the server every reconcile_interval
+        self.sales_counters = SalesCounters()
+        self.dashboard_interval = dashboard_interval
+        self.reconcile_interval = reconcile_interval
+        
+        # The checkout engine owns the cart, pricing and invoices; this UI is one of its clients
+        self.engine = CheckoutEngine(self.db, self.email_service, bill_storage=bill_storage, journal=self.journal,
+                                     sales_counters=self.sales_counters, customer_cache=self.customer_cache,
+                                     catalog=self.catalog)
+        self.session = self.engine.open_session()
+        self.last_invoice_id = None
         
         # Initialize UI
         self.root = tk.Tk()
@@ -36,10 +69,73 @@ class ShoppingCartController:
         # Import UI here to avoid circular import
         from ui import ShoppingCartUI
         self.ui = ShoppingCartUI(self.root, self)
+        
+        # Optional barcode scanner mode: scanned codes go straight into the cart, which is redrawn once per frame
+        self.scan_input = None
+        self._scanner_widget = None
+        self._scanned = None
+        if scanner_gap_ms:
+            self.scan_input = ScanInput(self.add_scanned, self.refresh_scanned, self.type_scanner_keys,
+                                        self.root.after, max_gap_ms=scanner_gap_ms, min_length=scanner_min_length)
+            self.ui.enable_scanner(self.on_scanner_key)
+        
+        # Run all database calls on a worker thread so the UI never blocks on SQL
+        self.db_executor = DatabaseExecutor(self.root, on_busy_change=self.ui.set_busy)
+        
+        # Connect in the background; calls made meanwhile queue behind it on the worker.
+        # No timeout: converting an old database on first start can take a while
+        self.db_executor.call(self.connect_database, on_error=self.on_db_error, timeout=0)
+        if self.journal:
+            self.update_sync_status()
+        self.reconcile_sales()
+        self.update_dashboard()
     
     def run(self):
         """Run the application"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.db_executor.shutdown()
+            if self.syncer:
+                self.syncer.stop()
+            self.cache_listener.stop()
+            self.db.close()
+            if self.metrics and self.metrics_path:
+                self.metrics.dump(self.metrics_path)
+    
+    def connect_database(self):
+        """Connect and create or upgrade the schema (a single catalog query when it is current)"""
+        self.db.setup_database()
+
+    def update_sync_status(self):
+        """Show how far the local journal is behind the server, once a second"""
+        status = self.journal.status()
+        if not status["pending"]:
+            text = "Sync: up to date"
+        else:
+            text = f"Sync: {status['pending']} pending, {status['lag_seconds']:.0f}s behind"
+            if status["last_error"]:
+                text += " (retrying)"
+        if status["parked"]:
+            # Rejected by the server on every attempt; see CheckoutJournal.parked()
+            text += f", {status['parked']} not accepted by the server"
+        self.ui.set_sync_status(text, lagging=status["lag_seconds"] > 60 or bool(status["parked"]))
+        self.root.after(1000, self.update_sync_status)
+
+    def update_dashboard(self):
+        """Redraw the dashboard from the in-memory counters (no database call)"""
+        self.ui.update_dashboard(self.sales_counters.snapshot(), self.sales_counters.reconciled_at)
+        self.root.after(int(self.dashboard_interval * 1000), self.update_dashboard)
+
+    def reconcile_sales(self):
+        """Correct the dashboard counters from the server, including other tills' sales"""
+        # Queued without a callback or busy indicator; the next redraw shows the result
+        self.db_executor.submit(self.sales_counters.reconcile, self.db)
+        self.root.after(int(self.reconcile_interval * 1000), self.reconcile_sales)
+
+    def on_db_error(self, error):
+        """Report a failed or timed-out background database call"""
+        self.ui.show_message("Database Error", f"Database request failed: {error}", error=True)
     
     def add_to_cart(self):
         """Add item to cart"""
@@ -48,38 +144,16 @@ class ShoppingCartController:
         quantity_str = self.ui.quantity_var.get().strip()
         price_str = self.ui.price_var.get().strip()
         
-        # Validate inputs
-        if not name:
-            self.ui.status_var.set("Item name cannot be empty")
-            return
-        
-        try:
-            quantity = int(quantity_str)
-            if quantity <= 0:
-                self.ui.status_var.set("Quantity must be a positive number")
-                return
-        except ValueError:
-            self.ui.status_var.set("Quantity must be a valid number")
-            return
-        
+        # Validate and add to cart; a barcode or SKU without a price is looked up in the in-memory catalog
         try:
-            price = float(price_str)
-            if price <= 0:
-                self.ui.status_var.set("Price must be a positive number")
-                return
-        except ValueError:
-            self.ui.status_var.set("Price must be a valid number")
+            if not price_str and self.engine.lookup_product(name):
+                name = self.session.add_product(name, quantity_str or 1)["name"]
+            else:
+                self.session.add_item(name, quantity_str, price_str)
+        except CheckoutError as e:
+            self.ui.status_var.set(str(e))
             return
         
-        # Add to cart
-        total = quantity * price
-        self.cart.append({
-            "name": name,
-            "quantity": quantity,
-            "price": price,
-            "total": total
-        })
-        
         # Clear inputs
         self.ui.name_var.set("")
         self.ui.quantity_var.set("")
@@ -87,7 +161,43 @@ class ShoppingCartController:
         self.ui.status_var.set(f"{name} added to cart")
         
         # Update cart view
-        self.ui.update_cart_view(self.cart)
+        self.ui.update_cart_view(self.session.cart)
+    
+    def on_scanner_key(self, event):
+        """Route a key press in the Add Item fields through the scanner input"""
+        if event.keysym in ("Return", "KP_Enter"):
+            char = "\n"
+        elif len(event.char) == 1 and event.char.isprintable():
+            char = event.char
+        else:
+            self.scan_input.flush()  # Editing keys must apply after the keys typed before them
+            return None
+        self.scan_input.key(char, event.time)
+        self._scanner_widget = event.widget
+        return "break"
+    
+    def type_scanner_keys(self, text):
+        """Enter keys typed by hand into their field; Enter adds the item as the button does"""
+        for char in text:
+            if char == "\n":
+                self.add_to_cart()
+            elif self._scanner_widget is not None:
+                self._scanner_widget.insert("insert", char)
+    
+    def add_scanned(self, code):
+        """Add a scanned barcode or SKU from the catalog, leaving the redraw to refresh_scanned"""
+        try:
+            self._scanned = self.session.add_product(code)["name"]
+            return True
+        except CheckoutError as e:
+            self.ui.status_var.set(str(e))
+            self.root.bell()
+            return False
+    
+    def refresh_scanned(self):
+        """Show the items scanned since the last frame"""
+        self.ui.append_cart_view(self.session.cart)
+        self.ui.status_var.set(f"{self._scanned} added to cart")
     
     def reset_cart(self):
         """Reset the cart"""
@@ -96,57 +206,33 @@ class ShoppingCartController:
             return
         
         # Clear cart
-        self.cart = []
+        self.session.reset_cart()
         
         # Update cart view
-        self.ui.update_cart_view(self.cart)
+        self.ui.update_cart_view(self.session.cart)
         
         # Clear bill
         self.ui.update_bill_view("")
     
     def calculate_bill(self):
         """Calculate the bill"""
-        if not self.cart:
+        if not self.session.cart:
             self.ui.show_message("Empty Cart", "The cart is empty", error=True)
             return
         
-        # Calculate totals
-        subtotal = sum(item["total"] for item in self.cart)
-        
-        # Get customer info
-        customer_name = self.customer_info.get("name", "")
-        customer_mobile = self.customer_info.get("mobile", "")
-        
-        # Get reward tier and discount if customer exists
-        discount = 0
-        reward_tier = "None"
-        
-        if customer_mobile:
-            # Get customer from database
-            customer = self.db.get_customer_by_mobile(customer_mobile)
-            if customer:
-                # Calculate reward tier and discount
-                points = customer["points"]
-                reward_tier = RewardSystem.get_reward_tier(points)
-                discount_percent = RewardSystem.get_discount_percentage(reward_tier)
-                discount = subtotal * discount_percent
-        
-        # Calculate final amount
-        final_amount = subtotal - discount
-        
-        # Format bill
-        bill = PriceFormatter.format_bill(
-            self.cart,
-            subtotal,
-            discount,
-            final_amount,
-            customer_name,
-            customer_mobile,
-            reward_tier
+        # Price the cart in the background (the customer lookup hits the database)
+        self.db_executor.call(
+            self.session.quote,
+            on_success=lambda quote: self.ui.update_bill_view(quote["bill"]),
+            on_error=self.on_checkout_error
         )
-        
-        # Update bill view
-        self.ui.update_bill_view(bill)
+    
+    def on_checkout_error(self, error):
+        """Report a checkout validation or database error"""
+        if isinstance(error, CheckoutError):
+            self.ui.show_message("Checkout", str(error), error=True)
+        else:
+            self.on_db_error(error)
     
     def save_customer_info(self):
         """Save customer information"""
@@ -156,79 +242,32 @@ class ShoppingCartController:
         dob = self.ui.customer_dob_var.get().strip()
         email = self.ui.customer_email_var.get().strip() if hasattr(self.ui, 'customer_email_var') else ""
 
-        # Validate inputs
-        if not Validator.validate_name(name):
-            self.ui.customer_status_var.set("Please enter a valid name")
-            return
-
-        if not Validator.validate_mobile(mobile):
-            self.ui.customer_status_var.set("Please enter a valid 10-digit mobile number")
-            return
-
-        if not Validator.validate_date(dob):
-            self.ui.customer_status_var.set("Please enter a valid date in DD/MM/YYYY format")
-            return
-
-        # Validate email if provided
-        if email and not Validator.validate_email(email):
-            self.ui.customer_status_var.set("Please enter a valid email address")
-            return
-
-        # Save to customer info dictionary
-        self.customer_info = {
-            "name": name,
-            "mobile": mobile,
-            "dob": dob,
-            "email": email
-        }
-
-        # Save to database
-        self.db.save_customer(name, mobile, dob, email)
-
-        # Show success message
-        self.ui.customer_status_var.set("Customer information saved successfully")
-
-
-    def save_customer_info_from_bill(self, name, mobile, dob, email, status_var, dialog):
-        """Save customer information from bill tab dialog"""
-        # Validate inputs
-        if not Validator.validate_name(name):
-            status_var.set("Please enter a valid name")
-            return
-
-        if not Validator.validate_mobile(mobile):
-            status_var.set("Please enter a valid 10-digit mobile number")
-            return
-
-        if not Validator.validate_date(dob):
-            status_var.set("Please enter a valid date in DD/MM/YYYY format")
-            return
-
-        # Validate email if provided
-        if email and not Validator.validate_email(email):
-            status_var.set("Please enter a valid email address")
+        # Validate inputs and attach the customer to the current sale
+        try:
+            self.session.set_customer(name, mobile, dob, email)
+        except CheckoutError as e:
+            self.ui.customer_status_var.set(str(e))
             return
 
-        # Save to customer info dictionary
-        self.customer_info = {
-            "name": name,
-            "mobile": mobile,
-            "dob": dob,
-            "email": email
-        }
-
         # Save to database
-        self.db.save_customer(name, mobile, dob, email)
+        self.ui.customer_status_var.set("Saving customer information...")
+        self.db_executor.call(
+            self.engine.save_customer, name, mobile, dob, email,
+            on_success=self._on_customer_saved,
+            on_error=self.on_db_error,
+            on_timeout=lambda: self.ui.customer_status_var.set("Still saving customer information...")
+        )
 
-        # Show success message
-        status_var.set("Customer information added to bill successfully")
+    def _on_customer_saved(self, customer_id):
+        """Show the outcome of save_customer_info"""
+        if customer_id:
+            self.ui.customer_status_var.set("Customer information saved successfully")
+        else:
+            self.ui.customer_status_var.set("Failed to save customer information")
 
-        # Close dialog
-        dialog.destroy()
-    
     def save_invoice(self):
-        """Save the invoice to Python-side storage"""
-        if not self.cart:
+        """Check out the current session and record the invoice"""
+        if not self.session.cart:
             self.ui.show_message("Empty Cart", "The cart is empty", error=True)
             return
         
@@ -238,75 +277,35 @@ class ShoppingCartController:
             self.ui.show_message("Calculate Bill", "Please calculate the bill first", error=True)
             return
         
-        # Get customer info
-        customer_mobile = self.customer_info.get("mobile", "")
-        customer_name = self.customer_info.get("name", "")
-        customer_email = self.customer_info.get("email", "")
-        
-        # Calculate totals
-        subtotal = sum(item["total"] for item in self.cart)
-        
-        # Get reward tier and discount if customer exists
-        discount = 0
-        
-        if customer_mobile:
-            # Get customer from database
-            customer = self.db.get_customer_by_mobile(customer_mobile)
-            if customer:
-                # Calculate reward tier and discount
-                points = customer["points"]
-                reward_tier = RewardSystem.get_reward_tier(points)
-                discount_percent = RewardSystem.get_discount_percentage(reward_tier)
-                discount = subtotal * discount_percent
-                
-                # Calculate reward points for this purchase
-                new_points = RewardSystem.calculate_points(subtotal - discount)
-                
-                # Update customer points in database
-                self.db.update_customer_points(customer_mobile, points + new_points)
-                
-                # Update customer info with database values if needed
-                if not customer_name:
-                    customer_name = customer.get("name", "")
-                if not customer_email:
-                    customer_email = customer.get("email", "")
-        
-        # Calculate final amount
-        final_amount = subtotal - discount
-        
-        # Create invoice object for Python-side storage
-        invoice = {
-            "id": self.invoice_counter,
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "customer_name": customer_name,
-            "customer_mobile": customer_mobile,
-            "customer_email": customer_email,
-            "subtotal": subtotal,
-            "discount": discount,
-            "total": final_amount,
-            "items": [item.copy() for item in self.cart],  # Deep copy of cart items
-            "bill_content": bill_text
-        }
-        
-        # Save to Python-side storage
-        self.invoices.append(invoice)
-        invoice_id = self.invoice_counter
-        self.invoice_counter += 1
+        # Apply rewards and record the invoice in the background. A slow checkout is not
+        # abandoned: it may still commit, so retrying it would accrue points twice
+        self.db_executor.call(
+            self.session.checkout, bill_text,
+            on_success=self._on_invoice_saved,
+            on_error=self.on_checkout_error,
+            on_timeout=lambda: self.ui.show_message(
+                "Checkout", "Saving the invoice is taking longer than usual; it will be shown once saved"
+            )
+        )
+    
+    def _on_invoice_saved(self, invoice):
+        """Update the UI once the engine has recorded the invoice"""
+        invoice_id = invoice["id"]
+        self.last_invoice_id = invoice_id
         
         # Show success message
         self.ui.show_message("Invoice Saved", f"Invoice #{invoice_id} saved successfully")
         
         # Ask if user wants to send bill via email
-        if customer_email and self.email_service.is_configured():
-            if self.ui.ask_confirmation("Send Bill", f"Do you want to send the bill to {customer_email}?"):
-                self.send_bill_by_email(customer_email, customer_name, bill_text, invoice_id)
+        if self.engine.can_email(invoice):
+            if self.ui.ask_confirmation("Send Bill", f"Do you want to send the bill to {invoice['customer_email']}?"):
+                self.send_bill_by_email(invoice_id)
         
-        # Reset cart and customer info
-        self.reset_cart()
-        self.customer_info = {"name": "", "mobile": "", "dob": "", "email": ""}
+        # The engine has already reset the session; clear the views
+        self.ui.update_cart_view(self.session.cart)
+        self.ui.update_bill_view("")
         self.ui.customer_info_label.config(text="No customer info added", fg="#666666")
     
-    
     def search_invoices(self):
         """Search invoices by mobile number"""
         # Get mobile number from UI
@@ -316,11 +315,12 @@ class ShoppingCartController:
             self.ui.show_message("Search Error", "Please enter a mobile number", error=True)
             return
         
-        # Get invoices from database
-        invoices = self.db.get_invoices_by_mobile(mobile)
-        
-        # Update invoice view
-        self.ui.update_invoice_view(invoices)
+        # Get invoices from database and update the invoice view when they arrive
+        self.db_executor.call(
+            self.db.get_invoices_by_mobile, mobile,
+            on_success=self.ui.update_invoice_view,
+            on_error=self.on_db_error
+        )
     
     def show_invoice_details(self, event):
         """Show invoice details"""
@@ -332,10 +332,18 @@ class ShoppingCartController:
         # Get invoice ID
         invoice_id = self.ui.invoice_tree.item(selected_item[0], "values")[0]
         
-        # Get invoice details from database
-        invoice = self.db.get_invoice_details(invoice_id)
-        
-        # Update invoice details view
+        # Get invoice details from database and update the details view when they arrive
+        self.db_executor.call(
+            self.db.get_invoice_details, invoice_id,
+            on_success=self._show_invoice_details,
+            on_error=self.on_db_error
+        )
+    
+    def _show_invoice_details(self, invoice):
+        """Display invoice details fetched in the background"""
+        if not invoice:
+            self.ui.show_message("Invoice Details", "Invoice not found", error=True)
+            return
         self.ui.update_invoice_details(invoice)
     
     def save_bill_to_file(self):
@@ -361,27 +369,33 @@ class ShoppingCartController:
         except Exception as e:
             self.ui.show_message("Save Error", f"Error saving bill: {str(e)}", error=True)
 
-    def send_bill_by_email(self, customer_email, customer_name, bill_content, invoice_id):
-        """Send bill to customer via email"""
-        try:
-            # Format subject
-            subject = f"Your Invoice #{invoice_id} - {self.ui.title_label['text']}"
-
-            # Send email
-            success = self.email_service.send_bill(
-                recipient_email=customer_email,
-                recipient_name=customer_name,
-                subject=subject,
-                bill_content=bill_content,
-                invoice_id=invoice_id
-            )
-
-            if success:
-                self.ui.show_message("Email Sent", f"Bill sent successfully to {customer_email}")
-            else:
-                self.ui.show_message("Email Error", "Failed to send email. Please check email configuration.", error=True)
-        except Exception as e:
-            self.ui.show_message("Email Error", f"Error sending email: {str(e)}", error=True)
+    def send_bill_by_email(self, invoice_id=None):
+        """Send a saved bill to its customer via email (defaults to the last invoice)"""
+        if invoice_id is None:
+            invoice_id = self.last_invoice_id
+        
+        invoice = self.engine.get_invoice(invoice_id) if invoice_id else None
+        if not invoice:
+            self.ui.show_message("Email Error", "Please save the invoice first", error=True)
+            return
+        if not self.engine.can_email(invoice):
+            self.ui.show_message("Email Error", "No customer email or email service not configured", error=True)
+            return
+        
+        # Sending talks to the SMTP server, so keep it off the Tk thread too
+        self.db_executor.call(
+            self.engine.send_bill, invoice_id, attach_pdf=self.email_pdf,
+            on_success=lambda success: self._on_bill_sent(success, invoice["customer_email"]),
+            on_error=lambda e: self.ui.show_message("Email Error", f"Error sending email: {str(e)}", error=True),
+            timeout=30.0
+        )
+    
+    def _on_bill_sent(self, success, customer_email):
+        """Report the outcome of send_bill_by_email"""
+        if success:
+            self.ui.show_message("Email Sent", f"Bill sent successfully to {customer_email}")
+        else:
+            self.ui.show_message("Email Error", "Failed to send email. Please check email configuration.", error=True)
     
     def configure_email_service(self, email, password, dialog):
         """Configure email service with Gmail credentials"""
@@ -403,37 +417,16 @@ class ShoppingCartController:
     
     def save_customer_info_from_bill(self, name, mobile, dob, email, status_var, dialog):
         """Save customer info from bill tab"""
-        # Validate inputs
-        if not name or not mobile:
-            status_var.set("Name and mobile number are required")
-            return
-        
-        # Validate mobile number
-        if not Validator.validate_mobile(mobile):
-            status_var.set("Invalid mobile number format")
-            return
-        
-        # Validate DOB if provided
-        if dob and not Validator.validate_date(dob):
-            status_var.set("Invalid date format. Use DD/MM/YYYY")
-            return
-        
-        # Validate email if provided
-        if email and not Validator.validate_email(email):
-            status_var.set("Invalid email format")
+        # Validate inputs and attach the customer to the current sale
+        try:
+            customer = self.session.set_customer(name, mobile, dob, email)
+        except CheckoutError as e:
+            status_var.set(str(e))
             return
         
-        # Update customer info
-        self.customer_info = {
-            "name": name,
-            "mobile": mobile,
-            "dob": dob,
-            "email": email
-        }
-        
         # Update UI label
         self.ui.customer_info_label.config(
-            text=f"Customer: {name} ({mobile})",
+            text=f"Customer: {customer['name']} ({customer['mobile']})",
             fg="#4CAF50"
         )
         
@@ -450,7 +443,7 @@ class ShoppingCartController:
             return
         
         # Validate mobile number
-        if not Validator.validate_mobile(mobile):
+        if not Validator.validate_mobile(mobile)[0]:
             history_text.config(state=tk.NORMAL)
             history_text.delete(1.0, tk.END)
             history_text.insert(tk.END, "Invalid mobile number format.")
@@ -459,7 +452,7 @@ class ShoppingCartController:
         
         try:
             # Get invoices from Python-side storage (in-memory)
-            invoices = self.get_invoices_by_mobile(mobile)
+            invoices = self.engine.get_invoices_by_mobile(mobile)
             
             history_text.config(state=tk.NORMAL)
             history_text.delete(1.0, tk.END)
@@ -491,25 +484,10 @@ class ShoppingCartController:
             history_text.insert(tk.END, f"Error searching invoice history: {str(e)}")
             history_text.config(state=tk.DISABLED)
     
-    def get_invoices_by_mobile(self, mobile):
-        """Get invoices by mobile number from Python-side storage"""
-        matching_invoices = []
-        for invoice in self.invoices:
-            if invoice.get("customer_mobile") == mobile:
-                matching_invoices.append(invoice)
+    def get_customer_name_suggestions(self, prefix, callback):
+        """Get customer name suggestions for autocomplete and pass them to callback"""
+        self.db_executor.call(self.engine.get_customer_name_suggestions, prefix, on_success=callback, timeout=2.0)
 
-        # Sort by date (newest first)
-        matching_invoices.sort(key=lambda x: x["date"], reverse=True)
-        return matching_invoices
-
-    def get_customer_name_suggestions(self, prefix):
-        """Get customer name suggestions for autocomplete"""
-        return self.db.search_customers_by_name(prefix)
-
-    def get_customer_mobile_suggestions(self, prefix):
-        """Get customer mobile suggestions for autocomplete"""
-        return self.db.search_customers_by_mobile(prefix)
-    
-    
-    
-    
\ No newline at end of file
+    def get_customer_mobile_suggestions(self, prefix, callback):
+        """Get customer mobile suggestions for autocomplete and pass them to callback"""
+        self.db_executor.call(self.engine.get_customer_mobile_suggestions, prefix, on_success=callback, timeout=2.0)
@@ -0,0 +1,34 @@
+# copy_arrays.py - Read COPY ... TO STDOUT (FORMAT binary) output straight into NumPy arrays
+
+import io
+
+import numpy as np
+
+# Signature, flags and header extension length precede the rows; a -1 field count ends them
+COPY_HEADER_LENGTH = 19
+COPY_TRAILER_LENGTH = 2
+
+
+def binary_row_dtype(columns):
+    """Structured dtype of one binary COPY row of fixed-width, non-null columns
+
+    columns is a list of (name, dtype) pairs such as ("id", ">i4") or
+    ("total", ">i8"); every column is preceded by its length on the wire.
+    """
+    fields = [("fields", ">i2")]
+    for name, dtype in columns:
+        fields += [(f"{name}_length", ">i4"), (name, dtype)]
+    return np.dtype(fields)
+
+
+def copy_to_array(cursor, query, dtype):
+    """Run a COPY (...) TO STDOUT WITH (FORMAT binary) and return its rows as a structured array
+
+    The query's columns must match dtype and must not be NULL (wrap them in
+    COALESCE): every row then has the same size and no per-row parsing is needed.
+    """
+    buffer = io.BytesIO()
+    cursor.copy_expert(query, buffer)
+    data = buffer.getbuffer()
+    start = COPY_HEADER_LENGTH + int.from_bytes(data[COPY_HEADER_LENGTH - 4:COPY_HEADER_LENGTH], "big")
+    return np.frombuffer(data[start:len(data) - COPY_TRAILER_LENGTH], dtype=dtype)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# customer_cache.py - Customer and autocomplete cache kept coherent across tills by LISTEN/NOTIFY
+
+import select
+import threading
+import time
+
+from catalog import PRODUCTS_CHANNEL, RELOAD_ALL
+
+# Channels Database notifies when a customer changes, with the customer's mobile
+# as the payload: balance changes, and new or edited customer details
+POINTS_CHANNEL = "customer_points"
+DETAILS_CHANNEL = "customer_details"
+
+
+class CustomerCache:
+    def __init__(self, ttl=300.0, maxsize=10000, replica_lag=0.0):
+        """Customer lookups and autocomplete suggestions cached for ttl seconds
+
+        Entries are dropped as soon as a CacheListener hears that the
+        customer changed, so the TTL only bounds how long a change can go
+        unseen if a notification is lost, and can be long. Empty results
+        are not cached: the database layer returns those on errors too.
+        With read replicas, a customer re-read within replica_lag seconds
+        of a change may come from a replica that has not caught up, so it is
+        only cached for replica_lag seconds.
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.replica_lag = replica_lag
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._customers = {}  # mobile -> (expires, customer)
+        self._suggestions = {}  # (kind, prefix) -> (expires, suggestions)
+        self._changed = {}  # mobile -> time of its last change, kept for replica_lag seconds
+        self._generation = 0  # Bumped by every invalidation, so a load that raced one is not cached
+        self._lock = threading.Lock()
+
+    def _get(self, entries, key, now):
+        with self._lock:
+            entry = entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _put(self, entries, key, value, expires, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            if len(entries) >= self.maxsize:
+                entries.clear()  # Cheaper than tracking recency; hot entries come straight back
+            entries[key] = (expires, value)
+
+    def customer(self, mobile, load):
+        """The customer with mobile, from the cache or load(mobile)"""
+        now = time.monotonic()
+        customer = self._get(self._customers, mobile, now)
+        if customer is not None:
+            return dict(customer)
+
+        generation = self._generation
+        customer = load(mobile)
+        if customer:
+            ttl = self.ttl
+            changed = self._changed.get(mobile)
+            if changed is not None and now - changed < self.replica_lag:
+                ttl = min(ttl, self.replica_lag)
+            self._put(self._customers, mobile, dict(customer), now + ttl, generation)
+        return customer
+
+    def suggestions(self, kind, prefix, load):
+        """Autocomplete suggestions ("name" or "mobile") for prefix, from the cache or load(prefix)"""
+        now = time.monotonic()
+        key = (kind, prefix.lower() if kind == "name" else prefix)
+        suggestions = self._get(self._suggestions, key, now)
+        if suggestions is not None:
+            return list(suggestions)
+
+        generation = self._generation
+        suggestions = load(prefix)
+        if suggestions:
+            self._put(self._suggestions, key, list(suggestions), now + self.ttl, generation)
+        return suggestions
+
+    def invalidate(self, mobile, details=False):
+        """Drop a changed customer; with details (new or edited customer) also the suggestions it may appear in"""
+        now = time.monotonic()
+        with self._lock:
+            self.invalidations += 1
+            self._generation += 1
+            self._customers.pop(mobile, None)
+            if self.replica_lag > 0:
+                self._changed = {key: when for key, when in self._changed.items() if now - when < self.replica_lag}
+                self._changed[mobile] = now
+            if details:
+                # The payload has no name, so every name suggestion may be affected
+                self._suggestions = {
+                    (kind, prefix): entry for (kind, prefix), entry in self._suggestions.items()
+                    if kind == "mobile" and not mobile.startswith(prefix)
+                }
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._customers.clear()
+            self._suggestions.clear()
+
+
+class CacheListener:
+    def __init__(self, cache, db_config=None, poll_interval=1.0, reconnect_delay=2.0, catalog=None):
+        """LISTEN for changes on a dedicated connection and update this process's caches
+
+        cache (a CustomerCache, or None) drops changed customers. A
+        catalog.ProductCatalog is refreshed on this connection, one query
+        for all the products that changed since the last poll. Whenever the
+        connection is (re)established the cache is cleared and the catalog
+        fully (re)loaded, since changes made while nobody was listening
+        were never delivered.
+        """
+        self.cache = cache
+        self.catalog = catalog
+        self.db_config = db_config
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        from models import Database  # Imported here so the Tk application starts without psycopg2
+        db = Database(self.db_config, prepared_statements=False)
+        db.conn.autocommit = True
+        channels = []
+        if self.cache is not None:
+            channels += [POINTS_CHANNEL, DETAILS_CHANNEL]
+        if self.catalog is not None:
+            channels.append(PRODUCTS_CHANNEL)
+        for channel in channels:
+            db.cursor.execute(f"LISTEN {channel}")
+        return db
+
+    def handle(self, db, notifies):
+        """Apply one poll's notifications"""
+        products = set()
+        for notify in notifies:
+            if notify.channel == PRODUCTS_CHANNEL:
+                products.add(notify.payload)
+            else:
+                self.cache.invalidate(notify.payload, details=notify.channel == DETAILS_CHANNEL)
+        if products:
+            self.catalog.refresh(db, None if RELOAD_ALL in products else products)
+
+    def start(self):
+        """Listen on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, name="cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop listening within poll_interval seconds"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self):
+        """Listen until stopped, reconnecting after connection errors"""
+        while not self._stop.is_set():
+            db = None
+            try:
+                db = self._connect()
+                if self.cache is not None:
+                    self.cache.clear()
+                if self.catalog is not None and self.catalog.load(db) is None:
+                    raise ConnectionError("Could not load the product catalog")
+                self.connected.set()
+                conn = db.conn
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_interval)[0]:
+                        conn.poll()
+                        notifies = list(conn.notifies)
+                        conn.notifies.clear()
+                        self.handle(db, notifies)
+            except Exception as e:
+                print(f"Cache listener error: {e}")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                self.connected.clear()
+                if db is not None:
+                    db.close()
@@ -0,0 +1,146 @@
+# db_executor.py - Runs database calls on a worker thread and hands results back to Tk
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DatabaseTimeoutError(Exception):
+    """Raised when a database call does not start within its timeout"""
+
+
+class DatabaseExecutor:
+    def __init__(self, root, default_timeout=10.0, poll_interval_ms=16, on_busy_change=None):
+        """Start the dedicated worker thread that owns all database access
+
+        Results are collected on the Tk thread by polling with root.after, so
+        no Tk call is ever made from the worker thread. A 16 ms poll keeps
+        delivery within one frame at 60 fps.
+        """
+        self.root = root
+        self.default_timeout = default_timeout
+        self.poll_interval_ms = poll_interval_ms
+        self.on_busy_change = on_busy_change
+
+        self._jobs = queue.Queue()
+        self._pending = []  # (future, deadline, on_success, on_error, on_timeout) waiting for delivery
+        self._polling = False
+
+        self._worker = threading.Thread(target=self._run, name="db-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func on the worker thread and return a Future for its result"""
+        future = Future()
+        self._jobs.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func, *args, on_success=None, on_error=None, on_timeout=None, timeout=None, **kwargs):
+        """Run func on the worker thread and deliver the outcome on the Tk thread
+
+        Must be called from the Tk thread. on_success receives the return value,
+        on_error receives the exception. If the call is still queued after
+        timeout seconds it is cancelled and on_error receives a
+        DatabaseTimeoutError. A call already running cannot be stopped (a
+        checkout may be about to commit), so on_timeout is called instead and
+        the result is still delivered to on_success or on_error when it arrives.
+        """
+        future = self.submit(func, *args, **kwargs)
+
+        if timeout is None:
+            timeout = self.default_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+
+        if not self._pending:
+            self._set_busy(True)
+        self._pending.append((future, deadline, on_success, on_error, on_timeout))
+
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+        return future
+
+    def is_busy(self):
+        """Return True while any call is waiting for delivery"""
+        return bool(self._pending)
+
+    def shutdown(self, wait=True):
+        """Stop the worker thread after the queued jobs finish"""
+        self._jobs.put(None)
+        if wait:
+            self._worker.join(timeout=self.default_timeout)
+
+    def _run(self):
+        """Worker loop: execute queued jobs one at a time"""
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            future, func, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _poll(self):
+        """Deliver finished or timed-out calls on the Tk thread"""
+        now = time.monotonic()
+        still_pending = []
+        ready = []
+        overdue = []
+
+        for entry in self._pending:
+            future, deadline, on_success, on_error, on_timeout = entry
+            if future.done():
+                ready.append(entry)
+            elif deadline is not None and now >= deadline:
+                if future.cancel():
+                    ready.append(entry)
+                else:
+                    # Running: report it, then wait for the result without a deadline
+                    overdue.append(on_timeout)
+                    still_pending.append((future, None, on_success, on_error, on_timeout))
+            else:
+                still_pending.append(entry)
+
+        self._pending = still_pending
+
+        if still_pending:
+            self.root.after(self.poll_interval_ms, self._poll)
+        else:
+            self._polling = False
+            self._set_busy(False)
+
+        for on_timeout in overdue:
+            if on_timeout:
+                on_timeout()
+            else:
+                print("Database call is taking longer than expected; its result will follow")
+        for future, deadline, on_success, on_error, on_timeout in ready:
+            self._deliver(future, on_success, on_error)
+
+    def _deliver(self, future, on_success, on_error):
+        """Invoke the callback matching the outcome of future"""
+        if future.cancelled():
+            error = DatabaseTimeoutError("Database call timed out before it started")
+        else:
+            error = future.exception()
+
+        if error is not None:
+            if on_error:
+                on_error(error)
+            else:
+                print(f"Database error: {error}")
+        elif on_success:
+            on_success(future.result())
+
+    def _set_busy(self, busy):
+        """Notify the UI that the busy state changed"""
+        if self.on_busy_change:
+            self.on_busy_change(busy)
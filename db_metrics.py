@@ -0,0 +1,227 @@
+# db_metrics.py - Per-query latency instrumentation and slow-query log for Database
+
+import functools
+import json
+import threading
+import time
+from datetime import datetime
+
+from psycopg2.extras import DictCursor
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Stats:
+    def __init__(self):
+        """Counters and latency histogram for one method"""
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last bucket is +Inf
+
+    def add(self, seconds, rows, error):
+        self.calls += 1
+        self.seconds += seconds
+        self.rows += rows
+        if error:
+            self.errors += 1
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "seconds_total": round(self.seconds, 6),
+            "mean_ms": round(self.seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets)}
+        }
+
+
+class QueryMetrics:
+    def __init__(self, slow_query_ms=100, slow_query_log=None):
+        """Collect per-method and per-statement statistics
+
+        Statements slower than slow_query_ms are appended to the
+        slow_query_log file with their parameters redacted.
+        """
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.methods = {}
+        self.statements = _Stats()
+        self.routes = {}  # (kind, target, reason) -> calls, when replicas are configured
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe_call(self, name, method, db, args, kwargs):
+        """Run a Database method and record its latency, rows and errors"""
+        frame = {"method": name, "rows": 0, "error": False}
+        outer = getattr(self._local, "frame", None)
+        self._local.frame = frame
+        start = time.perf_counter()
+        try:
+            return method(db, *args, **kwargs)
+        except Exception:
+            frame["error"] = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.frame = outer
+            if outer is None:
+                with self._lock:
+                    self.methods.setdefault(name, _Stats()).add(elapsed, frame["rows"], frame["error"])
+            else:
+                # Nested Database call: fold into the outer method
+                outer["rows"] += frame["rows"]
+                outer["error"] = outer["error"] or frame["error"]
+
+    def observe_statement(self, query, params, seconds, rows, error):
+        """Record one cursor.execute call"""
+        frame = getattr(self._local, "frame", None)
+        if frame is not None:
+            frame["rows"] += rows
+            frame["error"] = frame["error"] or error
+
+        with self._lock:
+            self.statements.add(seconds, rows, error)
+
+        if self.slow_query_log and seconds * 1000 >= self.slow_query_ms:
+            method = frame["method"] if frame is not None else "execute"
+            self.log_slow_query(method, query, params, seconds, rows, error)
+
+    def observe_route(self, kind, target, reason):
+        """Record where a read or write was sent and why"""
+        key = (kind, target, reason)
+        with self._lock:
+            self.routes[key] = self.routes.get(key, 0) + 1
+
+    def log_slow_query(self, method, query, params, seconds, rows, error):
+        """Append a slow statement to the slow-query log"""
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        line = (
+            f"{datetime.now().isoformat(timespec='milliseconds')} method={method} "
+            f"duration_ms={seconds * 1000:.1f} rows={rows} error={'yes' if error else 'no'} "
+            f"query=\"{' '.join(str(query).split())}\" params={redact(params)}\n"
+        )
+        with self._lock:
+            with open(self.slow_query_log, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def snapshot(self):
+        """Return all statistics as a dictionary"""
+        with self._lock:
+            return {
+                "methods": {name: stats.to_dict() for name, stats in sorted(self.methods.items())},
+                "execute": self.statements.to_dict(),
+                "routes": [
+                    {"kind": kind, "target": target, "reason": reason, "calls": calls}
+                    for (kind, target, reason), calls in sorted(self.routes.items())
+                ]
+            }
+
+    def to_prometheus(self):
+        """Render statistics in Prometheus text exposition format"""
+        with self._lock:
+            entries = sorted(self.methods.items()) + [("execute", self.statements)]
+            lines = [
+                "# HELP shopping_cart_db_calls_total Database calls by method",
+                "# TYPE shopping_cart_db_calls_total counter",
+            ]
+            lines += [f'shopping_cart_db_calls_total{{method="{name}"}} {stats.calls}' for name, stats in entries]
+            lines += [
+                "# HELP shopping_cart_db_errors_total Failed database calls by method",
+                "# TYPE shopping_cart_db_errors_total counter",
+            ]
+            lines += [f'shopping_cart_db_errors_total{{method="{name}"}} {stats.errors}' for name, stats in entries]
+            lines += [
+                "# HELP shopping_cart_db_rows_total Rows returned or affected by method",
+                "# TYPE shopping_cart_db_rows_total counter",
+            ]
+            lines += [f'shopping_cart_db_rows_total{{method="{name}"}} {stats.rows}' for name, stats in entries]
+            lines += [
+                "# HELP shopping_cart_db_latency_seconds Database call latency by method",
+                "# TYPE shopping_cart_db_latency_seconds histogram",
+            ]
+            for name, stats in entries:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append(f'shopping_cart_db_latency_seconds_bucket{{method="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'shopping_cart_db_latency_seconds_sum{{method="{name}"}} {stats.seconds:.6f}')
+                lines.append(f'shopping_cart_db_latency_seconds_count{{method="{name}"}} {stats.calls}')
+            if self.routes:
+                lines += [
+                    "# HELP shopping_cart_db_routes_total Database calls by kind, target connection and routing reason",
+                    "# TYPE shopping_cart_db_routes_total counter",
+                ]
+                lines += [
+                    f'shopping_cart_db_routes_total{{kind="{kind}",target="{target}",reason="{reason}"}} {calls}'
+                    for (kind, target, reason), calls in sorted(self.routes.items())
+                ]
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write statistics to path (.json for JSON, Prometheus text otherwise)"""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.snapshot(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+    def reset(self):
+        """Clear all statistics"""
+        with self._lock:
+            self.methods = {}
+            self.statements = _Stats()
+            self.routes = {}
+
+
+def redact(params):
+    """Replace parameter values with their type names"""
+    if params is None:
+        return "[]"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + "}"
+    return "[" + ", ".join(f"<{type(value).__name__}>" for value in params) + "]"
+
+
+class InstrumentedCursor(DictCursor):
+    """DictCursor that reports every execute to a QueryMetrics"""
+
+    metrics = None
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        error = False
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            error = True
+            raise
+        finally:
+            rows = self.rowcount if self.rowcount and self.rowcount > 0 else 0
+            self.metrics.observe_statement(query, vars, time.perf_counter() - start, rows, error)
+
+
+def instrumented(method):
+    """Record calls to a Database method when the Database has metrics enabled
+
+    When metrics are disabled the only cost is one attribute check.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self.metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+        return metrics.observe_call(name, method, self, args, kwargs)
+
+    return wrapper
@@ -0,0 +1,115 @@
+# db_pool.py - Thread-safe pool of Database connections
+
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class DatabasePool:
+    def __init__(self, db_config=None, max_connections=10, metrics=None, replicas=None, max_replica_lag=5.0,
+                 bill_storage="zlib"):
+        """Create a pool that hands out one Database (connection) per caller
+
+        The pool exposes the same methods as Database, so it can be used
+        anywhere a Database is expected; each call borrows a connection for
+        its duration. Use connection() to run several calls on one connection.
+        With replicas, each pooled Database routes its reads (see Database).
+
+        Creating a pool neither connects nor imports psycopg2; both happen on
+        the first call, so an application can construct it before its window
+        is up and connect from a background thread.
+        """
+        self.db_config = db_config
+        self.metrics = metrics
+        self.replicas = replicas
+        self.max_replica_lag = max_replica_lag
+        self.bill_storage = bill_storage
+        self.max_connections = max_connections
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._all = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a Database from the pool for the duration of the block"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No database connection available")
+
+        db = None
+        try:
+            db = self._checkout()
+            yield db
+        finally:
+            if db is not None:
+                self._checkin(db)
+            self._slots.release()
+
+    def _checkout(self):
+        """Return an idle open connection, reconnecting if needed"""
+        while True:
+            try:
+                db = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if not db.conn.closed:
+                return db
+            self._discard(db)
+
+        from models import Database
+
+        db = Database(self.db_config, metrics=self.metrics,
+                      replicas=self.replicas, max_replica_lag=self.max_replica_lag,
+                      bill_storage=self.bill_storage)
+        with self._lock:
+            self._all.append(db)
+        return db
+
+    def _checkin(self, db):
+        """Return a connection to the pool, ending any open transaction"""
+        if db.conn.closed:
+            self._discard(db)
+            return
+
+        from psycopg2 import extensions
+
+        try:
+            if db.conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                db.conn.rollback()
+        except Exception as e:
+            print(f"Database error: {e}")
+            self._discard(db)
+            return
+
+        self._idle.put(db)
+
+    def _discard(self, db):
+        """Forget a broken connection"""
+        with self._lock:
+            if db in self._all:
+                self._all.remove(db)
+        try:
+            db.conn.close()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        """Proxy Database methods, running each on a borrowed connection"""
+        from models import Database
+
+        if name.startswith("_") or not callable(getattr(Database, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            with self.connection() as db:
+                return getattr(db, name)(*args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            connections, self._all = self._all, []
+        for db in connections:
+            db.close()
@@ -0,0 +1,172 @@
+# db_routing.py - Route read-only Database methods to streaming replicas
+
+import functools
+import itertools
+import time
+
+# Seconds a replica is behind the primary: 0 when it is streaming from the primary
+# and has replayed everything it received (or is not a standby at all), otherwise
+# the age of the last transaction it replayed, which keeps growing while its WAL
+# receiver is disconnected; NULL if it has not replayed anything yet. Reading
+# pg_stat_wal_receiver.status needs pg_read_all_stats, without which a caught up
+# replica is only fresh while the primary keeps committing
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+             AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+class _Replica:
+    def __init__(self, db_config):
+        """Connection state and last known lag for one replica"""
+        self.db_config = db_config
+        self.db = None
+        self.lag = None
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replica_configs, max_lag=5.0, check_interval=1.0, retry_interval=10.0):
+        """Choose where each read-only call on primary runs
+
+        A read goes to the next replica (round robin) whose lag is at most
+        max_lag seconds. Lag is measured at most every check_interval seconds
+        per replica; an unreachable replica is retried after retry_interval.
+        Reads fall back to the primary when no replica qualifies, and for
+        max_lag seconds after this connection wrote, so a lane always sees
+        its own changes.
+        """
+        self.primary = primary
+        self.replicas = [_Replica(db_config) for db_config in replica_configs]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.last_write = None
+        self._order = itertools.cycle(range(len(self.replicas)))
+
+    def choose(self):
+        """Return (replica Database or None, reason for the decision)"""
+        if self.last_write is not None and time.monotonic() - self.last_write < self.max_lag:
+            return None, "recent_write"
+
+        reason = "unavailable"
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._order)]
+            if not self._refresh(replica):
+                continue
+            if replica.lag is not None and replica.lag <= self.max_lag:
+                return replica.db, "fresh"
+            reason = "stale"
+        return None, reason
+
+    def _refresh(self, replica):
+        """Connect and measure lag when due; return False if the replica is down"""
+        now = time.monotonic()
+        if replica.db is None or replica.db.conn.closed:
+            if replica.checked_at and now - replica.checked_at < self.retry_interval:
+                return False
+            replica.checked_at = now
+            if not self._connect(replica):
+                return False
+        elif now - replica.checked_at < self.check_interval:
+            return True
+
+        replica.checked_at = now
+        try:
+            with replica.db.conn.cursor() as cursor:
+                cursor.execute(REPLICA_LAG_SQL)
+                lag = cursor.fetchone()[0]
+            replica.lag = float(lag) if lag is not None else None
+            return True
+        except Exception as e:
+            print(f"Replica error: {e}")
+            self._disconnect(replica)
+            return False
+
+    def _connect(self, replica):
+        # Imported here: models imports this module
+        from models import Database
+
+        try:
+            replica.db = Database(replica.db_config, metrics=self.primary.metrics,
+                                  prepared_statements=self.primary.prepared_statements)
+            # No long-lived snapshots on the standby, which would delay replay
+            replica.db.conn.autocommit = True
+            return True
+        except Exception:
+            replica.db = None
+            return False
+
+    def _disconnect(self, replica):
+        if replica.db is not None:
+            try:
+                replica.db.conn.close()
+            except Exception:
+                pass
+        replica.db = None
+        replica.lag = None
+
+    def run_read(self, method, args, kwargs):
+        """Run a read-only method on a replica, falling back to the primary"""
+        db, reason = self.choose()
+        if db is not None:
+            result = method(db, *args, **kwargs)
+            if not db.conn.closed:
+                self._record("read", "replica", reason)
+                return result
+            # The replica went away mid-call (methods report errors, not raise)
+            for replica in self.replicas:
+                if replica.db is db:
+                    self._disconnect(replica)
+            reason = "failed"
+
+        self._record("read", "primary", reason)
+        return method(self.primary, *args, **kwargs)
+
+    def run_write(self, method, args, kwargs):
+        """Run a method on the primary and remember that this connection wrote"""
+        self._record("write", "primary", "write")
+        try:
+            return method(self.primary, *args, **kwargs)
+        finally:
+            self.last_write = time.monotonic()
+
+    def _record(self, kind, target, reason):
+        metrics = self.primary.metrics
+        if metrics is not None:
+            metrics.observe_route(kind, target, reason)
+
+    def close(self):
+        """Close every replica connection"""
+        for replica in self.replicas:
+            self._disconnect(replica)
+
+
+def read_only(method):
+    """Allow a Database method to run on a replica when replicas are configured"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        router = self.router
+        if router is None:
+            return method(self, *args, **kwargs)
+        return router.run_read(method, args, kwargs)
+
+    return wrapper
+
+
+def writes(method):
+    """Mark a Database method that must run on the primary"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        router = self.router
+        if router is None:
+            return method(self, *args, **kwargs)
+        return router.run_write(method, args, kwargs)
+
+    return wrapper
@@ -1,10 +1,6 @@
 # email_service.py - Email functionality for sending bills
 
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-import os
+# smtplib and the email.mime modules are imported when a bill is sent, not at startup
 import logging
 
 class EmailService:
@@ -38,6 +34,10 @@ class EmailService:
             return False
         
         try:
+            import smtplib
+            from email.mime.multipart import MIMEMultipart
+            from email.mime.text import MIMEText
+
             # Create message
             msg = MIMEMultipart()
             msg['From'] = self.username
@@ -75,8 +75,12 @@ Shopping Cart Team
             self.logger.error(f"Failed to send email: {str(e)}")
             return False
     
-    def send_bill_with_pdf(self, customer_email, customer_name, bill_content, invoice_id, pdf_path):
-        """Send bill to customer via email with PDF attachment"""
+    def send_bill_with_pdf(self, customer_email, customer_name, bill_content, invoice_id, pdf_data):
+        """Send bill to customer via email with PDF attachment
+
+        pdf_data is the PDF document as bytes (see pdf_invoice.render_invoice_pdf);
+        it is attached as it is, without going through a file.
+        """
         if not self.is_configured:
             self.logger.error("Email service not configured. Please configure with credentials first.")
             return False
@@ -85,11 +89,16 @@ Shopping Cart Team
             self.logger.error("Customer email is required")
             return False
             
-        if not os.path.exists(pdf_path):
-            self.logger.error(f"PDF file not found: {pdf_path}")
+        if not pdf_data:
+            self.logger.error("PDF document is required")
             return False
         
         try:
+            import smtplib
+            from email.mime.application import MIMEApplication
+            from email.mime.multipart import MIMEMultipart
+            from email.mime.text import MIMEText
+
             # Create message
             msg = MIMEMultipart()
             msg['From'] = self.username
@@ -110,10 +119,9 @@ Shopping Cart Team
             msg.attach(MIMEText(body, 'plain'))
             
             # Attach PDF
-            with open(pdf_path, 'rb') as f:
-                attachment = MIMEApplication(f.read(), _subtype="pdf")
-                attachment.add_header('Content-Disposition', 'attachment', filename=f"Invoice_{invoice_id}.pdf")
-                msg.attach(attachment)
+            attachment = MIMEApplication(pdf_data, _subtype="pdf")
+            attachment.add_header('Content-Disposition', 'attachment', filename=f"Invoice_{invoice_id}.pdf")
+            msg.attach(attachment)
             
             # Connect to SMTP server
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
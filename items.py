@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# items.py - Item name interning for invoice lines, and the backfill of item ids into existing lines
+
+import argparse
+import os
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Adds the names items does not have yet and returns the id of every name, in one round trip
+INTERN_ITEMS_SQL = """
+    WITH existing AS (
+        SELECT id, name FROM items WHERE name = ANY(%(names)s)
+    ), added AS (
+        INSERT INTO items (name)
+        SELECT name FROM unnest(%(names)s::text[]) AS name
+        WHERE name NOT IN (SELECT name FROM existing)
+        ON CONFLICT (name) DO NOTHING
+        RETURNING id, name
+    )
+    SELECT id, name FROM existing
+    UNION ALL
+    SELECT id, name FROM added
+"""
+
+
+class ItemIds:
+    # One interning table per database, shared by every connection in the process
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        """Item name -> items.id, so invoice lines are written with an integer id instead of the name
+
+        Items are never renamed or deleted, so an id stays valid for as long
+        as the process runs; a name missing here costs one round trip (see
+        intern()) the first time it is sold.
+        """
+        self.ids = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, key):
+        """The interning table of the database identified by key (e.g. its DSN)"""
+        with cls._shared_lock:
+            item_ids = cls._shared.get(key)
+            if item_ids is None:
+                item_ids = cls._shared[key] = cls()
+            return item_ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def missing(self, names):
+        """The distinct names without a known id"""
+        return sorted({name for name in names if name not in self.ids})
+
+    def intern(self, cursor, names):
+        """Look up or add names in items on cursor's transaction; the ids are remembered once it commits
+
+        Returns {name: id}; pass it to remember() after committing, so an id
+        from a rolled back insert is never reused.
+        """
+        found = {}
+        for _ in range(2):
+            cursor.execute(INTERN_ITEMS_SQL, {"names": [name for name in names if name not in found]})
+            found.update((name, item_id) for item_id, name in cursor.fetchall())
+            # A name another transaction added after this statement's snapshot is read again
+            if len(found) == len(names):
+                break
+        return found
+
+    def remember(self, ids):
+        with self._lock:
+            self.ids.update(ids)
+
+
+def main():
+    from config import DB_CONFIG
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Give existing invoice lines item ids in place of item names")
+    parser.add_argument("command", choices=["backfill", "status"])
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    try:
+        # Creates items and invoice_items.item_id, leaving existing lines to the loop below
+        db.setup_database(backfill=False)
+        months = [p["month"] for p in db.get_invoice_partitions() if p["table"] == "invoice_items"]
+        if args.command == "status":
+            pending = [month for month in months if db.item_ids_pending(month)]
+            print(f"{len(pending)} of {len(months)} months still have lines without item ids"
+                  + (f": {', '.join(f'{month:%Y-%m}' for month in pending)}" if pending else ""))
+            return
+
+        start = time.perf_counter()
+        total = 0
+        for month in months:
+            month_start = time.perf_counter()
+            lines = db.backfill_item_ids(month)
+            if lines is None:
+                raise SystemExit(f"Backfill of {month:%Y-%m} failed")
+            if lines:
+                print(f"{month:%Y-%m}: {lines} lines in {time.perf_counter() - month_start:.1f}s")
+            total += lines
+        if db.backfill_item_ids() is None:
+            raise SystemExit("Could not make invoice_items.item_id NOT NULL")
+        print(f"Backfilled {total} lines in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
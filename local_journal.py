@@ -0,0 +1,270 @@
+# local_journal.py - Local SQLite journal of checkouts, replayed to PostgreSQL in the background
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+class CheckoutJournal:
+    def __init__(self, path="checkout_journal.db", synchronous="FULL"):
+        """Open (or create) the till's checkout journal
+
+        The journal is a SQLite database in WAL mode: a checkout is one local
+        commit, readers (the sync status, the syncer) never block it, and with
+        synchronous=FULL a committed sale survives a power cut. Each thread
+        gets its own connection.
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checkouts (
+                    invoice_key TEXT PRIMARY KEY,
+                    created_at TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    synced_at TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    parked_at TEXT
+                )
+            """)
+            # Journals from before checkouts could be parked
+            if "parked_at" not in [row[1] for row in conn.execute("PRAGMA table_info(checkouts)")]:
+                conn.execute("ALTER TABLE checkouts ADD COLUMN parked_at TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_checkouts_pending ON checkouts (created_at) WHERE synced_at IS NULL")
+            # Last known customer details, so checkouts can be priced while the server is unreachable
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS customers (
+                    mobile TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def record(self, checkout):
+        """Commit a checkout (a dict with invoice_key and created_at) to the journal"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO checkouts (invoice_key, created_at, payload) VALUES (?, ?, ?)",
+                (checkout["invoice_key"], checkout["created_at"], json.dumps(checkout))
+            )
+
+    def pending(self, limit=200, exclude=()):
+        """Oldest checkouts not yet replayed to the server, leaving out parked ones and the keys in exclude"""
+        exclude = list(exclude)
+        rows = self._connection().execute(
+            "SELECT payload FROM checkouts WHERE synced_at IS NULL AND parked_at IS NULL "
+            f"AND invoice_key NOT IN ({', '.join('?' * len(exclude))}) ORDER BY created_at LIMIT ?",
+            exclude + [limit]
+        ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def mark_synced(self, invoice_keys):
+        """Record that checkouts reached the server"""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE checkouts SET synced_at = ?, last_error = NULL WHERE invoice_key = ?",
+                [(now, key) for key in invoice_keys]
+            )
+
+    def record_error(self, invoice_keys, error):
+        """Record why checkouts could not be replayed (e.g. the server is unreachable) without counting an attempt"""
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE checkouts SET last_error = ? WHERE invoice_key = ?",
+                [(str(error), key) for key in invoice_keys]
+            )
+
+    def mark_failed(self, invoice_keys, error, max_attempts=None):
+        """Record a replay the server rejected; a checkout rejected max_attempts times is parked
+
+        Parked checkouts are left out of pending() until unpark() is called
+        for them, so one the server will never accept does not hold up the
+        sales behind it.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._connection() as conn:
+            conn.executemany("""
+                UPDATE checkouts
+                SET attempts = attempts + 1, last_error = ?,
+                    parked_at = CASE WHEN attempts + 1 >= ? THEN ? END
+                WHERE invoice_key = ?
+            """, [(str(error), max_attempts, now, key) for key in invoice_keys])
+
+    def parked(self):
+        """Checkouts given up on: (invoice_key, created_at, attempts, last_error), oldest first"""
+        return self._connection().execute(
+            "SELECT invoice_key, created_at, attempts, last_error FROM checkouts "
+            "WHERE synced_at IS NULL AND parked_at IS NOT NULL ORDER BY created_at"
+        ).fetchall()
+
+    def unpark(self, invoice_keys):
+        """Queue parked checkouts for replay again (e.g. once the cause has been fixed)"""
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE checkouts SET parked_at = NULL, attempts = 0 WHERE invoice_key = ?",
+                [(key,) for key in invoice_keys]
+            )
+
+    def purge(self, older_than_days=30):
+        """Delete synced checkouts older than the given age"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM checkouts WHERE synced_at IS NOT NULL AND created_at < datetime('now', 'localtime', ?)",
+                (f"-{older_than_days} days",)
+            )
+            return cursor.rowcount
+
+    def status(self):
+        """Sync lag: pending count, age in seconds of the oldest pending checkout, last error, parked count"""
+        pending, oldest, parked = self._connection().execute(
+            "SELECT COUNT(*) FILTER (WHERE parked_at IS NULL), MIN(created_at) FILTER (WHERE parked_at IS NULL), "
+            "COUNT(*) FILTER (WHERE parked_at IS NOT NULL) FROM checkouts WHERE synced_at IS NULL"
+        ).fetchone()
+        last_error = None
+        lag = 0.0
+        if oldest:
+            lag = max(0.0, (datetime.now() - datetime.fromisoformat(oldest)).total_seconds())
+            row = self._connection().execute(
+                "SELECT last_error FROM checkouts WHERE synced_at IS NULL AND parked_at IS NULL "
+                "AND last_error IS NOT NULL ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            last_error = row[0] if row else None
+        return {"pending": pending, "lag_seconds": lag, "last_error": last_error, "parked": parked}
+
+    def remember_customer(self, customer):
+        """Cache a customer's details and balance"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO customers (mobile, payload, updated_at) VALUES (?, ?, ?)",
+                (customer["mobile"], json.dumps(customer, default=str), datetime.now().isoformat(timespec="seconds"))
+            )
+
+    def cached_customer(self, mobile):
+        """Last known details of a customer, or None"""
+        row = self._connection().execute("SELECT payload FROM customers WHERE mobile = ?", (mobile,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class JournalSyncer:
+    def __init__(self, journal, db_config=None, interval=2.0, batch_size=200, max_backoff=60.0, bill_storage="zlib",
+                 max_attempts=5):
+        """Replay journaled checkouts to PostgreSQL on a background thread
+
+        Batches are replayed with Database.replay_checkouts, which skips
+        invoice keys the server already has, so a batch interrupted after the
+        server committed is simply replayed again. A batch the server rejects
+        is replayed one checkout at a time, so the others still go through;
+        a checkout rejected on max_attempts syncs is parked (see
+        CheckoutJournal.parked). While the server is unreachable the syncer
+        reconnects with exponential backoff up to max_backoff seconds.
+        """
+        self.journal = journal
+        self.db_config = db_config
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.bill_storage = bill_storage
+        self.max_attempts = max_attempts
+        self.last_sync = None
+        self.db = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _database(self):
+        if self.db is None or self.db.conn.closed:
+            from models import Database
+            self.db = Database(self.db_config, bill_storage=self.bill_storage)
+        return self.db
+
+    def _replay(self, checkouts):
+        """Replay checkouts in one transaction; True if they reached the server, False if it rejected them
+
+        Raises ConnectionError if the server could not be reached.
+        """
+        try:
+            inserted = self._database().replay_checkouts(checkouts)
+        except Exception as e:
+            self.journal.record_error([checkout["invoice_key"] for checkout in checkouts], e)
+            raise ConnectionError(f"Could not replay {len(checkouts)} checkouts: {e}")
+        if inserted is None and self.db.conn.closed:
+            error = "the connection to the server was lost"
+            self.journal.record_error([checkout["invoice_key"] for checkout in checkouts], error)
+            raise ConnectionError(f"Could not replay {len(checkouts)} checkouts: {error}")
+        return inserted is not None
+
+    def sync_once(self):
+        """Replay every pending checkout; return how many were sent
+
+        Checkouts the server rejects are retried on the next sync (and
+        parked after max_attempts); the rest are sent regardless. Raises
+        ConnectionError if the server could not be reached.
+        """
+        sent = 0
+        rejected = set()
+        while True:
+            batch = self.journal.pending(self.batch_size, exclude=rejected)
+            if not batch:
+                self.last_sync = time.time()
+                return sent
+
+            if self._replay(batch):
+                self.journal.mark_synced([checkout["invoice_key"] for checkout in batch])
+                sent += len(batch)
+                continue
+
+            # One bad checkout fails its whole batch: find it by replaying them one by one
+            for checkout in batch:
+                key = checkout["invoice_key"]
+                if self._replay([checkout]):
+                    self.journal.mark_synced([key])
+                    sent += 1
+                else:
+                    self.journal.mark_failed([key], "the server rejected the checkout", self.max_attempts)
+                    rejected.add(key)
+
+    def start(self):
+        """Run the syncer on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, name="journal-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop the thread after its current batch"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self):
+        """Sync every interval, backing off while the server is down"""
+        delay = self.interval
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                delay = self.interval
+            except Exception as e:
+                print(f"Journal sync error: {e}")
+                delay = min(self.max_backoff, max(self.interval, delay * 2))
+            self._stop.wait(delay)
+        self.journal.close()
+        if self.db is not None:
+            self.db.close()
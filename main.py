@@ -4,8 +4,40 @@ from controller import ShoppingCartController
 from config import DB_CONFIG, EMAIL_CONFIG, APP_SETTINGS
 
 def main():
+    # Optional query instrumentation, e.g. in config.py:
+    # APP_SETTINGS["query_metrics"] = {"slow_query_ms": 100, "slow_query_log": "slow_queries.log",
+    #                                  "dump_path": "query_metrics.prom"}
+    metrics_settings = dict(APP_SETTINGS.get("query_metrics") or {})
+    metrics_path = metrics_settings.pop("dump_path", None)
+    metrics = None
+    if APP_SETTINGS.get("query_metrics"):
+        # db_metrics imports psycopg2, which is otherwise loaded on the database thread after startup
+        from db_metrics import QueryMetrics
+        metrics = QueryMetrics(**metrics_settings)
+
+    # Optional read replicas, e.g. APP_SETTINGS["db_replicas"] = ["host=replica1 dbname=shopping_cart"]
+    # Bill text storage: "zlib" (default), "text" or "none" (re-rendered from invoice items)
+    # Email bills as PDF attachments: APP_SETTINGS["email_pdf"] = True
+    # Local-first checkout, e.g. APP_SETTINGS["checkout_journal"] = {"path": "checkout_journal.db", "sync_interval": 2}
+    # Cache customers and suggestions across tills, e.g. APP_SETTINGS["customer_cache"] = {"ttl": 300}
+    # Live dashboard, e.g. APP_SETTINGS["dashboard"] = {"refresh_interval": 1, "reconcile_interval": 60}
+    # Barcode scanner input mode, e.g. APP_SETTINGS["scanner"] = {"max_key_gap_ms": 30, "min_length": 4}
+    journal_settings = APP_SETTINGS.get("checkout_journal") or {}
+    dashboard_settings = APP_SETTINGS.get("dashboard") or {}
+    scanner_settings = APP_SETTINGS.get("scanner") or {}
     # Create controller and run application with configuration
-    app = ShoppingCartController(db_config=DB_CONFIG, email_config=EMAIL_CONFIG)
+    app = ShoppingCartController(db_config=DB_CONFIG, email_config=EMAIL_CONFIG,
+                                 metrics=metrics, metrics_path=metrics_path,
+                                 db_replicas=APP_SETTINGS.get("db_replicas"),
+                                 bill_storage=APP_SETTINGS.get("bill_storage", "zlib"),
+                                 journal_path=journal_settings.get("path"),
+                                 sync_interval=journal_settings.get("sync_interval", 2.0),
+                                 email_pdf=APP_SETTINGS.get("email_pdf", False),
+                                 dashboard_interval=dashboard_settings.get("refresh_interval", 1.0),
+                                 reconcile_interval=dashboard_settings.get("reconcile_interval", 60.0),
+                                 customer_cache_ttl=(APP_SETTINGS.get("customer_cache") or {}).get("ttl"),
+                                 scanner_gap_ms=scanner_settings.get("max_key_gap_ms"),
+                                 scanner_min_length=scanner_settings.get("min_length", 4))
     app.run()
 
 if __name__ == "__main__":
@@ -1,38 +1,512 @@
 # models.py - PostgreSQL database models and operations
 
+import calendar
 import psycopg2
-from psycopg2.extras import DictCursor
-from datetime import datetime
+from psycopg2 import errors, extensions
+from psycopg2.extras import DictCursor, Json, execute_values
+from datetime import date, datetime, timedelta
+
+from catalog import PRODUCTS_CHANNEL, RELOAD_ALL
+from customer_cache import DETAILS_CHANNEL, POINTS_CHANNEL
+from db_metrics import InstrumentedCursor, instrumented
+from db_routing import ReplicaRouter, read_only, writes
+from items import ItemIds
+from utils import BillStorage, PriceFormatter, RenderCache, RewardSystem
+
+# A customer's balance: points folded into customers plus ledger entries not yet folded
+BALANCE_SQL = (
+    "c.points + COALESCE((SELECT SUM(l.delta) FROM points_ledger l "
+    "WHERE l.customer_id = c.id AND NOT l.folded), 0)"
+)
+
+# Dates of birth are entered and shown as DD/MM/YYYY and stored as DATE. DOB_TEXT_SQL goes through
+# dob::text (ISO for a DATE) so it also reads the DD/MM/YYYY text of a database still being converted
+DOB_FORMAT = "%d/%m/%Y"
+DOB_TEXT_SQL = r"regexp_replace(c.dob::text, '^([0-9]{4})-([0-9]{2})-([0-9]{2})$', '\3/\2/\1')"
+
+# Hot queries prepared once per connection: name -> (parameter types, query with %s placeholders)
+PREPARED_STATEMENTS = {
+    "customer_by_mobile": (
+        ("text",),
+        f"SELECT c.id, c.name, c.mobile, {DOB_TEXT_SQL}, c.email, {BALANCE_SQL} FROM customers c WHERE c.mobile = %s"
+    ),
+    "customer_id_by_mobile": (
+        ("text",),
+        "SELECT id FROM customers WHERE mobile = %s"
+    ),
+    "insert_invoice": (
+        ("integer", "numeric", "numeric", "numeric", "text", "bytea"),
+        """INSERT INTO invoices (customer_id, total_amount, discount_amount, final_amount, bill_content, bill_compressed)
+           VALUES (%s, %s, %s, %s, %s, %s)
+           RETURNING id, created_at"""
+    ),
+    "insert_invoice_item": (
+        ("integer", "integer", "integer", "numeric", "numeric", "timestamp"),
+        """INSERT INTO invoice_items (invoice_id, item_id, quantity, price, total, created_at)
+           VALUES (%s, %s, %s, %s, %s, %s)"""
+    ),
+    # Replays a journaled checkout; a key the server already has inserts nothing
+    "replay_invoice": (
+        ("text", "text", "numeric", "numeric", "numeric", "text", "bytea", "timestamp"),
+        """INSERT INTO invoices (invoice_key, customer_id, total_amount, discount_amount, final_amount,
+                                 bill_content, bill_compressed, created_at)
+           VALUES (%s, (SELECT id FROM customers WHERE mobile = %s), %s, %s, %s, %s, %s, %s)
+           ON CONFLICT (invoice_key, created_at) DO NOTHING
+           RETURNING id, customer_id"""
+    ),
+    "add_customer_points": (
+        ("integer", "integer", "integer"),
+        """INSERT INTO points_ledger (customer_id, delta, reason, invoice_id)
+           VALUES (%s, %s, 'purchase', %s)"""
+    ),
+    # Setting a balance appends the difference, so the history stays complete
+    "set_customer_points": (
+        ("integer", "text"),
+        f"""INSERT INTO points_ledger (customer_id, delta, reason)
+            SELECT c.id, %s - ({BALANCE_SQL}), 'adjustment'
+            FROM customers c
+            WHERE c.mobile = %s"""
+    ),
+    "accrue_points": (
+        ("text", "numeric"),
+        "SELECT * FROM accrue_points(%s, %s)"
+    ),
+}
+
+# Bump whenever setup_database changes the schema: a database already at
+# this version skips the DDL at startup (see schema_is_current)
+SCHEMA_VERSION = 7
+
+# Checkpointed top items sketches (top_items.py) not updated for this long are dropped
+ITEM_SKETCH_RETENTION_DAYS = 7
+
+# Saving more products than this at once notifies listeners to reload the whole catalog
+PRODUCT_NOTIFY_LIMIT = 100
+
+# invoices and invoice_items are range partitioned by month on created_at;
+# setup_database keeps partitions this many months ahead of the current one
+PARTITIONED_TABLES = ("invoices", "invoice_items")
+PARTITION_MONTHS_AHEAD = 3
+
+# Sales report queries. invoice_items carries its invoice's created_at, so
+# both queries prune to the partitions of the requested date range.
+SALES_SUMMARY_SQL = """
+    SELECT
+        COUNT(*) as invoice_count,
+        SUM(total_amount) as total_sales,
+        SUM(discount_amount) as total_discount,
+        SUM(final_amount) as final_sales
+    FROM invoices
+    WHERE created_at BETWEEN %s AND %s
+"""
+TOP_ITEMS_SQL = """
+    SELECT
+        items.name,
+        top.total_quantity,
+        top.total_sales
+    FROM (
+        SELECT
+            item_id,
+            SUM(quantity) as total_quantity,
+            SUM(total) as total_sales
+        FROM invoice_items
+        WHERE created_at BETWEEN %s AND %s
+        GROUP BY item_id
+        ORDER BY total_quantity DESC
+        LIMIT 5
+    ) top
+    JOIN items ON items.id = top.item_id
+    ORDER BY top.total_quantity DESC
+"""
+
+# A customer's birthday as month * 100 + day (615 for 15 June). idx_customers_birthday indexes the
+# same expression, then id, the ORDER BY of BIRTHDAYS_SQL, so a range of birthdays can be read in
+# list order by an index range scan, and a LIMIT stops it early
+BIRTHDAY_SQL = "(EXTRACT(MONTH FROM c.dob)::integer * 100 + EXTRACT(DAY FROM c.dob)::integer)"
+BIRTHDAY_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_customers_birthday
+    ON customers ((EXTRACT(MONTH FROM dob)::integer * 100 + EXTRACT(DAY FROM dob)::integer), id)
+"""
+# Birthdays from one key to another within a calendar year (see get_birthdays)
+BIRTHDAYS_SQL = f"""
+    SELECT c.id, c.name, c.mobile, c.email, c.dob, {BALANCE_SQL}
+    FROM customers c
+    WHERE {BIRTHDAY_SQL} BETWEEN %(first)s AND %(last)s
+    ORDER BY {BIRTHDAY_SQL}, c.id
+    LIMIT %(limit)s
+"""
+
+# Today's and this hour's totals for the live dashboard, plus which of the
+# invoice keys the dashboard has counted locally the server already has
+LIVE_SALES_SQL = """
+    SELECT
+        COUNT(*),
+        COALESCE(SUM(total_amount), 0),
+        COALESCE(SUM(discount_amount), 0),
+        COALESCE(SUM(final_amount), 0),
+        COUNT(*) FILTER (WHERE created_at >= %(hour)s),
+        COALESCE(SUM(total_amount) FILTER (WHERE created_at >= %(hour)s), 0),
+        COALESCE(SUM(discount_amount) FILTER (WHERE created_at >= %(hour)s), 0),
+        COALESCE(SUM(final_amount) FILTER (WHERE created_at >= %(hour)s), 0),
+        COALESCE(array_agg(invoice_key) FILTER (WHERE invoice_key = ANY(%(keys)s)), '{}')
+    FROM invoices
+    WHERE created_at >= %(day)s AND created_at < %(end)s
+"""
+
+
+def month_start(value):
+    """First day of the month containing a date or datetime"""
+    return date(value.year, value.month, 1)
+
+
+def to_date(value):
+    """A date from a date, datetime or YYYY-MM-DD string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def parse_dob(value):
+    """A DD/MM/YYYY date of birth (or a date) as a date, None if empty"""
+    if isinstance(value, date):
+        return value
+    value = (value or "").strip()
+    return datetime.strptime(value, DOB_FORMAT).date() if value else None
+
+
+def birthday_key(day):
+    """month * 100 + day of a date, with 28 February standing for 29 February in years without one"""
+    if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year):
+        return 229
+    return day.month * 100 + day.day
+
+
+def add_months(value, months):
+    """First day of the month months after the month containing value"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    """Name of the monthly partition of table starting at month"""
+    return f"{table}_p{month:%Y_%m}"
+
+
+# Discount from the pre-purchase balance, then append the points earned on the
+# discounted amount. The customer row is locked (without writing a new row
+# version) so concurrent checkouts for one customer see each other's entries;
+# the balance is read in a separate statement so it includes them.
+ACCRUE_POINTS_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION accrue_points(p_mobile TEXT, p_subtotal NUMERIC)
+    RETURNS TABLE (
+        customer_id INTEGER, customer_name TEXT, customer_email TEXT, previous_points INTEGER,
+        discount_percentage NUMERIC, points_earned INTEGER, points_balance INTEGER, tier TEXT
+    )
+    LANGUAGE plpgsql AS $$
+    #variable_conflict use_column
+    DECLARE
+        v_balance INTEGER;
+        v_discount NUMERIC;
+        v_earned INTEGER;
+    BEGIN
+        SELECT c.id, c.name, c.email INTO customer_id, customer_name, customer_email
+        FROM customers c
+        WHERE c.mobile = p_mobile
+        FOR NO KEY UPDATE;
+        IF NOT FOUND THEN
+            RETURN;
+        END IF;
+
+        SELECT {BALANCE_SQL} INTO v_balance FROM customers c WHERE c.id = customer_id;
+        v_discount := {RewardSystem.discount_sql("v_balance")};
+        v_earned := (FLOOR(p_subtotal * (1 - v_discount) / 100) * {RewardSystem.POINTS_PER_100})::integer;
+
+        IF v_earned <> 0 THEN
+            INSERT INTO points_ledger (customer_id, delta, reason) VALUES (customer_id, v_earned, 'purchase');
+            PERFORM pg_notify('{POINTS_CHANNEL}', p_mobile);
+        END IF;
+
+        previous_points := v_balance;
+        discount_percentage := v_discount;
+        points_earned := v_earned;
+        points_balance := v_balance + v_earned;
+        tier := {RewardSystem.tier_sql("v_balance + v_earned")};
+        RETURN NEXT;
+    END
+    $$
+"""
+
+# Lines written with an item name instead of an id (by a till that predates the
+# items table, or a bulk COPY) get the name's id, adding the item if it is new
+INVOICE_ITEM_ID_FUNCTION = """
+    CREATE OR REPLACE FUNCTION invoice_item_id() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF NEW.item_id IS NULL AND NEW.item_name IS NOT NULL THEN
+            SELECT id INTO NEW.item_id FROM items WHERE name = NEW.item_name;
+            IF NOT FOUND THEN
+                INSERT INTO items (name) VALUES (NEW.item_name) ON CONFLICT (name) DO NOTHING;
+                SELECT id INTO NEW.item_id FROM items WHERE name = NEW.item_name;
+            END IF;
+        END IF;
+        NEW.item_name := NULL;
+        RETURN NEW;
+    END
+    $$
+"""
+
+# DD/MM/YYYY text as a date, or NULL if it is not a date in that form. Used while
+# customers.dob is still text: batches fill dob_date from dob, and a trigger
+# keeps it in step with tills that still write the text
+CUSTOMER_DOB_FUNCTIONS = """
+    CREATE OR REPLACE FUNCTION parse_dob(p_dob TEXT) RETURNS DATE
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    DECLARE
+        v_parts TEXT[] := regexp_match(p_dob, '^[[:space:]]*([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})[[:space:]]*$');
+    BEGIN
+        IF v_parts IS NULL THEN
+            RETURN NULL;
+        END IF;
+        RETURN make_date(v_parts[3]::integer, v_parts[2]::integer, v_parts[1]::integer);
+    EXCEPTION WHEN datetime_field_overflow THEN
+        RETURN NULL;
+    END
+    $$;
+
+    CREATE OR REPLACE FUNCTION customer_dob_date() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        -- save_customer writes a date, which arrives here as YYYY-MM-DD text
+        IF NEW.dob ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2}$' THEN
+            NEW.dob := to_char(NEW.dob::date, 'DD/MM/YYYY');
+        END IF;
+        NEW.dob_date := parse_dob(NEW.dob);
+        RETURN NEW;
+    END
+    $$
+"""
+PARSE_CUSTOMER_DOBS = """
+    WITH batch AS (
+        SELECT id FROM customers WHERE id > %s ORDER BY id LIMIT %s
+    ), parsed AS (
+        UPDATE customers c
+        SET dob_date = parse_dob(c.dob)
+        FROM batch
+        WHERE c.id = batch.id AND c.dob_date IS NULL AND NULLIF(trim(c.dob), '') IS NOT NULL
+        RETURNING c.dob_date
+    )
+    SELECT (SELECT MAX(id) FROM batch), COUNT(*), COUNT(*) FILTER (WHERE dob_date IS NULL)
+    FROM parsed
+"""
+# Customers parsed per transaction when converting dob
+DOB_BATCH_SIZE = 20000
+
+# Fold one batch of ledger entries into customers.points. Only one rollup runs
+# at a time; marking entries folded and adding them to the balance commit together.
+FOLD_POINTS_LEDGER = """
+    WITH batch AS (
+        SELECT id FROM points_ledger
+        WHERE NOT folded
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ), folded AS (
+        UPDATE points_ledger l SET folded = TRUE
+        FROM batch b
+        WHERE l.id = b.id
+        RETURNING l.customer_id, l.delta
+    ), totals AS (
+        SELECT customer_id, SUM(delta) AS delta FROM folded GROUP BY customer_id
+    ), updated AS (
+        UPDATE customers c SET points = c.points + t.delta
+        FROM totals t
+        WHERE c.id = t.customer_id
+        RETURNING c.id
+    )
+    SELECT (SELECT COUNT(*) FROM folded), (SELECT COUNT(*) FROM updated)
+"""
 
 class Database:
-    def __init__(self, db_config=None):
-        """Initialize PostgreSQL database connection"""
-        try:
-            if db_config is None:
-                db_config = {
-                    'host': 'localhost',
-                    'port': 5432,
-                    'database': 'shopping_cart',
-                    'user': 'postgres',
-                    'password': ''
-                }
-
-            self.conn = psycopg2.connect(
-                host=db_config.get('host', 'localhost'),
-                port=db_config.get('port', 5432),
-                dbname=db_config.get('database', 'shopping_cart'),
-                user=db_config.get('user', 'postgres'),
-                password=db_config.get('password', '')
-            )
+    # Rendered bills shared by every connection in the process (invoices never change)
+    bill_cache = RenderCache(256)
+
+    def __init__(self, db_config=None, metrics=None, prepared_statements=True, replicas=None, max_replica_lag=5.0,
+                 bill_storage="zlib"):
+        """Initialize PostgreSQL database connection
+
+        db_config is a dict of connection settings or a libpq DSN string.
+        Pass a db_metrics.QueryMetrics as metrics to time every method and statement.
+        With prepared_statements the hot queries in PREPARED_STATEMENTS are
+        parsed and planned once per connection instead of on every call.
+        replicas is a list of configs (or DSNs) for streaming replicas: read-only
+        methods run on a replica at most max_replica_lag seconds behind, and
+        on this (primary) connection otherwise.
+        bill_storage is one of BillStorage.MODES: save_invoice stores bill text
+        as text, zlib-compressed, or not at all (get_invoice_bill re-renders it).
+        """
+        if bill_storage not in BillStorage.MODES:
+            raise ValueError(f"Unknown bill storage mode: {bill_storage}")
+        self.bill_storage = bill_storage
+        self.metrics = None
+        self.prepared_statements = prepared_statements
+        self._prepared = set()  # Statements prepared on self.conn
+        self.router = None
+        try:
+            if isinstance(db_config, str):
+                self.conn = psycopg2.connect(db_config)
+            else:
+                if db_config is None:
+                    db_config = {
+                        'host': 'localhost',
+                        'port': 5432,
+                        'database': 'shopping_cart',
+                        'user': 'postgres',
+                        'password': ''
+                    }
+
+                self.conn = psycopg2.connect(
+                    host=db_config.get('host', 'localhost'),
+                    port=db_config.get('port', 5432),
+                    dbname=db_config.get('database', 'shopping_cart'),
+                    user=db_config.get('user', 'postgres'),
+                    password=db_config.get('password', '')
+                )
             self.conn.autocommit = False
             self.cursor = self.conn.cursor(cursor_factory=DictCursor)
+            self.item_ids = ItemIds.shared(self.conn.dsn)
+            if metrics is not None:
+                self.enable_metrics(metrics)
+            if replicas:
+                self.router = ReplicaRouter(self, replicas, max_lag=max_replica_lag)
             print("Connected to PostgreSQL database")
         except Exception as e:
             print(f"Error connecting to database: {e}")
             raise
 
-    def setup_database(self):
-        """Setup PostgreSQL database tables"""
+    def enable_metrics(self, metrics):
+        """Start recording method and statement statistics into metrics"""
+        cursor = self.conn.cursor(cursor_factory=InstrumentedCursor)
+        cursor.metrics = metrics
+        self.cursor = cursor
+        self.metrics = metrics
+        if self.router is not None:
+            for replica in self.router.replicas:
+                if replica.db is not None:
+                    replica.db.enable_metrics(metrics)
+
+    def disable_metrics(self):
+        """Stop recording statistics"""
+        self.cursor = self.conn.cursor(cursor_factory=DictCursor)
+        self.metrics = None
+        if self.router is not None:
+            for replica in self.router.replicas:
+                if replica.db is not None:
+                    replica.db.disable_metrics()
+
+    def execute_prepared(self, name, params):
+        """Execute a statement from PREPARED_STATEMENTS, preparing it on first use
+
+        Prepared statements live as long as the server session, so a new
+        connection starts with an empty set, and one the server has dropped
+        them on (DISCARD ALL from a pooler, or a pooler handing over another
+        server connection) fails with InvalidSqlStatementName. The set is then
+        read back from the server and, if the statement was the first of its
+        transaction, it is prepared again and retried. Later in a transaction the earlier
+        statements are already rolled back, so the error is raised for the
+        caller to handle like any other.
+        """
+        param_types, query = PREPARED_STATEMENTS[name]
+        if not self.prepared_statements:
+            self.cursor.execute(query, params)
+            return
+
+        first_statement = self.conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        for attempt in range(2):
+            if name not in self._prepared:
+                positional = query
+                for number in range(1, len(param_types) + 1):
+                    positional = positional.replace("%s", f"${number}", 1)
+                self.cursor.execute(f"PREPARE {name} ({', '.join(param_types)}) AS {positional}")
+                self._prepared.add(name)
+
+            try:
+                self.cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+                return
+            except errors.InvalidSqlStatementName:
+                # Start again from the statements the session really has
+                self.conn.rollback()
+                self.cursor.execute("SELECT name FROM pg_prepared_statements")
+                self._prepared = {row[0] for row in self.cursor.fetchall()}
+                self.conn.rollback()
+                if not first_statement or attempt:
+                    raise
+
+    def _notify(self, channel, payload):
+        """Queue a change notification (a mobile or SKU); it is delivered when the transaction commits"""
+        self.cursor.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+    def _item_ids(self, names):
+        """items.id of each name, from the interning cache
+
+        Names not seen before are added to items and committed before the
+        caller's writes begin, so a rolled back invoice leaves no id in the
+        cache that the database does not have.
+        """
+        missing = self.item_ids.missing(names)
+        if missing:
+            found = self.item_ids.intern(self.cursor, missing)
+            self.conn.commit()
+            self.item_ids.remember(found)
+        return [self.item_ids.ids[name] for name in names]
+
+    @instrumented
+    @writes
+    def schema_is_current(self):
+        """True if setup_database has run at SCHEMA_VERSION and upcoming partitions exist"""
+        return self._schema_is_current()
+
+    def _schema_is_current(self):
+        try:
+            # item_id is made NOT NULL once every invoice line has one (see _backfill_item_ids),
+            # and dob becomes a DATE once every customer's has been parsed (see _convert_customer_dobs)
+            self.cursor.execute("""
+                SELECT to_regclass('schema_info') IS NOT NULL, to_regclass(%s) IS NOT NULL,
+                       COALESCE((SELECT attnotnull FROM pg_attribute
+                                 WHERE attrelid = to_regclass('invoice_items') AND attname = 'item_id'), FALSE),
+                       COALESCE((SELECT atttypid = 'date'::regtype FROM pg_attribute
+                                 WHERE attrelid = to_regclass('customers') AND attname = 'dob'), FALSE)
+            """, (partition_name("invoices", add_months(date.today(), PARTITION_MONTHS_AHEAD)),))
+            has_info, has_partitions, has_item_ids, has_dates = self.cursor.fetchone()
+            version = None
+            if has_info and has_partitions and has_item_ids and has_dates:
+                self.cursor.execute("SELECT MAX(version) FROM schema_info")
+                version = self.cursor.fetchone()[0]
+            self.conn.commit()
+            return version is not None and version >= SCHEMA_VERSION
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return False
+
+    @instrumented
+    @writes
+    def setup_database(self, force=False, backfill=True):
+        """Setup PostgreSQL database tables
+
+        Skipped (one catalog query, no DDL) when the schema is already at
+        SCHEMA_VERSION, unless force is set. Invoice lines written before
+        the items table existed are given item ids here too, and dates of
+        birth stored as text are converted to dates; on a large database
+        run `python items.py backfill` and `python birthdays.py migrate`
+        first, which do the same in batches and call this with
+        backfill=False.
+        """
+        if not force and self._schema_is_current():
+            return
+
         try:
             # Create customers table
             self.cursor.execute("""
@@ -40,37 +514,167 @@ class Database:
                     id SERIAL PRIMARY KEY,
                     name TEXT NOT NULL,
                     mobile TEXT UNIQUE NOT NULL,
-                    dob TEXT,
+                    dob DATE,
                     email TEXT,
                     points INTEGER DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
 
-            # Create invoices table
+            # Reward tier as of the last tier_recompute run, for tier reports without reading every balance
+            self.cursor.execute("ALTER TABLE customers ADD COLUMN IF NOT EXISTS tier TEXT")
+
+            # dob was DD/MM/YYYY text before it was a DATE
+            if self._customer_dobs_pending():
+                self._prepare_customer_dobs()
+                if backfill:
+                    self._convert_customer_dobs()
+            else:
+                self.cursor.execute(BIRTHDAY_INDEX)
+
+            # Tier thresholds shared by SQL reports and the tier recompute job, kept in line with RewardSystem.TIERS
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reward_tiers (
+                    name TEXT PRIMARY KEY,
+                    min_points INTEGER NOT NULL,
+                    discount NUMERIC(4,3) NOT NULL
+                )
+            """)
+            for name, minimum, discount in RewardSystem.TIERS:
+                self.cursor.execute("""
+                    INSERT INTO reward_tiers (name, min_points, discount) VALUES (%s, %s, %s)
+                    ON CONFLICT (name) DO UPDATE SET min_points = EXCLUDED.min_points, discount = EXCLUDED.discount
+                """, (name, minimum, discount))
+            self.cursor.execute(
+                "DELETE FROM reward_tiers WHERE name <> ALL(%s)", ([tier[0] for tier in RewardSystem.TIERS],)
+            )
+
+            # Databases created before partitioning keep their rows in plain tables
+            self.cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('invoices')")
+            row = self.cursor.fetchone()
+            legacy = row is not None and row[0] == "r"
+            if legacy:
+                self._rename_unpartitioned_invoices()
+
+            # Create invoices table, partitioned by month (see ensure_invoice_partitions)
+            self.cursor.execute("CREATE SEQUENCE IF NOT EXISTS invoices_id_seq")
             self.cursor.execute("""
                 CREATE TABLE IF NOT EXISTS invoices (
-                    id SERIAL PRIMARY KEY,
+                    id INTEGER NOT NULL DEFAULT nextval('invoices_id_seq'),
                     customer_id INTEGER,
                     total_amount NUMERIC(10,2) NOT NULL,
                     discount_amount NUMERIC(10,2) NOT NULL,
                     final_amount NUMERIC(10,2) NOT NULL,
                     bill_content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    bill_compressed BYTEA,
+                    invoice_key TEXT,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (id, created_at),
                     FOREIGN KEY (customer_id) REFERENCES customers (id)
+                ) PARTITION BY RANGE (created_at)
+            """)
+            self.cursor.execute("ALTER SEQUENCE invoices_id_seq OWNED BY invoices.id")
+            self.cursor.execute("ALTER TABLE invoices ADD COLUMN IF NOT EXISTS bill_compressed BYTEA")
+            # Idempotency key of invoices replayed from a till's local journal
+            self.cursor.execute("ALTER TABLE invoices ADD COLUMN IF NOT EXISTS invoice_key TEXT")
+            self.cursor.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_invoice_key ON invoices (invoice_key, created_at)"
+            )
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_invoices_customer_id ON invoices (customer_id)")
+
+            # Item names, stored once; invoice lines refer to them by id (see items.ItemIds)
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    id SERIAL PRIMARY KEY,
+                    name TEXT UNIQUE NOT NULL
                 )
             """)
 
-            # Create invoice items table
+            # Create invoice items table; created_at is the invoice's, so items share its partition.
+            # item_name is only set by writers that predate item_id, and the trigger below clears it
+            self.cursor.execute("CREATE SEQUENCE IF NOT EXISTS invoice_items_id_seq")
             self.cursor.execute("""
                 CREATE TABLE IF NOT EXISTS invoice_items (
-                    id SERIAL PRIMARY KEY,
+                    id INTEGER NOT NULL DEFAULT nextval('invoice_items_id_seq'),
                     invoice_id INTEGER NOT NULL,
-                    item_name TEXT NOT NULL,
+                    item_id INTEGER NOT NULL REFERENCES items (id),
+                    item_name TEXT,
                     quantity INTEGER NOT NULL,
                     price NUMERIC(10,2) NOT NULL,
                     total NUMERIC(10,2) NOT NULL,
-                    FOREIGN KEY (invoice_id) REFERENCES invoices (id)
+                    created_at TIMESTAMP NOT NULL,
+                    PRIMARY KEY (id, created_at),
+                    FOREIGN KEY (invoice_id, created_at) REFERENCES invoices (id, created_at)
+                ) PARTITION BY RANGE (created_at)
+            """)
+            self.cursor.execute("ALTER SEQUENCE invoice_items_id_seq OWNED BY invoice_items.id")
+            self.cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items (invoice_id)"
+            )
+            # Lines written before items existed keep their names until backfilled (item_ids_pending)
+            self.cursor.execute(
+                "ALTER TABLE invoice_items ADD COLUMN IF NOT EXISTS item_id INTEGER REFERENCES items (id)"
+            )
+            self.cursor.execute("ALTER TABLE invoice_items ALTER COLUMN item_name DROP NOT NULL")
+            self.cursor.execute(INVOICE_ITEM_ID_FUNCTION)
+            self.cursor.execute("DROP TRIGGER IF EXISTS invoice_items_item_id ON invoice_items")
+            self.cursor.execute("""
+                CREATE TRIGGER invoice_items_item_id BEFORE INSERT ON invoice_items
+                FOR EACH ROW EXECUTE FUNCTION invoice_item_id()
+            """)
+
+            today = date.today()
+            self._create_invoice_partitions(month_start(today), add_months(today, PARTITION_MONTHS_AHEAD))
+            if legacy:
+                self._copy_unpartitioned_invoices()
+            if backfill:
+                self._backfill_item_ids()
+
+            # Create append-only reward points ledger, folded into customers.points in the background
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS points_ledger (
+                    id BIGSERIAL PRIMARY KEY,
+                    customer_id INTEGER NOT NULL,
+                    delta INTEGER NOT NULL,
+                    reason TEXT NOT NULL,
+                    invoice_id INTEGER,
+                    folded BOOLEAN NOT NULL DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (customer_id) REFERENCES customers (id)
+                )
+            """)
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_points_ledger_unfolded
+                ON points_ledger (customer_id) WHERE NOT folded
+            """)
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_points_ledger_customer
+                ON points_ledger (customer_id, created_at)
+            """)
+            self.cursor.execute(ACCRUE_POINTS_FUNCTION)
+
+            # Top-selling items sketches of the current hour and day, checkpointed by each till or service
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS item_sketches (
+                    window_kind TEXT NOT NULL,
+                    window_start TIMESTAMP NOT NULL,
+                    source TEXT NOT NULL,
+                    sketch JSONB NOT NULL,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (window_kind, window_start, source)
+                )
+            """)
+
+            # Product catalog, loaded into memory by catalog.ProductCatalog
+            self.cursor.execute("""
+                CREATE TABLE IF NOT EXISTS products (
+                    id SERIAL PRIMARY KEY,
+                    sku TEXT UNIQUE NOT NULL,
+                    barcode TEXT UNIQUE,
+                    name TEXT NOT NULL,
+                    price NUMERIC(10, 2) NOT NULL,
+                    active BOOLEAN NOT NULL DEFAULT TRUE,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
             """)
 
@@ -87,6 +691,10 @@ class Database:
                 )
             """)
 
+            self.cursor.execute("CREATE TABLE IF NOT EXISTS schema_info (version INTEGER NOT NULL)")
+            self.cursor.execute("DELETE FROM schema_info")
+            self.cursor.execute("INSERT INTO schema_info (version) VALUES (%s)", (SCHEMA_VERSION,))
+
             # Commit changes
             self.conn.commit()
             print("Database tables created successfully")
@@ -96,11 +704,342 @@ class Database:
             print(f"Error setting up database: {e}")
             raise
 
+    def _rename_unpartitioned_invoices(self):
+        """Move plain invoices/invoice_items tables aside before partitioning"""
+        for table in ("invoice_items", "invoices"):
+            self.cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+        for index in ("invoices_pkey", "invoice_items_pkey", "idx_invoices_customer_id", "idx_invoice_items_invoice_id"):
+            self.cursor.execute(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned")
+
+    def _copy_unpartitioned_invoices(self):
+        """Copy rows from the renamed plain tables into partitions and drop them"""
+        self.cursor.execute("SELECT MIN(created_at), MAX(created_at) FROM invoices_unpartitioned")
+        first, last = self.cursor.fetchone()
+        if first is not None:
+            self._create_invoice_partitions(month_start(first), month_start(last))
+
+        self.cursor.execute("""
+            INSERT INTO invoices (id, customer_id, total_amount, discount_amount, final_amount, bill_content, created_at)
+            SELECT id, customer_id, total_amount, discount_amount, final_amount, bill_content,
+                   COALESCE(created_at, CURRENT_TIMESTAMP)
+            FROM invoices_unpartitioned
+        """)
+        self.cursor.execute("""
+            INSERT INTO invoice_items (id, invoice_id, item_name, quantity, price, total, created_at)
+            SELECT ii.id, ii.invoice_id, ii.item_name, ii.quantity, ii.price, ii.total, i.created_at
+            FROM invoice_items_unpartitioned ii
+            JOIN invoices i ON i.id = ii.invoice_id
+        """)
+        self.cursor.execute("DROP TABLE invoice_items_unpartitioned, invoices_unpartitioned")
+        print("Moved existing invoices into monthly partitions")
+
+    def _create_invoice_partitions(self, first_month, last_month):
+        """Create missing monthly partitions from first_month to last_month inclusive"""
+        created = []
+        month = first_month
+        while month <= last_month:
+            following = add_months(month, 1)
+            for table in PARTITIONED_TABLES:
+                name = partition_name(table, month)
+                self.cursor.execute("SELECT to_regclass(%s)", (name,))
+                if self.cursor.fetchone()[0] is None:
+                    self.cursor.execute(
+                        f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                        (month, following)
+                    )
+                    created.append(name)
+            month = following
+        return created
+
+    def _item_partition_months(self):
+        """Months of the invoice_items partitions"""
+        self.cursor.execute("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'invoice_items'::regclass AND child.relname ~ '_p[0-9]{4}_[0-9]{2}$'
+            ORDER BY child.relname
+        """)
+        return [
+            datetime.strptime(name[len("invoice_items") + 2:], "%Y_%m").date() for (name,) in self.cursor.fetchall()
+        ]
+
+    def _item_partition_pending(self, name):
+        """True until an invoice_items partition is known to have an item id on every line"""
+        self.cursor.execute(
+            "SELECT NOT attnotnull FROM pg_attribute WHERE attrelid = %s::regclass AND attname = 'item_id'", (name,)
+        )
+        return self.cursor.fetchone()[0]
+
+    def _backfill_item_partition(self, month):
+        """Give a month's invoice lines item ids in place of their names; returns the lines rewritten
+
+        The lines are copied into a new table with each name replaced by its
+        id, rather than updated in place, which would leave a dead copy of
+        every line behind. Its indexes are built before it is swapped in for
+        the old partition; writes to the month wait while it is copied and
+        its foreign keys are checked. A partition whose lines all have
+        ids already only has item_id made NOT NULL.
+        """
+        name = partition_name("invoice_items", month)
+        if not self._item_partition_pending(name):
+            return 0
+        self.cursor.execute(f"LOCK TABLE {name} IN SHARE MODE")
+        self.cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE item_id IS NULL)")
+        if not self.cursor.fetchone()[0]:
+            self.cursor.execute(f"ALTER TABLE {name} ALTER COLUMN item_id SET NOT NULL")
+            return 0
+
+        self.cursor.execute(f"""
+            INSERT INTO items (name)
+            SELECT DISTINCT item_name FROM {name} WHERE item_id IS NULL
+            EXCEPT SELECT name FROM items
+            ON CONFLICT (name) DO NOTHING
+        """)
+        # The columns of invoice_items in the order it is created in: item_id added to an existing table
+        # comes after created_at, and the padding that takes would cost 8 bytes a line
+        rewritten = f"{name}_items"
+        self.cursor.execute(f"""
+            CREATE TABLE {rewritten} (
+                id INTEGER NOT NULL DEFAULT nextval('invoice_items_id_seq'),
+                invoice_id INTEGER NOT NULL,
+                item_id INTEGER NOT NULL,
+                item_name TEXT,
+                quantity INTEGER NOT NULL,
+                price NUMERIC(10,2) NOT NULL,
+                total NUMERIC(10,2) NOT NULL,
+                created_at TIMESTAMP NOT NULL
+            )
+        """)
+        self.cursor.execute(f"""
+            INSERT INTO {rewritten} (id, invoice_id, item_id, quantity, price, total, created_at)
+            SELECT ii.id, ii.invoice_id, COALESCE(ii.item_id, items.id), ii.quantity, ii.price, ii.total,
+                   ii.created_at
+            FROM {name} ii
+            LEFT JOIN items ON ii.item_id IS NULL AND items.name = ii.item_name
+        """)
+        lines = self.cursor.rowcount
+
+        # Matching indexes are adopted by ATTACH, and the CHECK saves it scanning the rows for the bounds.
+        # The foreign keys are left to ATTACH, which checks them with one join each: a partition that
+        # brought its own has them adopted, and before PostgreSQL 16.5 could then no longer be detached
+        following = add_months(month, 1)
+        self.cursor.execute(f"ALTER TABLE {rewritten} ADD PRIMARY KEY (id, created_at)")
+        self.cursor.execute(f"CREATE INDEX {rewritten}_invoice_id_idx ON {rewritten} (invoice_id)")
+        self.cursor.execute(
+            f"ALTER TABLE {rewritten} ADD CONSTRAINT {rewritten}_bounds CHECK (created_at >= %s AND created_at < %s)",
+            (month, following)
+        )
+
+        self.cursor.execute(f"ALTER TABLE invoice_items DETACH PARTITION {name}")
+        self.cursor.execute(f"DROP TABLE {name}")
+        self.cursor.execute(f"ALTER TABLE {rewritten} RENAME TO {name}")
+        self.cursor.execute(f"ALTER INDEX {rewritten}_pkey RENAME TO {name}_pkey")
+        self.cursor.execute(f"ALTER INDEX {rewritten}_invoice_id_idx RENAME TO {name}_invoice_id_idx")
+        self.cursor.execute(
+            f"ALTER TABLE invoice_items ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", (month, following)
+        )
+        self.cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {rewritten}_bounds")
+        return lines
+
+    def _backfill_item_ids(self):
+        """Backfill every month, then make item_id NOT NULL; returns the lines rewritten"""
+        lines = sum(self._backfill_item_partition(month) for month in self._item_partition_months())
+        self.cursor.execute("ALTER TABLE invoice_items ALTER COLUMN item_id SET NOT NULL")
+        if lines:
+            print(f"Moved the item names of {lines} invoice lines into the items table")
+        return lines
+
+    @instrumented
+    @read_only
+    def item_ids_pending(self, month):
+        """True if a month's invoice lines may still carry item names instead of ids"""
+        try:
+            return self._item_partition_pending(partition_name("invoice_items", month))
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def backfill_item_ids(self, month=None):
+        """Give existing invoice lines item ids in place of their names, one month or all of them
+
+        Each call is one transaction. Once every month is done (month=None
+        checks them all), invoice_items.item_id is made NOT NULL. Returns
+        the number of lines rewritten, or None on error.
+        """
+        try:
+            if month is None:
+                lines = self._backfill_item_ids()
+            else:
+                lines = self._backfill_item_partition(month_start(month))
+
+            self.conn.commit()
+            return lines
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    def _customer_dobs_pending(self):
+        """True while customers.dob is still DD/MM/YYYY text"""
+        self.cursor.execute(
+            "SELECT atttypid <> 'date'::regtype FROM pg_attribute "
+            "WHERE attrelid = 'customers'::regclass AND attname = 'dob'"
+        )
+        return self.cursor.fetchone()[0]
+
+    def _prepare_customer_dobs(self):
+        """Add dob_date beside the text dob, kept in step with writers that still set the text"""
+        self.cursor.execute("ALTER TABLE customers ADD COLUMN IF NOT EXISTS dob_date DATE")
+        self.cursor.execute(CUSTOMER_DOB_FUNCTIONS)
+        self.cursor.execute("DROP TRIGGER IF EXISTS customers_dob_date ON customers")
+        self.cursor.execute("""
+            CREATE TRIGGER customers_dob_date BEFORE INSERT OR UPDATE OF dob ON customers
+            FOR EACH ROW EXECUTE FUNCTION customer_dob_date()
+        """)
+
+    def _convert_customer_dobs(self):
+        """Make dob a DATE and index birthdays; returns how many texts were not dates and were cleared
+
+        Writes to customers wait from here until the transaction commits.
+        Customers not parsed by parse_customer_dobs yet are parsed now, so
+        on a large table run the batches first. Texts that are not dates
+        are kept in dob_unparsed. The column swap itself only changes the
+        catalog: the old text stays in each row until the row is next
+        written.
+        """
+        self.cursor.execute("LOCK TABLE customers IN SHARE MODE")
+        self.cursor.execute("""
+            UPDATE customers SET dob_date = parse_dob(dob)
+            WHERE dob_date IS NULL AND parse_dob(dob) IS NOT NULL
+        """)
+        self.cursor.execute(
+            "SELECT mobile, dob FROM customers WHERE dob_date IS NULL AND NULLIF(trim(dob), '') IS NOT NULL"
+        )
+        unparsed = self.cursor.fetchall()
+        for mobile, dob in unparsed:
+            print(f"Cleared the date of birth of {mobile}: {dob!r} is not a DD/MM/YYYY date (kept in dob_unparsed)")
+        if unparsed:
+            self.cursor.execute("ALTER TABLE customers ADD COLUMN IF NOT EXISTS dob_unparsed TEXT")
+            self.cursor.execute(
+                "UPDATE customers SET dob_unparsed = dob WHERE dob_date IS NULL AND NULLIF(trim(dob), '') IS NOT NULL"
+            )
+
+        self.cursor.execute("DROP TRIGGER customers_dob_date ON customers")
+        self.cursor.execute("ALTER TABLE customers DROP COLUMN dob")
+        self.cursor.execute("ALTER TABLE customers RENAME COLUMN dob_date TO dob")
+        self.cursor.execute("DROP FUNCTION customer_dob_date(), parse_dob(TEXT)")
+        self.cursor.execute(BIRTHDAY_INDEX)
+        return len(unparsed)
+
+    @instrumented
+    @read_only
+    def customer_dobs_pending(self):
+        """True if customers.dob is still stored as text"""
+        try:
+            return self._customer_dobs_pending()
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def parse_customer_dobs(self, after_id=0, batch_size=DOB_BATCH_SIZE):
+        """Parse the text dob of the next batch_size customers after after_id, in one transaction
+
+        Returns (last id of the batch, None once there are no customers
+        left; dates parsed; texts that are not dates), or None on error.
+        Customers parsed already are skipped, so an interrupted run can
+        start again from 0.
+        """
+        try:
+            self.cursor.execute(PARSE_CUSTOMER_DOBS, (after_id, batch_size))
+            result = tuple(self.cursor.fetchone())
+            self.conn.commit()
+            return result
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def convert_customer_dobs(self):
+        """Finish converting customers.dob to a DATE (see _convert_customer_dobs)
+
+        Returns how many texts were not dates, 0 if dob is a DATE already,
+        or None on error.
+        """
+        try:
+            unparsed = self._convert_customer_dobs() if self._customer_dobs_pending() else 0
+            self.conn.commit()
+            return unparsed
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def ensure_invoice_partitions(self, start=None, end=None):
+        """Create the monthly partitions covering start..end (dates or datetimes)
+
+        Defaults to the current month through PARTITION_MONTHS_AHEAD months
+        ahead. Returns the names of the partitions created.
+        """
+        try:
+            today = date.today()
+            start = month_start(start or today)
+            end = month_start(end) if end else add_months(today, PARTITION_MONTHS_AHEAD)
+            created = self._create_invoice_partitions(start, end)
+            self.conn.commit()
+            return created
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @read_only
+    def get_invoice_partitions(self):
+        """List invoice partitions as dicts with table, name, month and estimated rows"""
+        try:
+            self.cursor.execute("""
+                SELECT parent.relname, child.relname, GREATEST(child.reltuples, 0)::bigint
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = ANY(%s) AND child.relname ~ '_p[0-9]{4}_[0-9]{2}$'
+                ORDER BY child.relname
+            """, (list(PARTITIONED_TABLES),))
+
+            result = []
+            for table, name, rows in self.cursor.fetchall():
+                month = datetime.strptime(name[len(table) + 2:], "%Y_%m").date()
+                result.append({"table": table, "name": name, "month": month, "rows": rows})
+            return result
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @writes
     def save_customer(self, name, mobile, dob, email=None):
-        """Save customer information to database"""
+        """Save customer information to database; dob is DD/MM/YYYY (or a date)"""
         try:
+            dob = parse_dob(dob)
+
             # Check if customer already exists
-            self.cursor.execute("SELECT id FROM customers WHERE mobile = %s", (mobile,))
+            self.execute_prepared("customer_id_by_mobile", (mobile,))
             existing_customer = self.cursor.fetchone()
 
             if existing_customer:
@@ -127,6 +1066,7 @@ class Database:
                 """, (name, mobile, dob, email))
                 customer_id = self.cursor.fetchone()[0]
 
+            self._notify(DETAILS_CHANNEL, mobile)
             self.conn.commit()
             return customer_id
 
@@ -135,55 +1075,116 @@ class Database:
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @writes
     def save_invoice(self, customer_mobile, total_amount, discount_amount, final_amount, cart, bill_content=None):
-        """Save invoice and items to database"""
+        """Save invoice and items to database
+
+        Points are not accrued here: the checkout accrues them with
+        accrue_points, which also applies the discount.
+        """
         try:
+            item_ids = self._item_ids([item['name'] for item in cart])
+
             # Get customer ID if mobile is provided
             customer_id = None
             if customer_mobile:
-                self.cursor.execute("SELECT id FROM customers WHERE mobile = %s", (customer_mobile,))
+                self.execute_prepared("customer_id_by_mobile", (customer_mobile,))
                 customer_result = self.cursor.fetchone()
                 if customer_result:
                     customer_id = customer_result[0]
 
+            # Store the bill text according to bill_storage
+            bill_compressed = None
+            if self.bill_storage == "zlib" and bill_content:
+                bill_content, bill_compressed = None, BillStorage.compress(bill_content)
+            elif self.bill_storage == "none":
+                bill_content = None
+
             # Insert invoice
-            self.cursor.execute("""
-                INSERT INTO invoices (customer_id, total_amount, discount_amount, final_amount, bill_content)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
-            """, (customer_id, total_amount, discount_amount, final_amount, bill_content))
+            self.execute_prepared(
+                "insert_invoice", (customer_id, total_amount, discount_amount, final_amount, bill_content, bill_compressed)
+            )
 
-            invoice_id = self.cursor.fetchone()[0]
+            invoice_id, created_at = self.cursor.fetchone()
 
             # Insert invoice items
-            for item in cart:
-                self.cursor.execute("""
-                    INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (invoice_id, item['name'], item['quantity'], item['price'], item['total']))
+            for item, item_id in zip(cart, item_ids):
+                self.execute_prepared(
+                    "insert_invoice_item",
+                    (invoice_id, item_id, item['quantity'], item['price'], item['total'], created_at)
+                )
 
-            # Update customer points if customer exists
-            if customer_id:
-                points_earned = int(final_amount / 100) * 10  # 10 points per ₹100
+            self.conn.commit()
+            return invoice_id
 
-                self.cursor.execute("""
-                    UPDATE customers
-                    SET points = points + %s
-                    WHERE id = %s
-                """, (points_earned, customer_id))
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def replay_checkouts(self, checkouts):
+        """Insert checkouts recorded in a local journal, in one transaction
+
+        Each checkout is a dict with invoice_key, created_at (ISO format),
+        customer_mobile, subtotal, discount, final, items, bill_content and
+        points_earned. Keys already on the server are skipped, and points are
+        appended to the ledger only for newly inserted invoices, so replaying
+        a batch twice changes nothing. Returns the number of invoices
+        inserted, or None on error.
+        """
+        try:
+            names = [item['name'] for checkout in checkouts for item in checkout["items"]]
+            item_ids = dict(zip(names, self._item_ids(names)))
+            created = [datetime.fromisoformat(checkout["created_at"]) for checkout in checkouts]
+            if created:
+                self._create_invoice_partitions(month_start(min(created)), month_start(max(created)))
+
+            inserted = 0
+            for checkout, created_at in zip(checkouts, created):
+                bill_content = checkout.get("bill_content")
+                bill_compressed = None
+                if self.bill_storage == "zlib" and bill_content:
+                    bill_content, bill_compressed = None, BillStorage.compress(bill_content)
+                elif self.bill_storage == "none":
+                    bill_content = None
+
+                self.execute_prepared("replay_invoice", (
+                    checkout["invoice_key"], checkout.get("customer_mobile") or None, checkout["subtotal"],
+                    checkout["discount"], checkout["final"], bill_content, bill_compressed, created_at
+                ))
+                row = self.cursor.fetchone()
+                if row is None:
+                    continue  # Replayed before
+
+                invoice_id, customer_id = row
+                for item in checkout["items"]:
+                    self.execute_prepared(
+                        "insert_invoice_item",
+                        (invoice_id, item_ids[item['name']], item['quantity'], item['price'], item['total'],
+                         created_at)
+                    )
+                if customer_id and checkout.get("points_earned"):
+                    self.execute_prepared("add_customer_points", (customer_id, checkout["points_earned"], invoice_id))
+                    self._notify(POINTS_CHANNEL, checkout["customer_mobile"])
+                inserted += 1
 
             self.conn.commit()
-            return invoice_id
+            return inserted
 
         except Exception as e:
             self.conn.rollback()
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @read_only
     def get_customer_by_mobile(self, mobile):
         """Get customer by mobile number"""
         try:
-            self.cursor.execute("SELECT id, name, mobile, dob, email, points FROM customers WHERE mobile = %s", (mobile,))
+            self.execute_prepared("customer_by_mobile", (mobile,))
             customer = self.cursor.fetchone()
 
             if customer:
@@ -202,11 +1203,13 @@ class Database:
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @read_only
     def get_invoices_by_mobile(self, mobile):
         """Get invoices for a customer by mobile number"""
         try:
             # Get customer ID
-            self.cursor.execute("SELECT id FROM customers WHERE mobile = %s", (mobile,))
+            self.execute_prepared("customer_id_by_mobile", (mobile,))
             customer = self.cursor.fetchone()
 
             if not customer:
@@ -249,6 +1252,8 @@ class Database:
             print(f"Database error: {e}")
             return []
 
+    @instrumented
+    @read_only
     def get_invoice_details(self, invoice_id):
         """Get invoice details"""
         try:
@@ -264,12 +1269,13 @@ class Database:
             if not invoice:
                 return None
 
-            # Get invoice items
+            # Get invoice items (created_at limits the scan to the invoice's partition)
             self.cursor.execute("""
-                SELECT item_name, quantity, price, total
-                FROM invoice_items
-                WHERE invoice_id = %s
-            """, (invoice_id,))
+                SELECT items.name, ii.quantity, ii.price, ii.total
+                FROM invoice_items ii
+                JOIN items ON items.id = ii.item_id
+                WHERE ii.invoice_id = %s AND ii.created_at = %s
+            """, (invoice_id, invoice[1]))
 
             items = self.cursor.fetchall()
 
@@ -309,6 +1315,115 @@ class Database:
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @read_only
+    def get_invoice_documents(self, from_date, to_date):
+        """Get the invoices created on the days from_date..to_date (inclusive) with their items
+
+        Invoices are dicts in CheckoutEngine's invoice format, so they can be
+        rendered the same way as an invoice just checked out.
+        """
+        try:
+            bounds = (from_date, to_date + timedelta(days=1))
+            self.cursor.execute("""
+                SELECT i.id, i.created_at, c.name, c.mobile, c.email, i.total_amount, i.discount_amount,
+                       i.final_amount
+                FROM invoices i
+                LEFT JOIN customers c ON i.customer_id = c.id
+                WHERE i.created_at >= %s AND i.created_at < %s
+                ORDER BY i.id
+            """, bounds)
+
+            invoices = {}
+            for invoice_id, created_at, name, mobile, email, total, discount, final in self.cursor.fetchall():
+                tier = RewardSystem.get_tier_for_discount(total, discount)
+                invoices[invoice_id] = {
+                    "id": invoice_id,
+                    "date": created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    "customer_name": name or "",
+                    "customer_mobile": mobile or "",
+                    "customer_email": email or "",
+                    "subtotal": total,
+                    "discount": discount,
+                    "total": final,
+                    "items": [],
+                    "reward_tier_applied": tier if tier != "None" else None
+                }
+
+            self.cursor.execute("""
+                SELECT ii.invoice_id, items.name, ii.quantity, ii.price, ii.total
+                FROM invoice_items ii
+                JOIN items ON items.id = ii.item_id
+                WHERE ii.created_at >= %s AND ii.created_at < %s
+                ORDER BY ii.invoice_id, ii.id
+            """, bounds)
+            for invoice_id, name, quantity, price, item_total in self.cursor.fetchall():
+                if invoice_id in invoices:
+                    invoices[invoice_id]["items"].append(
+                        {"name": name, "quantity": quantity, "price": price, "total": item_total}
+                    )
+
+            return list(invoices.values())
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @read_only
+    def get_invoice_bill(self, invoice_id):
+        """Get the bill text of an invoice
+
+        Uses the stored text or compressed bill when there is one; otherwise the
+        bill is rendered from invoice_items. Results are kept in bill_cache.
+        """
+        bill = self.bill_cache.get(invoice_id)
+        if bill is not None:
+            return bill
+
+        try:
+            self.cursor.execute("""
+                SELECT i.bill_content, i.bill_compressed, i.created_at, i.total_amount, i.discount_amount,
+                       i.final_amount, c.name, c.mobile
+                FROM invoices i
+                LEFT JOIN customers c ON i.customer_id = c.id
+                WHERE i.id = %s
+            """, (invoice_id,))
+
+            invoice = self.cursor.fetchone()
+            if not invoice:
+                return None
+
+            bill_content, bill_compressed, created_at, total, discount, final, name, mobile = invoice
+            if bill_content:
+                bill = bill_content
+            elif bill_compressed is not None:
+                bill = BillStorage.decompress(bill_compressed)
+            else:
+                self.cursor.execute("""
+                    SELECT items.name, ii.quantity, ii.price, ii.total
+                    FROM invoice_items ii
+                    JOIN items ON items.id = ii.item_id
+                    WHERE ii.invoice_id = %s AND ii.created_at = %s
+                    ORDER BY ii.id
+                """, (invoice_id, created_at))
+                items = [
+                    {"name": item_name, "quantity": quantity, "price": price, "total": item_total}
+                    for item_name, quantity, price, item_total in self.cursor.fetchall()
+                ]
+                bill = PriceFormatter.format_bill(
+                    items, total, discount, final, name, mobile, RewardSystem.get_tier_for_discount(total, discount)
+                )
+
+            self.bill_cache.put(invoice_id, bill)
+            return bill
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @read_only
     def get_employee(self, username):
         """Get employee by username"""
         try:
@@ -334,35 +1449,18 @@ class Database:
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @read_only
     def generate_sales_report(self, from_date, to_date):
         """Get sales report for date range"""
         try:
             # Get sales data
-            self.cursor.execute("""
-                SELECT
-                    COUNT(*) as invoice_count,
-                    SUM(total_amount) as total_sales,
-                    SUM(discount_amount) as total_discount,
-                    SUM(final_amount) as final_sales
-                FROM invoices
-                WHERE created_at BETWEEN %s AND %s
-            """, (from_date, to_date))
+            self.cursor.execute(SALES_SUMMARY_SQL, (from_date, to_date))
 
             sales_summary = self.cursor.fetchone()
 
             # Get top selling items
-            self.cursor.execute("""
-                SELECT
-                    item_name,
-                    SUM(quantity) as total_quantity,
-                    SUM(total) as total_sales
-                FROM invoice_items
-                JOIN invoices ON invoice_items.invoice_id = invoices.id
-                WHERE invoices.created_at BETWEEN %s AND %s
-                GROUP BY item_name
-                ORDER BY total_quantity DESC
-                LIMIT 5
-            """, (from_date, to_date))
+            self.cursor.execute(TOP_ITEMS_SQL, (from_date, to_date))
 
             top_items = self.cursor.fetchall()
 
@@ -391,34 +1489,299 @@ class Database:
             print(f"Database error: {e}")
             return None
 
+    @instrumented
+    @read_only
+    def get_live_sales(self, day_start, hour_start, keys=()):
+        """Invoice totals of the day and hour starting at day_start and hour_start
+
+        Returns {"day": totals, "hour": totals, "seen": keys}, where totals
+        has invoices, gross, discount and net, and seen is the subset of the
+        given invoice keys already on the server, all from one snapshot.
+        """
+        try:
+            self.cursor.execute(LIVE_SALES_SQL, {
+                "day": day_start, "end": day_start + timedelta(days=1), "hour": hour_start, "keys": list(keys)
+            })
+            row = self.cursor.fetchone()
+            fields = ("invoices", "gross", "discount", "net")
+            return {
+                "day": dict(zip(fields, row[0:4])),
+                "hour": dict(zip(fields, row[4:8])),
+                "seen": set(row[8])
+            }
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
     def update_customer_points(self, mobile, points):
-        """Update customer points"""
+        """Update customer points (recorded as a ledger adjustment)"""
+        try:
+            self.execute_prepared("set_customer_points", (points, mobile))
+            self._notify(POINTS_CHANNEL, mobile)
+
+            self.conn.commit()
+            return True
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return False
+
+    @instrumented
+    @writes
+    def accrue_points(self, mobile, subtotal):
+        """Atomically apply the reward discount and accrue points for a purchase
+
+        The discount comes from the customer's balance before this purchase
+        and points are earned on the discounted amount. The points are appended
+        to points_ledger in one server-side call; concurrent checkouts for the
+        same customer are serialized and never lose points. Returns None if
+        there is no such customer.
+        """
+        try:
+            self.execute_prepared("accrue_points", (mobile, subtotal))
+            row = self.cursor.fetchone()
+            self.conn.commit()
+
+            if not row:
+                return None
+
+            customer_id, name, email, previous_points, discount_percentage, earned, points, tier = row
+            return {
+                "id": customer_id,
+                "name": name,
+                "email": email,
+                "previous_points": previous_points,
+                "previous_tier": RewardSystem.get_reward_tier(previous_points),
+                "discount_percentage": float(discount_percentage),
+                "points_earned": earned,
+                "points": points,
+                "tier": tier
+            }
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def fold_points_ledger(self, batch_size=10000):
+        """Fold up to batch_size unfolded ledger entries into customers.points
+
+        Returns the number of entries folded (0 if another rollup is running).
+        """
+        try:
+            self.cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('points_ledger_rollup'))")
+            if not self.cursor.fetchone()[0]:
+                self.conn.rollback()
+                return 0
+
+            self.cursor.execute(FOLD_POINTS_LEDGER, (batch_size,))
+            folded, _ = self.cursor.fetchone()
+            self.conn.commit()
+            return folded
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return 0
+
+    @instrumented
+    @read_only
+    def get_points_history(self, mobile, limit=50):
+        """Get a customer's ledger entries, newest first"""
         try:
             self.cursor.execute("""
-                UPDATE customers
-                SET points = %s
-                WHERE mobile = %s
-            """, (points, mobile))
+                SELECT l.id, l.created_at, l.delta, l.reason, l.invoice_id, l.folded
+                FROM points_ledger l
+                JOIN customers c ON l.customer_id = c.id
+                WHERE c.mobile = %s
+                ORDER BY l.id DESC
+                LIMIT %s
+            """, (mobile, limit))
+
+            return [
+                {
+                    "id": entry_id,
+                    "date": created_at.strftime("%d/%m/%Y %H:%M"),
+                    "delta": delta,
+                    "reason": reason,
+                    "invoice_id": invoice_id,
+                    "folded": folded
+                }
+                for entry_id, created_at, delta, reason, invoice_id, folded in self.cursor.fetchall()
+            ]
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @read_only
+    def get_reward_tiers(self):
+        """Tier thresholds as (name, min_points, discount) tuples, lowest first"""
+        try:
+            self.cursor.execute("SELECT name, min_points, discount FROM reward_tiers ORDER BY min_points")
+            return [(name, min_points, float(discount)) for name, min_points, discount in self.cursor.fetchall()]
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @read_only
+    def get_tier_distribution(self):
+        """Customers per persisted reward tier (see tier_recompute.py), highest tier first"""
+        try:
+            self.cursor.execute("""
+                SELECT t.name, t.min_points, COUNT(c.id)
+                FROM reward_tiers t
+                LEFT JOIN customers c ON c.tier = t.name
+                GROUP BY t.name, t.min_points
+                ORDER BY t.min_points DESC
+            """)
+            return [
+                {"tier": name, "min_points": min_points, "customers": count}
+                for name, min_points, count in self.cursor.fetchall()
+            ]
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @writes
+    def save_item_sketches(self, source, sketches):
+        """Upsert a source's top items sketches, given as (window kind, window start, sketch dict)"""
+        try:
+            for window, start, sketch in sketches:
+                self.cursor.execute("""
+                    INSERT INTO item_sketches (window_kind, window_start, source, sketch)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (window_kind, window_start, source)
+                    DO UPDATE SET sketch = EXCLUDED.sketch, updated_at = CURRENT_TIMESTAMP
+                """, (window, start, source, Json(sketch)))
+            self.cursor.execute(
+                "DELETE FROM item_sketches WHERE source = %s AND updated_at < CURRENT_TIMESTAMP - %s",
+                (source, timedelta(days=ITEM_SKETCH_RETENTION_DAYS))
+            )
 
             self.conn.commit()
             return True
 
         except Exception as e:
+            self.conn.rollback()
             print(f"Database error: {e}")
             return False
 
+    @instrumented
+    @read_only
+    def get_item_sketches(self, window, start):
+        """Every source's checkpointed sketch of one hour or day window"""
+        try:
+            self.cursor.execute("""
+                SELECT source, sketch, updated_at FROM item_sketches
+                WHERE window_kind = %s AND window_start = %s
+                ORDER BY source
+            """, (window, start))
+            return [
+                {"source": source, "sketch": sketch, "updated_at": updated_at}
+                for source, sketch, updated_at in self.cursor.fetchall()
+            ]
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
+    @instrumented
+    @writes
+    def save_products(self, products):
+        """Insert or update products (dicts with sku, name, price and optionally barcode)
+
+        Listeners are told which SKUs changed, or to reload everything when
+        more than PRODUCT_NOTIFY_LIMIT changed at once. Returns the number of
+        products saved, or None on error.
+        """
+        try:
+            execute_values(self.cursor, """
+                INSERT INTO products (sku, barcode, name, price) VALUES %s
+                ON CONFLICT (sku) DO UPDATE SET barcode = EXCLUDED.barcode, name = EXCLUDED.name,
+                    price = EXCLUDED.price, active = TRUE, updated_at = CURRENT_TIMESTAMP
+            """, [(p["sku"], p.get("barcode") or None, p["name"], p["price"]) for p in products], page_size=1000)
+            self._notify_products([p["sku"] for p in products])
+
+            self.conn.commit()
+            return len(products)
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @writes
+    def deactivate_products(self, skus):
+        """Take products off sale (they stay referenced by past invoices)"""
+        try:
+            self.cursor.execute(
+                "UPDATE products SET active = FALSE, updated_at = CURRENT_TIMESTAMP WHERE sku = ANY(%s)", (list(skus),)
+            )
+            self._notify_products(skus)
+
+            self.conn.commit()
+            return True
+
+        except Exception as e:
+            self.conn.rollback()
+            print(f"Database error: {e}")
+            return False
+
+    def _notify_products(self, skus):
+        skus = list(skus)
+        if len(skus) > PRODUCT_NOTIFY_LIMIT:
+            skus = [RELOAD_ALL]
+        for sku in skus:
+            self._notify(PRODUCTS_CHANNEL, sku)
+
+    @instrumented
+    @read_only
+    def get_products(self, skus=None):
+        """Active products as (sku, barcode, name, price) tuples, all of them or only the given SKUs
+
+        Tuples rather than dicts, since the whole catalog is loaded at once.
+        """
+        try:
+            query = "SELECT sku, barcode, name, price::float8 FROM products WHERE active"
+            params = ()
+            if skus is not None:
+                query += " AND sku = ANY(%s)"
+                params = (list(skus),)
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return None
+
+    @instrumented
+    @read_only
     def search_customers(self, mobile=None):
         """Search customers by mobile number"""
         try:
             # Prepare query
-            query = "SELECT id, name, mobile, dob, points, created_at FROM customers"
+            query = f"SELECT c.id, c.name, c.mobile, {DOB_TEXT_SQL}, {BALANCE_SQL}, c.created_at FROM customers c"
             params = ()
 
             if mobile:
-                query += " WHERE mobile LIKE %s"
+                query += " WHERE c.mobile LIKE %s"
                 params = (f"%{mobile}%",)
 
-            query += " ORDER BY name"
+            query += " ORDER BY c.name"
 
             # Execute query
             self.cursor.execute(query, params)
@@ -450,6 +1813,8 @@ class Database:
             print(f"Database error: {e}")
             return []
 
+    @instrumented
+    @read_only
     def search_customers_by_name(self, name_prefix, limit=10):
         """Search customers by name prefix for autocomplete"""
         try:
@@ -468,6 +1833,8 @@ class Database:
             print(f"Database error: {e}")
             return []
 
+    @instrumented
+    @read_only
     def search_customers_by_mobile(self, mobile_prefix, limit=10):
         """Search customers by mobile prefix for autocomplete"""
         try:
@@ -486,8 +1853,64 @@ class Database:
             print(f"Database error: {e}")
             return []
 
+    @instrumented
+    @read_only
+    def get_birthdays(self, start, end, limit=None):
+        """Customers whose birthday falls from start to end (dates or YYYY-MM-DD, inclusive), soonest first
+
+        The range may run past New Year (e.g. 28/12 to 03/01), and one of a
+        year or more covers every customer with a date of birth. In years
+        without a 29 February those birthdays fall on the 28th. Each
+        customer comes with the date of the birthday in the range and the
+        age turned on it; customers with the same birthday are in id order,
+        so limit gives the first page of a long list without reading the rest.
+        """
+        start, end = to_date(start), to_date(end)
+        if end < start:
+            raise ValueError("The range ends before it starts")
+
+        first = start.month * 100 + start.day
+        if end - start >= timedelta(days=365) or end.year > start.year and birthday_key(end) >= first:
+            last = birthday_key(start - timedelta(days=1))  # A whole year, starting from start
+        else:
+            last = birthday_key(end)
+        # A range past New Year is read as its two halves, December's first
+        spans = [(first, last)] if first <= last else [(first, 1231), (101, last)]
+
+        try:
+            rows = []
+            for span_first, span_last in spans:
+                if limit is not None and len(rows) >= limit:
+                    break
+                self.cursor.execute(BIRTHDAYS_SQL, {
+                    "first": span_first, "last": span_last, "limit": None if limit is None else limit - len(rows)
+                })
+                rows.extend(self.cursor.fetchall())
+
+            result = []
+            for customer_id, name, mobile, email, dob, points in rows:
+                year = start.year if dob.month * 100 + dob.day >= first else start.year + 1
+                day = dob.day if dob.day <= calendar.monthrange(year, dob.month)[1] else dob.day - 1
+                result.append({
+                    "id": customer_id,
+                    "name": name,
+                    "mobile": mobile,
+                    "email": email,
+                    "dob": dob.strftime(DOB_FORMAT),
+                    "birthday": date(year, dob.month, day),
+                    "age": year - dob.year,
+                    "points": points
+                })
+            return result
+
+        except Exception as e:
+            print(f"Database error: {e}")
+            return []
+
     def close(self):
         """Close database connection"""
+        if self.router is not None:
+            self.router.close()
         if self.conn:
             self.conn.close()
             print("Database connection closed")
\ No newline at end of file
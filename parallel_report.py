@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# parallel_report.py - Sales report over long date ranges, split into date shards run concurrently
+
+import argparse
+import heapq
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import DatabasePool
+
+DEFAULT_SHARDS = 4
+# Each shard runs two queries at once, so this bounds a report to 32 threads and connections
+MAX_SHARDS = 16
+# Ranges shorter than this run as the two queries of Database.generate_sales_report
+MIN_PARALLEL_DAYS = 31
+TOP_ITEMS = 5
+
+# Each shard covers [start, end); the last one includes the end of the range,
+# like the BETWEEN of the single-query report
+SHARD_SUMMARY_SQL = """
+    SELECT COUNT(*), SUM(total_amount), SUM(discount_amount), SUM(final_amount)
+    FROM invoices
+    WHERE created_at >= %s AND created_at {end_operator} %s
+"""
+# Every item's partial totals, not just the shard's top ones: an item outside
+# each shard's top N can still be in the top N of the whole range. Lines are
+# grouped by item id and only the totals are joined with the item names
+SHARD_ITEMS_SQL = """
+    SELECT items.name, totals.quantity, totals.sales
+    FROM (
+        SELECT item_id, SUM(quantity) AS quantity, SUM(total) AS sales
+        FROM invoice_items
+        WHERE created_at >= %s AND created_at {end_operator} %s
+        GROUP BY item_id
+    ) totals
+    JOIN items ON items.id = totals.item_id
+"""
+
+
+def to_datetime(value):
+    """A datetime from a datetime, a date (midnight) or YYYY-MM-DD[ HH:MM:SS]"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(value)
+
+
+def date_shards(start, end, shards):
+    """Split start..end into shards consecutive (start, end, is_last) ranges of equal length"""
+    step = (end - start) / shards
+    bounds = [start + step * index for index in range(shards)] + [end]
+    return [(bounds[index], bounds[index + 1], index == shards - 1) for index in range(shards)]
+
+
+def run_shard(pool, query, start, end, last, slots=None):
+    """Run one shard query on a pooled connection and return its rows
+
+    With slots (a semaphore), the query first waits for one of them.
+    """
+    with slots or nullcontext(), pool.connection() as db:
+        try:
+            db.cursor.execute(query.format(end_operator="<=" if last else "<"), (start, end))
+            rows = db.cursor.fetchall()
+            db.conn.commit()
+            return rows
+        except Exception:
+            db.conn.rollback()
+            raise
+
+
+def merge_top_items(partials, top=TOP_ITEMS):
+    """Exact top items by quantity from per-shard (name, quantity, sales) rows
+
+    Sums every item across shards before ranking; ties are broken by name.
+    """
+    totals = {}
+    for rows in partials:
+        for name, quantity, sales in rows:
+            previous = totals.get(name)
+            totals[name] = (quantity, sales) if previous is None else (previous[0] + quantity, previous[1] + sales)
+    best = heapq.nsmallest(top, totals.items(), key=lambda item: (-item[1][0], item[0]))
+    return [{"name": name, "quantity": quantity, "sales": sales} for name, (quantity, sales) in best]
+
+
+def generate_sales_report_parallel(pool, from_date, to_date, shards=DEFAULT_SHARDS, min_days=MIN_PARALLEL_DAYS,
+                                   top=TOP_ITEMS, slots=None):
+    """Sales report for from_date..to_date with the date range split into shards
+
+    The summary and per-item aggregates of every shard run at the same
+    time, each on its own connection from pool (a DatabasePool), and are
+    merged here: sums are added and the top items are ranked from every
+    item's combined totals, so the result equals
+    Database.generate_sales_report. Ranges shorter than min_days, or one
+    shard, run that single-query report instead. slots, a semaphore shared
+    by every report, caps how many shard queries run at once across all of
+    them, so the rest of pool stays free for other work. Returns the same
+    dict plus the number of shards used, or None on a database error.
+    """
+    start, end = to_datetime(from_date), to_datetime(to_date)
+    if shards <= 1 or end - start < timedelta(days=min_days):
+        report = pool.generate_sales_report(start, end)
+        return dict(report, shards=1) if report is not None else None
+
+    ranges = date_shards(start, end, shards)
+    try:
+        with ThreadPoolExecutor(max_workers=2 * shards, thread_name_prefix="report") as executor:
+            summaries = [executor.submit(run_shard, pool, SHARD_SUMMARY_SQL, *shard, slots) for shard in ranges]
+            items = [executor.submit(run_shard, pool, SHARD_ITEMS_SQL, *shard, slots) for shard in ranges]
+            summaries = [future.result()[0] for future in summaries]
+            items = [future.result() for future in items]
+    except Exception as e:
+        print(f"Database error: {e}")
+        return None
+
+    return {
+        "invoice_count": sum(count for count, _, _, _ in summaries),
+        "total_sales": sum(total or 0 for _, total, _, _ in summaries),
+        "total_discount": sum(discount or 0 for _, _, discount, _ in summaries),
+        "final_sales": sum(final or 0 for _, _, _, final in summaries),
+        "top_items": merge_top_items(items, top),
+        "shards": shards
+    }
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Sales report for a date range, run in date shards")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--from", dest="start", required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", required=True, help="Last day (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    pool = DatabasePool(db_config, max_connections=2 * args.shards)
+
+    try:
+        end = to_datetime(args.end) + timedelta(days=1) - timedelta(microseconds=1)
+        report = generate_sales_report_parallel(pool, args.start, end, args.shards)
+        if report is None:
+            return
+        print(f"Invoices: {report['invoice_count']}  Sales: {report['total_sales']}  "
+              f"Discounts: {report['total_discount']}  Net: {report['final_sales']}  ({report['shards']} shards)")
+        for item in report["top_items"]:
+            print(f"  {item['name']:<30} {item['quantity']:>10} {item['sales']:>14}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# partitions.py - Maintain the monthly invoice partitions: create, inspect, explain and archive
+
+import argparse
+import gzip
+import os
+import re
+import sys
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database, SALES_SUMMARY_SQL, TOP_ITEMS_SQL, month_start, partition_name
+
+# Archived invoice lines keep their item names, so an archive stands on its own
+ARCHIVE_SOURCES = {
+    "invoice_items": """(
+        SELECT ii.id, ii.invoice_id, COALESCE(items.name, ii.item_name) AS item_name, ii.quantity, ii.price,
+               ii.total, ii.created_at
+        FROM {name} ii
+        LEFT JOIN items ON items.id = ii.item_id
+    )"""
+}
+
+PARTITION_PATTERN = re.compile(r"\b(?:invoices|invoice_items)_p\d{4}_\d{2}\b")
+
+
+def explain_sales_report(db, from_date, to_date):
+    """Return the EXPLAIN plans of the sales report queries for a date range"""
+    plans = []
+    for query in (SALES_SUMMARY_SQL, TOP_ITEMS_SQL):
+        db.cursor.execute("EXPLAIN " + query, (from_date, to_date))
+        plans.append("\n".join(row[0] for row in db.cursor.fetchall()))
+    db.conn.commit()
+    return plans
+
+
+def scanned_partitions(plan):
+    """Names of the partitions a plan reads"""
+    return sorted(set(PARTITION_PATTERN.findall(plan)))
+
+
+def archive_partitions(db, before, directory, drop=False):
+    """Detach the partitions of months before `before` and export them as gzip CSV
+
+    Each month is handled in one transaction: invoice_items is detached
+    first (it references invoices), both are written to
+    <directory>/<partition>.csv.gz, and with drop the detached tables are
+    dropped; otherwise they stay as standalone tables. Returns the paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    cutoff = month_start(before)
+    months = sorted({p["month"] for p in db.get_invoice_partitions() if p["month"] < cutoff})
+    paths = []
+
+    for month in months:
+        try:
+            written = []
+            for table in ("invoice_items", "invoices"):
+                name = partition_name(table, month)
+                db.cursor.execute("SELECT to_regclass(%s)", (name,))
+                if db.cursor.fetchone()[0] is None:
+                    continue
+
+                db.cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                # A detached partition keeps its own copy of the foreign keys
+                db.cursor.execute(
+                    "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", (name,)
+                )
+                for (constraint,) in db.cursor.fetchall():
+                    db.cursor.execute(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"')
+
+                source = ARCHIVE_SOURCES[table].format(name=name) if table in ARCHIVE_SOURCES else name
+                path = os.path.join(directory, f"{name}.csv.gz")
+                with gzip.open(path, "wb") as f:
+                    db.cursor.copy_expert(f"COPY {source} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+                written.append(path)
+
+                if drop:
+                    db.cursor.execute(f"DROP TABLE {name}")
+
+            db.conn.commit()
+            paths += written
+            print(f"Archived {month:%Y-%m} to {directory}")
+
+        except Exception as e:
+            db.conn.rollback()
+            print(f"Error archiving {month:%Y-%m}: {e}")
+            raise
+
+    return paths
+
+
+def parse_month(value):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Maintain monthly invoice partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure = commands.add_parser("ensure", help="Create partitions for a range of months")
+    ensure.add_argument("--from", dest="start", type=parse_month, help="First month (YYYY-MM, default current)")
+    ensure.add_argument("--to", dest="end", type=parse_month, help="Last month (YYYY-MM, default 3 months ahead)")
+
+    commands.add_parser("list", help="List partitions and estimated row counts")
+
+    explain = commands.add_parser("explain", help="Show which partitions the sales report reads")
+    explain.add_argument("--from", dest="start", required=True, help="Report start (YYYY-MM-DD)")
+    explain.add_argument("--to", dest="end", required=True, help="Report end (YYYY-MM-DD)")
+
+    archive = commands.add_parser("archive", help="Detach and export partitions older than a month")
+    archive.add_argument("--before", type=parse_month, required=True, help="Archive months before this (YYYY-MM)")
+    archive.add_argument("--directory", default="archive")
+    archive.add_argument("--drop", action="store_true", help="Drop the detached tables after exporting")
+
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    try:
+        if args.command == "ensure":
+            created = db.ensure_invoice_partitions(args.start, args.end)
+            print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        elif args.command == "list":
+            for partition in db.get_invoice_partitions():
+                print(f"{partition['name']:<28} {partition['month']:%Y-%m}  ~{partition['rows']} rows")
+        elif args.command == "explain":
+            for plan in explain_sales_report(db, args.start, args.end):
+                print(plan)
+                print(f"-> partitions scanned: {', '.join(scanned_partitions(plan)) or 'none'}\n")
+        elif args.command == "archive":
+            paths = archive_partitions(db, args.before, args.directory, drop=args.drop)
+            print(f"Wrote {len(paths)} files")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# pdf_invoice.py - Render invoices as PDF documents in memory, one at a time or in batches
+
+import argparse
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# A4 in points; Courier is one of the 14 standard PDF fonts, so nothing is embedded,
+# and every glyph is 0.6 em wide, which makes right-aligned columns simple
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 10
+LINE_HEIGHT = 14
+NAME_CHARS = 38
+
+# Right edges of the quantity, price and total columns
+COLUMNS = (355, 455, PAGE_WIDTH - MARGIN)
+
+
+def pdf_text(text):
+    """A PDF string literal in WinAnsi encoding (characters outside it become ?)"""
+    data = str(text).encode("cp1252", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def format_amount(amount):
+    """Price with the rupee abbreviation (the ₹ sign is not in the standard fonts)"""
+    return f"Rs. {amount:.2f}"
+
+
+class PageWriter:
+    def __init__(self):
+        """Content streams of a document's pages, filled top to bottom"""
+        self.pages = []
+        self.y = 0
+        self.new_page()
+
+    def new_page(self):
+        self.pages.append([])
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, x, value, bold=False, size=FONT_SIZE, right=False):
+        """Draw text at x on the current line (x is the right edge with right)"""
+        data = pdf_text(value)
+        if right:
+            x -= len(str(value)) * 0.6 * size
+        font = b"/F2" if bold else b"/F1"
+        self.pages[-1].append(b"BT %s %d Tf %.2f %.2f Td %s Tj ET" % (font, size, x, self.y, data))
+
+    def rule(self):
+        """Horizontal line across the page just below the current line"""
+        y = self.y - 4
+        self.pages[-1].append(b"0.5 w %d %.2f m %d %.2f l S" % (MARGIN, y, PAGE_WIDTH - MARGIN, y))
+
+    def next_line(self, lines=1):
+        self.y -= LINE_HEIGHT * lines
+
+    def room_for(self, lines):
+        return self.y - LINE_HEIGHT * lines >= MARGIN
+
+
+def item_header(page):
+    page.text(MARGIN, "Item", bold=True)
+    for right, label in zip(COLUMNS, ("Qty", "Price", "Total")):
+        page.text(right, label, bold=True, right=True)
+    page.rule()
+    page.next_line(1.5)
+
+
+def render_invoice_pdf(invoice):
+    """Render an invoice as a PDF document and return its bytes
+
+    invoice is a dict as stored by CheckoutEngine or returned by
+    Database.get_invoice_documents: id, date, customer_name,
+    customer_mobile, items (name, quantity, price, total), subtotal,
+    discount, total and reward_tier_applied. Nothing touches the disk.
+    """
+    page = PageWriter()
+    page.text(MARGIN, "SHOPPING CART BILL", bold=True, size=18)
+    page.next_line(2)
+    page.text(MARGIN, f"Invoice #{invoice['id']}")
+    page.text(PAGE_WIDTH - MARGIN, invoice.get("date") or "", right=True)
+    page.next_line()
+
+    if invoice.get("customer_name") and invoice.get("customer_mobile"):
+        page.text(MARGIN, f"Customer: {invoice['customer_name']}")
+        page.next_line()
+        page.text(MARGIN, f"Mobile: {invoice['customer_mobile']}")
+        page.next_line()
+        if invoice.get("reward_tier_applied"):
+            page.text(MARGIN, f"Reward Tier: {invoice['reward_tier_applied']}")
+            page.next_line()
+    page.next_line()
+
+    item_header(page)
+    for item in invoice["items"]:
+        if not page.room_for(1):
+            page.new_page()
+            item_header(page)
+        name = str(item["name"])
+        page.text(MARGIN, name if len(name) <= NAME_CHARS else name[:NAME_CHARS - 3] + "...")
+        page.text(COLUMNS[0], item["quantity"], right=True)
+        page.text(COLUMNS[1], format_amount(item["price"]), right=True)
+        page.text(COLUMNS[2], format_amount(item["total"]), right=True)
+        page.next_line()
+
+    totals = [("Subtotal", invoice["subtotal"])]
+    if invoice["discount"] > 0:
+        totals.append(("Discount", -invoice["discount"]))
+    totals.append(("Final Amount", invoice["total"]))
+    if page.room_for(len(totals) + 1):
+        page.y += LINE_HEIGHT  # Rule right under the last item
+    else:
+        page.new_page()
+    page.rule()
+    page.next_line(1.5)
+    for label, amount in totals:
+        bold = label == "Final Amount"
+        page.text(COLUMNS[1], label, bold=bold, right=True)
+        page.text(COLUMNS[2], format_amount(amount), bold=bold, right=True)
+        page.next_line()
+
+    return build_document(page.pages, f"Invoice {invoice['id']}")
+
+
+def build_document(pages, title):
+    """Assemble a PDF file from page content streams (lists of operator lines)"""
+    first_page = 5
+    kids = b" ".join(b"%d 0 R" % (first_page + 2 * index) for index in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>"
+    ]
+    for index, lines in enumerate(pages):
+        stream = zlib.compress(b"\n".join(lines), 6)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, first_page + 2 * index + 1)
+        )
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Title %s /Producer (Shopping Cart) >>" % pdf_text(title))
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, len(objects), xref
+    )
+    return bytes(output)
+
+
+def render_batch(invoices, workers=None, chunksize=64):
+    """Render many invoices across a process pool; yields (invoice id, PDF bytes) in order
+
+    workers defaults to one process per CPU. Invoices are sent to the
+    workers chunksize at a time to keep the pickling overhead low.
+    """
+    invoices = list(invoices)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for invoice, pdf in zip(invoices, executor.map(render_invoice_pdf, invoices, chunksize=chunksize)):
+            yield invoice["id"], pdf
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    from config import DB_CONFIG
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Render the invoices of a date range as PDF files")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--from", dest="start", type=parse_day, required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=parse_day, required=True, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--directory", default="invoices_pdf")
+    parser.add_argument("--workers", type=int, help="Rendering processes (defaults to one per CPU)")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    try:
+        invoices = db.get_invoice_documents(args.start, args.end)
+    finally:
+        db.close()
+
+    os.makedirs(args.directory, exist_ok=True)
+    start = time.perf_counter()
+    written = 0
+    for invoice_id, pdf in render_batch(invoices, args.workers):
+        with open(os.path.join(args.directory, f"Invoice_{invoice_id}.pdf"), "wb") as f:
+            f.write(pdf)
+        written += len(pdf)
+    seconds = time.perf_counter() - start
+    print(f"Rendered {len(invoices)} invoices ({written / 1e6:.1f} MB) in {seconds:.2f}s "
+          f"({len(invoices) / max(seconds, 1e-9):.0f} invoices/s) to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# points_rollup.py - Background job folding points_ledger into customers.points
+
+import argparse
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database
+
+
+class PointsRollup:
+    def __init__(self, db, interval=60.0, batch_size=10000):
+        """Periodically fold the reward points ledger into customer balances
+
+        db may be a Database or a DatabasePool. Balances read through the
+        Database already include unfolded entries, so the interval only
+        bounds how large the unfolded tail gets, not what customers see.
+        """
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Fold every pending entry, one batch per transaction"""
+        total = 0
+        while True:
+            folded = self.db.fold_points_ledger(self.batch_size)
+            total += folded
+            if folded < self.batch_size:
+                return total
+
+    def start(self):
+        """Run the rollup on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, name="points-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        """Stop the thread after its current batch"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self):
+        """Fold the ledger every interval until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Points rollup error: {e}")
+            self._stop.wait(self.interval)
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Fold the reward points ledger into customer balances")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds between rollups")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--once", action="store_true", help="Fold pending entries and exit")
+    args = parser.parse_args()
+
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    rollup = PointsRollup(db, interval=args.interval, batch_size=args.batch_size)
+
+    try:
+        if args.once:
+            print(f"Folded {rollup.run_once()} ledger entries")
+        else:
+            rollup.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -49,6 +49,7 @@ ON CONFLICT (username) DO NOTHING;
 
 -- Create index for faster lookups
 CREATE INDEX IF NOT EXISTS idx_customers_mobile ON customers(mobile);
+CREATE INDEX IF NOT EXISTS idx_customers_birthday ON customers ((EXTRACT(MONTH FROM dob)::integer * 100 + EXTRACT(DAY FROM dob)::integer), id);
 CREATE INDEX IF NOT EXISTS idx_invoices_customer_id ON invoices(customer_id);
 CREATE INDEX IF NOT EXISTS idx_invoice_items_invoice_id ON invoice_items(invoice_id);
 
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# sales_counters.py - Running sales totals for this hour and today, for the live dashboard
+
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from top_items import window_start
+
+# Dashboard windows: the counters' name for each and the top_items window it spans
+WINDOWS = {"hour": "hour", "today": "day"}
+FIELDS = ("invoices", "gross", "discount", "net")
+
+
+def empty_totals():
+    return {"invoices": 0, "gross": Decimal(0), "discount": Decimal(0), "net": Decimal(0)}
+
+
+class SalesCounters:
+    def __init__(self):
+        """Invoice count, gross sales, discounts and net sales of the current hour and day
+
+        record() adds each checkout in memory, so snapshot() costs no
+        database round trip. reconcile() replaces the totals with the
+        server's, which include other tills' sales; checkouts counted here
+        that the server does not have yet (unsynced journal entries, or
+        invoices kept only in memory) are added back on top until it does.
+        """
+        self.totals = {}  # window -> (start, totals)
+        self.pending = {}  # invoice key -> (created_at, totals) counted here but not yet seen on the server
+        self.reconciled_at = None
+        self._keys = 0
+        self._lock = threading.Lock()
+
+    def _window(self, window, when):
+        """The totals of window containing when, starting new ones when the window has moved on"""
+        start = window_start(WINDOWS[window], when)
+        current = self.totals.get(window)
+        if current is None or current[0] < start:
+            current = self.totals[window] = (start, empty_totals())
+        return current
+
+    def _add(self, created_at, amounts, now):
+        for window in WINDOWS:
+            start, totals = self._window(window, now)
+            if created_at >= start:
+                for field in FIELDS:
+                    totals[field] += amounts[field]
+
+    def record(self, invoice, when=None):
+        """Count an invoice (a dict with subtotal, discount and total, as recorded by the engine)"""
+        when = when or datetime.now()
+        amounts = {
+            "invoices": 1,
+            "gross": Decimal(str(invoice["subtotal"])),
+            "discount": Decimal(str(invoice["discount"])),
+            "net": Decimal(str(invoice["total"]))
+        }
+        with self._lock:
+            self._keys += 1
+            key = invoice.get("invoice_key") or f"local-{self._keys}"
+            self.pending[key] = (when, amounts)
+            self._add(when, amounts, when)
+
+    def snapshot(self, now=None):
+        """Totals and average basket of the current hour and today"""
+        now = now or datetime.now()
+        result = {}
+        with self._lock:
+            for window in WINDOWS:
+                totals = dict(self._window(window, now)[1])
+                totals["average_basket"] = totals["net"] / totals["invoices"] if totals["invoices"] else Decimal(0)
+                result[window] = totals
+        return result
+
+    def reconcile(self, db, now=None):
+        """Reset the totals to the server's and re-add checkouts it does not have yet
+
+        Returns False (keeping the in-memory totals) if the query failed.
+        """
+        now = now or datetime.now()
+        day, hour = window_start("day", now), window_start("hour", now)
+        with self._lock:
+            keys = list(self.pending)
+        server = db.get_live_sales(day, hour, keys)
+        if server is None:
+            return False
+
+        with self._lock:
+            for key in server["seen"]:
+                self.pending.pop(key, None)
+            self.totals = {
+                "today": (day, {field: server["day"][field] for field in FIELDS}),
+                "hour": (hour, {field: server["hour"][field] for field in FIELDS})
+            }
+            # Checkouts from an earlier day can no longer count, whether or not they reach the server
+            for key, (created_at, amounts) in list(self.pending.items()):
+                if created_at < day:
+                    del self.pending[key]
+                else:
+                    self._add(created_at, amounts, now)
+            self.reconciled_at = now
+        return True
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# sales_cube.py - In-memory columnar cube of invoice lines for ad-hoc sales questions
+
+import argparse
+import sys
+import os
+import threading
+from datetime import date, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from copy_arrays import binary_row_dtype, copy_to_array
+from models import Database, to_date
+
+EPOCH = date(1970, 1, 1)
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Ids are allocated at insert but transactions commit in any order, so each
+# refresh re-reads this many ids below the highest loaded one and skips the
+# rows it already has
+LATE_IDS = 10000
+
+# Group-bys with at most this many possible key combinations use a dense bincount
+DENSE_GROUPS = 1 << 22
+
+ITEM_NAMES = "SELECT id, name FROM items WHERE id = ANY(%s)"
+
+# One row per invoice line with its invoice's amounts; items are encoded by
+# their items.id and dates as days since 1970
+LINES_COPY = """
+    COPY (
+        SELECT ii.id, ii.invoice_id, ii.created_at::date - DATE '1970-01-01',
+               EXTRACT(HOUR FROM ii.created_at)::integer, ii.item_id, ii.quantity,
+               ROUND(ii.total * 100)::bigint, ROUND(i.total_amount * 100)::bigint,
+               ROUND(i.discount_amount * 100)::bigint, COALESCE(i.customer_id, 0)
+        FROM invoice_items ii
+        JOIN invoices i ON i.id = ii.invoice_id AND i.created_at = ii.created_at
+        WHERE ii.id > {after}
+    ) TO STDOUT WITH (FORMAT binary)
+"""
+LINE_ROW = binary_row_dtype([
+    ("id", ">i4"), ("invoice", ">i4"), ("day", ">i4"), ("hour", ">i4"), ("item", ">i4"), ("quantity", ">i4"),
+    ("sales", ">i8"), ("invoice_total", ">i8"), ("invoice_discount", ">i8"), ("customer", ">i4")
+])
+
+# Stored column dtypes; sales are in paise so sums are exact
+COLUMNS = {
+    "id": np.int32, "invoice": np.int32, "day": np.int32, "month": np.int32, "hour": np.int8,
+    "item": np.int32, "tier": np.int8, "customer": np.int32, "quantity": np.int32, "sales": np.int64
+}
+
+
+class SalesCube:
+    def __init__(self, db):
+        """Columnar copy of invoice_items joined with invoices, held in NumPy arrays
+
+        Every invoice line is one row: its day (days since 1970-01-01),
+        month, hour, item id, the reward tier applied to
+        its invoice (from the discount rate, 0 for none), customer id (0 for
+        walk-ins), quantity and sales. refresh() appends lines added since the
+        last one, so the cube can be kept current cheaply; query() answers
+        group-by and filter questions over any date range without touching
+        the database. db is a Database.
+        """
+        self.db = db
+        self.item_names = [None]  # Indexed by items.id
+        self.item_codes = {}
+        self.tier_names = ["None"]
+        self.tier_discounts = np.zeros(0)
+        self.last_id = 0
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._columns["id"])
+
+    def refresh(self):
+        """Load lines added since the last refresh; return how many were added
+
+        The LATE_IDS ids below the highest loaded one are read every time, so
+        a line committed after a higher id was loaded is still picked up;
+        one committed later than LATE_IDS newer lines is missed.
+        """
+        with self._refresh_lock:
+            if not self.tier_discounts.size:
+                tiers = self.db.get_reward_tiers()
+                self.tier_names = ["None"] + [name for name, _, _ in tiers]
+                self.tier_discounts = np.array([discount for _, _, discount in tiers])
+
+            after = max(self.last_id - LATE_IDS, 0)
+            try:
+                rows = copy_to_array(self.db.cursor, LINES_COPY.format(after=int(after)), LINE_ROW)
+
+                # Items are never renamed or deleted, so only the loaded lines' items without a name
+                # are read; ids commit out of order, so they are not assumed to follow the known ones
+                item_ids = np.unique(rows["item"]).tolist()
+                missing = [item_id for item_id in item_ids
+                           if item_id >= len(self.item_names) or self.item_names[item_id] is None]
+                if missing:
+                    self.db.cursor.execute(ITEM_NAMES, (missing,))
+                    for item_id, name in self.db.cursor.fetchall():
+                        self.item_names.extend([None] * (item_id + 1 - len(self.item_names)))
+                        self.item_names[item_id] = name
+                        self.item_codes[name] = item_id
+                self.db.conn.commit()
+            except Exception as e:
+                self.db.conn.rollback()
+                print(f"Database error: {e}")
+                raise
+
+            columns = self._columns
+            if self.last_id:
+                rows = rows[~np.isin(rows["id"], columns["id"][columns["id"] > after])]
+            if not len(rows):
+                return 0
+
+            days = rows["day"].astype(np.int32)
+            added = {
+                "id": rows["id"],
+                "invoice": rows["invoice"],
+                "day": days,
+                "month": days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32),
+                "hour": rows["hour"],
+                "item": rows["item"],
+                "tier": self._tier_codes(rows["invoice_total"], rows["invoice_discount"]),
+                "customer": rows["customer"],
+                "quantity": rows["quantity"],
+                "sales": rows["sales"]
+            }
+            # Queries keep reading the previous columns until they are swapped in together
+            self._columns = {
+                name: np.concatenate([columns[name], added[name].astype(dtype)]) for name, dtype in COLUMNS.items()
+            }
+            self.last_id = max(self.last_id, int(rows["id"].max()))
+            return len(rows)
+
+    def _tier_codes(self, totals, discounts):
+        """Tier applied to each invoice: the tier whose discount rate is nearest, 0 if no discount"""
+        codes = np.zeros(len(totals), dtype=np.int8)
+        discounted = (discounts > 0) & (totals > 0)
+        if self.tier_discounts.size and discounted.any():
+            rates = discounts[discounted] / totals[discounted]
+            codes[discounted] = np.abs(rates[:, None] - self.tier_discounts[None, :]).argmin(axis=1) + 1
+        return codes
+
+    def _dimension(self, columns, name):
+        """Integer key of each row for a group-by dimension"""
+        if name == "week":
+            return (columns["day"] + 3) // 7  # Weeks start on Monday; 1970-01-01 was a Thursday
+        if name == "weekday":
+            return (columns["day"] + 3) % 7
+        if name in ("day", "month", "hour", "item", "tier", "customer"):
+            return columns[name]
+        raise ValueError(f"Unknown dimension: {name}")
+
+    def _label(self, name, key):
+        """Readable value of a dimension key"""
+        if name == "day":
+            return EPOCH + timedelta(days=key)
+        if name == "week":
+            return EPOCH + timedelta(days=key * 7 - 3)
+        if name == "month":
+            return f"{1970 + key // 12}-{key % 12 + 1:02d}"
+        if name == "weekday":
+            return WEEKDAYS[key]
+        if name == "item":
+            return self.item_names[key]
+        if name == "tier":
+            return self.tier_names[key]
+        return key
+
+    def _mask(self, columns, start, end, items, tiers, hours):
+        """Rows matching the filters, or None for all rows"""
+        mask = None
+
+        def combine(condition):
+            return condition if mask is None else mask & condition
+
+        if start is not None:
+            mask = combine(columns["day"] >= (to_date(start) - EPOCH).days)
+        if end is not None:
+            mask = combine(columns["day"] <= (to_date(end) - EPOCH).days)
+        if items is not None:
+            codes = [self.item_codes[name] for name in items if name in self.item_codes]
+            mask = combine(np.isin(columns["item"], codes))
+        if tiers is not None:
+            codes = [self.tier_names.index(name) for name in tiers if name in self.tier_names]
+            mask = combine(np.isin(columns["tier"], codes))
+        if hours is not None:
+            mask = combine(np.isin(columns["hour"], list(hours)))
+        return mask
+
+    def query(self, by=(), start=None, end=None, items=None, tiers=None, hours=None, top=None):
+        """Group lines by dimensions and sum lines, quantity and sales
+
+        by is a tuple of dimensions: day, week, month, weekday, hour, item,
+        tier or customer. start and end (dates or YYYY-MM-DD, inclusive)
+        limit the date range; items, tiers and hours keep only those values.
+        Returns a list of dicts with the dimension values and measures,
+        ordered by the dimensions, or the top N by sales if top is given.
+        """
+        columns = self._columns
+        mask = self._mask(columns, start, end, items, tiers, hours)
+        if mask is not None:
+            needed = {"week": "day", "weekday": "day"}
+            names = {needed.get(name, name) for name in by} | {"quantity", "sales"}
+            columns = {name: columns[name][mask] for name in names}
+
+        keys = []
+        sizes = []
+        for name in by:
+            key = self._dimension(columns, name)
+            low = int(key.min()) if len(key) else 0
+            keys.append((key - low if low else key, low))
+            sizes.append(int(key.max()) - low + 1 if len(key) else 1)
+
+        groups = 1
+        for size in sizes:
+            groups *= size
+        if keys:
+            combined = np.ravel_multi_index([key for key, _ in keys], sizes)
+        else:
+            combined = np.zeros(len(columns["sales"]), dtype=np.int64)
+        if groups <= DENSE_GROUPS:
+            slots, inverse = None, combined
+        else:
+            slots, inverse = np.unique(combined, return_inverse=True)
+            groups = len(slots)
+
+        lines = np.bincount(inverse, minlength=groups)
+        quantity = np.bincount(inverse, weights=columns["quantity"], minlength=groups)
+        sales = np.bincount(inverse, weights=columns["sales"], minlength=groups)
+
+        present = np.flatnonzero(lines)
+        if top is not None:
+            present = present[np.argsort(-sales[present], kind="stable")[:top]]
+        combined_keys = present if slots is None else slots[present]
+        unravelled = np.unravel_index(combined_keys, sizes) if keys else []
+
+        result = []
+        for position, group in enumerate(present):
+            row = {}
+            for (name, (_, low), values) in zip(by, keys, unravelled):
+                row[name] = self._label(name, int(values[position]) + low)
+            row["lines"] = int(lines[group])
+            row["quantity"] = int(quantity[group])
+            row["sales"] = round(sales[group] / 100, 2)
+            result.append(row)
+        return result
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Answer a sales question from an in-memory cube")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--by", default="", help="Comma-separated dimensions, e.g. hour or item,week")
+    parser.add_argument("--from", dest="start", help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--item", action="append", dest="items", help="Only this item (repeatable)")
+    parser.add_argument("--tier", action="append", dest="tiers", help="Only this tier (repeatable)")
+    parser.add_argument("--top", type=int, help="Only the top N groups by sales")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+
+    try:
+        cube = SalesCube(db)
+        cube.refresh()
+        by = tuple(name for name in args.by.split(",") if name)
+        for row in cube.query(by, args.start, args.end, args.items, args.tiers, top=args.top):
+            print("  ".join(f"{name}={value}" for name, value in row.items()))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
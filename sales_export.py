@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# sales_export.py - Stream invoices, invoice items and customers for a date range to CSV with COPY
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import DOB_TEXT_SQL, Database
+
+# Bill text is left out: it can be re-rendered from the items and would dominate the file
+EXPORTS = {
+    "invoices": """
+        SELECT id, customer_id, total_amount, discount_amount, final_amount, invoice_key, created_at
+        FROM invoices
+        WHERE created_at >= %(start)s AND created_at < %(end)s
+    """,
+    "invoice_items": """
+        SELECT ii.id, ii.invoice_id, items.name AS item_name, ii.quantity, ii.price, ii.total, ii.created_at
+        FROM invoice_items ii
+        JOIN items ON items.id = ii.item_id
+        WHERE ii.created_at >= %(start)s AND ii.created_at < %(end)s
+    """,
+    # Only the customers the exported invoices refer to
+    "customers": f"""
+        SELECT c.id, c.name, c.mobile, {DOB_TEXT_SQL} AS dob, c.email, c.points, c.tier, c.created_at
+        FROM customers c
+        WHERE c.id IN (
+            SELECT customer_id FROM invoices WHERE created_at >= %(start)s AND created_at < %(end)s
+        )
+    """
+}
+
+
+# COPY hands over one row per write; rows are collected into blocks this size before
+# they reach the file, so gzip compresses large blocks instead of every row on its own
+WRITE_BLOCK_SIZE = 1 << 20
+
+
+class BlockWriter:
+    """Binary file wrapper that writes in blocks and counts the bytes written"""
+
+    def __init__(self, file, block_size=WRITE_BLOCK_SIZE):
+        self.file = file
+        self.block_size = block_size
+        self.block = bytearray()
+        self.bytes = 0
+
+    def write(self, data):
+        self.block += data
+        if len(self.block) >= self.block_size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        self.bytes += len(self.block)
+        self.file.write(self.block)
+        self.block.clear()
+
+
+def export_table(db_config, query, path, compress=False, snapshot=None):
+    """Stream one query to a CSV file (with a header row) with COPY ... TO STDOUT
+
+    Rows go straight from the connection to the file (through gzip with
+    compress), so memory stays constant whatever the size of the export.
+    snapshot is an exported snapshot id to read from. Returns the rows,
+    CSV bytes, file bytes and seconds taken.
+    """
+    db = Database(db_config)
+    start = time.perf_counter()
+    try:
+        db.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        if snapshot is not None:
+            db.cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+
+        # Level 6 instead of gzip.open's 9: nearly the same size at about twice the speed
+        with (gzip.open(path, "wb", compresslevel=6) if compress else open(path, "wb")) as f:
+            writer = BlockWriter(f)
+            db.cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+            writer.flush()
+            rows = db.cursor.rowcount
+        db.conn.commit()
+
+    except Exception as e:
+        db.conn.rollback()
+        print(f"Error exporting to {path}: {e}")
+        raise
+    finally:
+        db.close()
+
+    return {
+        "rows": rows,
+        "bytes": writer.bytes,
+        "file_bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start
+    }
+
+
+def export_sales(db_config, start, end, directory, compress=False, parallel=True):
+    """Export invoices, invoice_items and customers for the days start..end (dates, inclusive)
+
+    Writes <directory>/<table>_<start>_<end>.csv (.csv.gz with compress).
+    Each table is exported by its own process and connection, all at once
+    with parallel, and all read one snapshot so the files agree with each
+    other.
+    Returns per-table stats plus the total bytes, seconds and MB/s.
+    """
+    os.makedirs(directory, exist_ok=True)
+    suffix = ".csv.gz" if compress else ".csv"
+
+    # The coordinating transaction holds the snapshot open until every table is written
+    db = Database(db_config)
+    try:
+        db.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        db.cursor.execute("SELECT pg_export_snapshot()")
+        snapshot = db.cursor.fetchone()[0]
+        params = {"start": start, "end": end + timedelta(days=1)}
+        queries = {table: db.cursor.mogrify(query, params).decode() for table, query in EXPORTS.items()}
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=len(EXPORTS) if parallel else 1) as executor:
+            futures = {
+                table: executor.submit(
+                    export_table, db_config, query,
+                    os.path.join(directory, f"{table}_{start:%Y%m%d}_{end:%Y%m%d}{suffix}"), compress, snapshot
+                )
+                for table, query in queries.items()
+            }
+            tables = {table: future.result() for table, future in futures.items()}
+        seconds = time.perf_counter() - started
+        db.conn.commit()
+
+    except Exception:
+        db.conn.rollback()
+        raise
+    finally:
+        db.close()
+
+    total = sum(stats["bytes"] for stats in tables.values())
+    return {
+        "tables": tables,
+        "bytes": total,
+        "file_bytes": sum(stats["file_bytes"] for stats in tables.values()),
+        "seconds": seconds,
+        "mb_per_sec": total / 1e6 / seconds if seconds else 0.0
+    }
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Export invoices, items and customers for a date range as CSV")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--from", dest="start", type=parse_day, required=True, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=parse_day, required=True, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--directory", default="export")
+    parser.add_argument("--gzip", action="store_true", help="Write gzip-compressed files")
+    parser.add_argument("--serial", action="store_true", help="Export one table at a time")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+
+    result = export_sales(db_config, args.start, args.end, args.directory, compress=args.gzip,
+                          parallel=not args.serial)
+    for table, stats in result["tables"].items():
+        print(f"{table:<14} {stats['rows']:>10} rows  {stats['bytes'] / 1e6:8.1f} MB CSV  "
+              f"{stats['file_bytes'] / 1e6:8.1f} MB written  {stats['seconds']:6.2f}s  "
+              f"{stats['bytes'] / 1e6 / max(stats['seconds'], 1e-9):6.1f} MB/s")
+    print(f"Exported {result['bytes'] / 1e6:.1f} MB of CSV in {result['seconds']:.2f}s "
+          f"({result['mb_per_sec']:.1f} MB/s) to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
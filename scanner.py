@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# scanner.py - Barcode scanner input: keystroke bursts recognized by timing, cart redraws coalesced per frame
+
+import math
+import time
+
+# Keys a scanner sends after each code (configured as its suffix)
+TERMINATORS = ("\n", "\r")
+
+
+class ScanBuffer:
+    def __init__(self, max_gap_ms=30, min_length=4):
+        """Split key presses into scanned codes and keys typed by hand
+
+        A USB scanner types a whole code plus Enter within a few
+        milliseconds a key, much faster than anyone types. Keys are held
+        while they keep arriving within max_gap_ms of each other: an Enter
+        that ends such a burst of at least min_length keys is a scan, and
+        anything else is handed back as typed keys. Times are the key
+        events' own timestamps, so a handler that falls behind does not
+        change how its queued keys are classified.
+        """
+        self.max_gap_ms = max_gap_ms
+        self.min_length = min_length
+        self._keys = []
+        self._last = None
+
+    @property
+    def pending(self):
+        return bool(self._keys)
+
+    def feed(self, char, time_ms):
+        """Add a key pressed at time_ms; returns ("scan", code) and ("keys", text) results, in order"""
+        results = []
+        if self._keys and time_ms - self._last > self.max_gap_ms:
+            results += self.flush()
+        if char in TERMINATORS:
+            if len(self._keys) >= self.min_length:
+                results.append(("scan", "".join(self._keys)))
+            else:
+                results.append(("keys", "".join(self._keys) + "\n"))
+            self._keys = []
+        else:
+            self._keys.append(char)
+        self._last = time_ms
+        return results
+
+    def flush(self):
+        """Hand back held keys that no Enter followed as typed keys"""
+        if not self._keys:
+            return []
+        text = "".join(self._keys)
+        self._keys = []
+        return [("keys", text)]
+
+
+class FrameCoalescer:
+    def __init__(self, schedule, callback, frame_ms=16, clock=None):
+        """Run callback at most once per frame however often request() is called
+
+        schedule(delay_ms, function) runs function later on the UI thread
+        (Tk's after()). A request made more than a frame after the last run
+        is served as soon as the events already queued have been handled;
+        otherwise it waits for the next frame, along with any others.
+        """
+        self.schedule = schedule
+        self.callback = callback
+        self.frame_ms = frame_ms
+        self.clock = clock or (lambda: time.monotonic() * 1000)
+        self._scheduled = False
+        self._ran_at = None
+
+    def request(self):
+        if not self._scheduled:
+            self._scheduled = True
+            delay = 0 if self._ran_at is None else self._ran_at + self.frame_ms - self.clock()
+            self.schedule(max(0, int(math.ceil(delay))), self._run)
+
+    def _run(self):
+        self._scheduled = False
+        self._ran_at = self.clock()
+        self.callback()
+
+
+class ScanInput:
+    def __init__(self, add_code, refresh, type_keys, schedule, max_gap_ms=30, min_length=4, frame_ms=16,
+                 clock=None):
+        """Scanner input mode for a UI thread
+
+        Every key goes to key(). Recognized codes go to add_code(code),
+        which should only add the item (returning True if it did); the
+        redraw is left to refresh(), run at most once per frame for all the
+        codes added since the last one. Keys typed by hand come back through
+        type_keys(text) ("\\n" for Enter) once it is clear they are not a
+        scan, at most max_gap_ms after the last one. clock() returns
+        milliseconds on the clock schedule() uses.
+        """
+        self.buffer = ScanBuffer(max_gap_ms, min_length)
+        self.add_code = add_code
+        self.type_keys = type_keys
+        self.schedule = schedule
+        self.clock = clock or (lambda: time.monotonic() * 1000)
+        self.refresher = FrameCoalescer(schedule, refresh, frame_ms, self.clock)
+        self.scans = 0
+        self.rejected = 0
+        self._fed_at = 0
+        self._flush_scheduled = False
+
+    def key(self, char, time_ms):
+        """Handle one key press (char is "\\n" for Enter) with its event timestamp"""
+        self._dispatch(self.buffer.feed(char, time_ms))
+        self._fed_at = self.clock()
+        if self.buffer.pending and not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.schedule(self.buffer.max_gap_ms + 1, self._flush_when_idle)
+
+    def flush(self):
+        """Release held keys now, e.g. before an editing key that must apply after them"""
+        self._dispatch(self.buffer.flush())
+
+    def _flush_when_idle(self):
+        idle = self.clock() - self._fed_at
+        if idle <= self.buffer.max_gap_ms:
+            self.schedule(int(self.buffer.max_gap_ms - idle) + 1, self._flush_when_idle)
+            return
+        self._flush_scheduled = False
+        self.flush()
+
+    def _dispatch(self, results):
+        for kind, text in results:
+            if kind == "keys":
+                self.type_keys(text)
+                continue
+            self.scans += 1
+            if self.add_code(text):
+                self.refresher.request()
+            else:
+                self.rejected += 1
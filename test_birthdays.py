@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script for birthday lookups and the conversion of text dates of birth to DATE
+"""
+
+import sys
+import os
+from datetime import date
+from psycopg2.extensions import make_dsn
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import BIRTHDAYS_SQL, Database
+from config import DB_CONFIG
+
+CUSTOMERS = {
+    "9000000050": ("Birthday New Year's Eve Eve", "30/12/1985"),
+    "9000000051": ("Birthday January", "02/01/1990"),
+    "9000000052": ("Birthday Leap Day", "29/02/1992"),
+    "9000000053": ("Birthday Midsummer", "15/06/2000"),
+}
+
+def birthdays(db, start, end):
+    """(mobile, birthday, age) of the test customers with a birthday from start to end"""
+    return [(c["mobile"], c["birthday"], c["age"]) for c in db.get_birthdays(start, end) if c["mobile"] in CUSTOMERS]
+
+def test_birthday_ranges():
+    """Ranges across New Year, leap days and whole years, in birthday order"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    for mobile, (name, dob) in CUSTOMERS.items():
+        assert db.save_customer(name, mobile, dob)
+    assert db.get_customer_by_mobile("9000000051")["dob"] == "02/01/1990"
+
+    assert birthdays(db, "2025-12-28", "2026-01-03") == [
+        ("9000000050", date(2025, 12, 30), 40), ("9000000051", date(2026, 1, 2), 36)
+    ]
+    assert birthdays(db, "2025-12-31", "2026-01-01") == []
+    # 29 February is celebrated on the 28th when there is none
+    assert birthdays(db, "2025-02-27", "2025-02-28") == [("9000000052", date(2025, 2, 28), 33)]
+    assert birthdays(db, "2024-02-28", "2024-02-28") == []
+    assert birthdays(db, "2024-02-29", "2024-03-01") == [("9000000052", date(2024, 2, 29), 32)]
+    # A year from mid-June covers everyone, starting with the first birthday on or after the start
+    assert [mobile for mobile, _, _ in birthdays(db, "2025-06-01", "2026-05-31")] == [
+        "9000000053", "9000000050", "9000000051", "9000000052"
+    ]
+    assert len(db.get_birthdays("2025-06-01", "2025-06-30", limit=1)) == 1
+    try:
+        db.get_birthdays("2025-06-30", "2025-06-01")
+        raise AssertionError("A backwards range was accepted")
+    except ValueError:
+        pass
+
+    # The index returns a range in the query's order; the planner picks such a plan on its own once the
+    # table is large enough, so here every other plan is switched off
+    db.cursor.execute("SET enable_seqscan = off")
+    db.cursor.execute("SET enable_bitmapscan = off")
+    db.cursor.execute("EXPLAIN " + BIRTHDAYS_SQL, {"first": 1228, "last": 1231, "limit": 100})
+    plan = "\n".join(row[0] for row in db.cursor.fetchall())
+    db.conn.rollback()
+    assert "Index Scan using idx_customers_birthday" in plan and "Sort" not in plan, plan
+    db.close()
+
+def test_text_dob_conversion():
+    """Text dates of birth are parsed in batches, with tills writing text in the meantime kept in step"""
+    admin = Database(DB_CONFIG)
+    admin.conn.autocommit = True
+    admin.cursor.execute("DROP SCHEMA IF EXISTS dob_test CASCADE")
+    admin.cursor.execute("CREATE SCHEMA dob_test")
+    db = Database(make_dsn(host=DB_CONFIG.get("host"), port=DB_CONFIG.get("port"), dbname=DB_CONFIG.get("database"),
+                           user=DB_CONFIG.get("user"), password=DB_CONFIG.get("password") or None,
+                           options="-c search_path=dob_test"))
+    try:
+        db.setup_database()
+        # customers as it was before dob was a DATE
+        db.cursor.execute("DROP INDEX idx_customers_birthday")
+        db.cursor.execute("ALTER TABLE customers ALTER COLUMN dob TYPE TEXT")
+        rows = [("Text Date", "9000000060", "30/12/1985"), ("Short Date", "9000000061", "2/1/1990"),
+                ("No Such Day", "9000000062", "31/02/1990"), ("Blank", "9000000063", ""),
+                ("No Date", "9000000064", None)]
+        for row in rows:
+            db.cursor.execute("INSERT INTO customers (name, mobile, dob) VALUES (%s, %s, %s)", row)
+        db.conn.commit()
+        assert db.customer_dobs_pending() and not db.schema_is_current()
+
+        db.setup_database(backfill=False)
+        first, parsed, unparsed = db.parse_customer_dobs(0, 2)
+        assert (parsed, unparsed) == (2, 0)
+        # A till that predates the DATE column saves a customer halfway through
+        db.cursor.execute("INSERT INTO customers (name, mobile, dob) VALUES ('Till Date', '9000000065', '15/06/2000')")
+        db.conn.commit()
+        after, parsed, unparsed = db.parse_customer_dobs(first, 10)
+        assert (parsed, unparsed) == (1, 1)
+        assert db.parse_customer_dobs(after, 10) == (None, 0, 0)
+
+        # This version reads and writes customers while dob is still text
+        assert db.get_customer_by_mobile("9000000060")["dob"] == "30/12/1985"
+        assert db.save_customer("App Date", "9000000066", "01/03/1970")
+        assert db.get_customer_by_mobile("9000000066")["dob"] == "01/03/1970"
+        db.cursor.execute("SELECT dob, dob_date FROM customers WHERE mobile = '9000000066'")
+        assert tuple(db.cursor.fetchone()) == ("01/03/1970", date(1970, 3, 1))
+        db.conn.commit()
+
+        assert db.convert_customer_dobs() == 1
+        assert not db.customer_dobs_pending() and db.schema_is_current()
+        assert db.convert_customer_dobs() == 0
+        dobs = {mobile: (db.get_customer_by_mobile(mobile) or {}).get("dob") for _, mobile, _ in rows}
+        assert dobs == {"9000000060": "30/12/1985", "9000000061": "02/01/1990", "9000000062": None,
+                        "9000000063": None, "9000000064": None}
+        assert db.get_customer_by_mobile("9000000066")["dob"] == "01/03/1970"
+        # The text that was not a date is kept
+        db.cursor.execute("SELECT mobile, dob_unparsed FROM customers WHERE dob_unparsed IS NOT NULL")
+        assert [tuple(row) for row in db.cursor.fetchall()] == [("9000000062", "31/02/1990")]
+        db.conn.commit()
+        assert [c["mobile"] for c in db.get_birthdays("2025-06-01", "2026-05-31")] == [
+            "9000000065", "9000000060", "9000000061", "9000000066"
+        ]
+    finally:
+        db.close()
+        admin.cursor.execute("DROP SCHEMA dob_test CASCADE")
+        admin.close()
+
+if __name__ == "__main__":
+    test_birthday_ranges()
+    test_text_dob_conversion()
+    print("\nBirthdays test completed!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the product catalog: lookups, name search and updates heard over NOTIFY
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import ProductCatalog
+from checkout import CheckoutEngine, CheckoutError
+from customer_cache import CacheListener
+from models import Database
+from config import DB_CONFIG
+
+def test_apply_and_lookup():
+    """Renames, barcode changes and removals leave no stale index entries"""
+    catalog = ProductCatalog()
+    catalog.apply([
+        ("TEST-047-1", "8900000000471", "Catalog Tea 250g", 120.0),
+        ("TEST-047-2", None, "Catalog Coffee 100g", 95.5),
+    ], ["TEST-047-1", "TEST-047-2"])
+    assert catalog.lookup("8900000000471")["sku"] == "TEST-047-1"
+    assert catalog.lookup("TEST-047-2")["price"] == 95.5
+    assert [p["sku"] for p in catalog.search("catalog")] == ["TEST-047-2", "TEST-047-1"]
+
+    catalog.apply([("TEST-047-1", "8900000000472", "Assam Tea 250g", 125.0)], ["TEST-047-1"])
+    assert catalog.lookup("8900000000471") is None
+    assert catalog.lookup("8900000000472")["name"] == "Assam Tea 250g"
+    assert [p["sku"] for p in catalog.search("Catalog")] == ["TEST-047-2"]
+    assert [p["sku"] for p in catalog.search("assam")] == ["TEST-047-1"]
+
+    catalog.apply([], ["TEST-047-2"])
+    assert catalog.lookup("TEST-047-2") is None and catalog.search("catalog") == []
+    assert len(catalog) == 1 and len(catalog.codes) == 2 and len(catalog.names) == 1
+
+def test_changes_reach_catalog():
+    """Products saved or taken off sale elsewhere show up in a listening catalog"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    db.save_products([{"sku": "TEST-047-3", "barcode": "8900000000473", "name": "Catalog Rice 1kg", "price": 80}])
+
+    catalog = ProductCatalog()
+    listener = CacheListener(None, DB_CONFIG, poll_interval=0.05, catalog=catalog)
+    listener.start()
+    try:
+        assert listener.connected.wait(30)
+        assert catalog.lookup("8900000000473")["price"] == 80.0
+
+        def wait_for(condition):
+            deadline = time.monotonic() + 5
+            while not condition() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            return condition()
+
+        db.save_products([{"sku": "TEST-047-3", "barcode": "8900000000473", "name": "Catalog Rice 1kg", "price": 85}])
+        assert wait_for(lambda: catalog.lookup("TEST-047-3")["price"] == 85.0)
+
+        engine = CheckoutEngine(db, catalog=catalog)
+        session = engine.open_session()
+        item = session.add_product("8900000000473", 2)
+        assert item == {"name": "Catalog Rice 1kg", "quantity": 2, "price": 85.0, "total": 170.0, "sku": "TEST-047-3"}
+        try:
+            session.add_product("0000000000000")
+            raise AssertionError("Unknown barcode was added")
+        except CheckoutError:
+            pass
+
+        db.deactivate_products(["TEST-047-3"])
+        assert wait_for(lambda: catalog.lookup("8900000000473") is None)
+    finally:
+        listener.stop()
+        db.deactivate_products(["TEST-047-3"])
+        db.close()
+
+if __name__ == "__main__":
+    test_apply_and_lookup()
+    test_changes_reach_catalog()
+    print("\nCatalog test completed!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless checkout engine
+"""
+
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine, CheckoutError
+from db_pool import DatabasePool
+from models import Database
+from utils import PriceFormatter
+from config import DB_CONFIG
+
+TEST_MOBILE = "9000000036"
+
+def test_checkout_sessions():
+    """Run several checkout sessions concurrently without a display"""
+    pool = DatabasePool(DB_CONFIG, max_connections=4)
+    pool.setup_database()
+    engine = CheckoutEngine(pool)
+
+    print("Testing headless checkout...\n")
+
+    # Invalid input is reported without touching the cart
+    session = engine.open_session()
+    try:
+        session.add_item("Milk", "two", "50")
+        assert False, "expected CheckoutError"
+    except CheckoutError as e:
+        print(f"  rejected: {e}")
+    assert session.cart == []
+
+    errors = []
+
+    def lane(lane_number):
+        try:
+            session = engine.open_session()
+            session.add_item(f"Item {lane_number}", 2, 150)
+            session.add_item("Bread", 1, 40)
+            quote = session.quote()
+            assert quote["subtotal"] == 340
+            invoice = session.checkout()
+            assert session.cart == []
+            assert invoice["total"] == 340
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=lane, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    assert len(engine.invoices) == 8
+    assert len({invoice["id"] for invoice in engine.invoices.values()}) == 8
+    print(f"  {len(engine.invoices)} invoices recorded by {len(engine.sessions)} sessions")
+
+    pool.close()
+    print("\nCheckout test completed!")
+
+def test_kept_invoices_are_bounded():
+    """Only the last max_invoices invoices stay in memory, and lookups find them by id and mobile"""
+    pool = DatabasePool(DB_CONFIG, max_connections=2)
+    pool.setup_database()
+    pool.save_customer("Invoice Keeper", TEST_MOBILE, "", None)
+    engine = CheckoutEngine(pool, max_invoices=3)
+
+    invoices = []
+    for n in range(5):
+        session = engine.open_session()
+        if n % 2 == 0:
+            session.set_customer("Invoice Keeper", TEST_MOBILE)
+        session.add_item("Milk", 1, 50 + n)
+        invoices.append(session.checkout())
+
+    assert list(engine.invoices) == [invoice["id"] for invoice in invoices[2:]]
+    assert engine.get_invoice(invoices[0]["id"]) is None
+    # Compressed bills (the default storage) go with their invoices
+    assert sorted(engine._bills) == list(engine.invoices)
+    assert engine.get_invoice(invoices[4]["id"])["total"] == invoices[4]["total"]
+    try:
+        engine.get_bill(invoices[0]["id"])
+        raise AssertionError("An evicted invoice's bill was returned")
+    except CheckoutError:
+        pass
+    # Invoices 0, 2 and 4 were the customer's; 0 is no longer kept
+    assert [invoice["id"] for invoice in engine.get_invoices_by_mobile(TEST_MOBILE)] == [
+        invoices[4]["id"], invoices[2]["id"]
+    ]
+    assert [invoice["id"] for invoice in engine.get_invoices_by_mobile("")] == [invoices[3]["id"]]
+    pool.close()
+
+def test_bill_storage_modes():
+    """Bills read back identically whether stored as text, compressed or re-rendered"""
+    pool = DatabasePool(DB_CONFIG, max_connections=2)
+    pool.setup_database()
+    pool.save_customer("Bill Reader", TEST_MOBILE, "", None)
+    pool.update_customer_points(TEST_MOBILE, 0)
+
+    print("Testing bill storage modes...\n")
+
+    cart = [
+        {"name": "Milk", "quantity": 2, "price": 150.0, "total": 300.0},
+        {"name": "Bread", "quantity": 1, "price": 40.0, "total": 40.0}
+    ]
+    bill = PriceFormatter.format_bill(cart, 340, 17, 323, "Bill Reader", TEST_MOBILE, "Bronze")
+
+    for mode in ("text", "zlib", "none"):
+        # Engine (in-memory invoices)
+        engine = CheckoutEngine(pool, bill_storage=mode)
+        session = engine.open_session()
+        session.set_customer("Bill Reader", TEST_MOBILE)
+        for item in cart:
+            session.add_item(item["name"], item["quantity"], item["price"])
+        invoice = session.checkout()
+        assert ("bill_content" in engine.get_invoice(invoice["id"])) == (mode == "text")
+        assert engine.get_bill(invoice["id"]) == invoice["bill_content"]
+
+        # Database (invoices table)
+        db = Database(DB_CONFIG, bill_storage=mode)
+        points = db.get_customer_by_mobile(TEST_MOBILE)["points"]
+        invoice_id = db.save_invoice(TEST_MOBILE, 340, 17, 323, cart, bill)
+        # Points are accrued by accrue_points at checkout, never a second time here
+        assert db.get_customer_by_mobile(TEST_MOBILE)["points"] == points
+        db.bill_cache.clear()
+        assert db.get_invoice_bill(invoice_id) == bill
+        assert db.get_invoice_bill(invoice_id) == bill  # served from the render cache
+        db.close()
+        print(f"  {mode}: ok")
+
+    pool.close()
+
+if __name__ == "__main__":
+    test_checkout_sessions()
+    test_kept_invoices_are_bounded()
+    test_bill_storage_modes()
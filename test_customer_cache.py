@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the customer cache: a change made by one process invalidates another's cache
+"""
+
+import sys
+import os
+import json
+import subprocess
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine
+from customer_cache import CacheListener, CustomerCache
+from models import Database
+from config import DB_CONFIG
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TEST_MOBILE = "9000000046"
+
+def test_invalidation_rules():
+    """Balance changes drop the customer; detail changes also drop the suggestions they may affect"""
+    cache = CustomerCache(ttl=60)
+    cache.customer(TEST_MOBILE, lambda mobile: {"mobile": mobile, "points": 10})
+    cache.suggestions("mobile", "90000000", lambda prefix: [TEST_MOBILE])
+    cache.suggestions("mobile", "98", lambda prefix: ["9876543210"])
+    cache.suggestions("name", "Cache", lambda prefix: ["Cachetest Alpha"])
+
+    cache.invalidate(TEST_MOBILE)
+    assert TEST_MOBILE not in cache._customers and len(cache._suggestions) == 3
+    cache.invalidate(TEST_MOBILE, details=True)
+    assert list(cache._suggestions) == [("mobile", "98")]
+
+    # A load that raced an invalidation is returned but not cached
+    def load_during_change(mobile):
+        cache.invalidate(mobile)
+        return {"mobile": mobile, "points": 20}
+    assert cache.customer(TEST_MOBILE, load_during_change)["points"] == 20
+    assert TEST_MOBILE not in cache._customers
+
+def listening_till():
+    """Run in a second process: report the cached customer each time a line arrives on stdin"""
+    cache = CustomerCache(ttl=3600)
+    listener = CacheListener(cache, DB_CONFIG, poll_interval=0.1)
+    listener.start()
+    assert listener.connected.wait(10)
+    db = Database(DB_CONFIG)
+    engine = CheckoutEngine(db, customer_cache=cache)
+
+    def report():
+        engine.lookup_customer(TEST_MOBILE)  # Served from the cache after the first call
+        print(json.dumps({
+            "points": engine.lookup_customer(TEST_MOBILE)["points"],
+            "names": engine.get_customer_name_suggestions("Cachetest"),
+            "misses": cache.misses
+        }), flush=True)
+
+    seen = cache.invalidations
+    report()
+    for _ in sys.stdin:
+        # Wait for the notification of the change made before this line was sent
+        deadline = time.monotonic() + 5
+        while cache.invalidations == seen and time.monotonic() < deadline:
+            time.sleep(0.02)
+        seen = cache.invalidations
+        report()
+    listener.stop()
+    db.close()
+
+def test_change_reaches_other_process():
+    """A points change and a rename on this till are seen by a till that cached the customer"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    db.save_customer("Cachetest Alpha", TEST_MOBILE, "01/01/1980", None)
+    db.update_customer_points(TEST_MOBILE, 100)
+
+    till = subprocess.Popen(
+        [sys.executable, "-c", "import test_customer_cache; test_customer_cache.listening_till()"],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+
+    def step():
+        till.stdin.write("\n")
+        till.stdin.flush()
+        return read()
+
+    def read():
+        while True:
+            line = till.stdout.readline()
+            if not line:
+                raise AssertionError("The second till exited")
+            if line.startswith("{"):
+                return json.loads(line)
+
+    try:
+        first = read()
+        assert first["points"] == 100 and first["names"] == ["Cachetest Alpha"]
+
+        db.update_customer_points(TEST_MOBILE, 250)
+        second = step()
+        assert second["points"] == 250 and second["names"] == ["Cachetest Alpha"]
+        assert second["misses"] == first["misses"] + 1  # Only the customer was reloaded
+
+        db.save_customer("Cachetest Gamma", TEST_MOBILE, "01/01/1980", None)
+        assert step()["names"] == ["Cachetest Gamma"]
+    finally:
+        till.stdin.close()
+        till.wait(timeout=10)
+    assert till.returncode == 0
+    db.close()
+
+if __name__ == "__main__":
+    test_invalidation_rules()
+    test_change_reaches_other_process()
+    print("\nCustomer cache test completed!")
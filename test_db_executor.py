@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for the database worker thread: delivery on the UI thread, errors, timeouts and late results
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_executor import DatabaseExecutor, DatabaseTimeoutError
+
+class FakeRoot:
+    """Stands in for the Tk root: after() callbacks run when the test says so"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, delay_ms, function):
+        self.callbacks.append(function)
+
+    def run_until(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "Timed out waiting for delivery"
+            callbacks, self.callbacks = self.callbacks, []
+            for function in callbacks:
+                function()
+            time.sleep(0.005)
+
+def test_results_and_errors():
+    """Results and exceptions reach their callbacks, and busy follows the pending calls"""
+    root = FakeRoot()
+    busy = []
+    executor = DatabaseExecutor(root, on_busy_change=busy.append)
+    outcomes = []
+
+    def fail():
+        raise ValueError("no such customer")
+
+    executor.call(lambda a, b: a + b, 2, 3, on_success=lambda result: outcomes.append(("ok", result)))
+    executor.call(fail, on_error=lambda error: outcomes.append(("error", str(error))))
+    assert executor.is_busy()
+    root.run_until(lambda: len(outcomes) == 2 and not executor.is_busy())
+    assert outcomes == [("ok", 5), ("error", "no such customer")]
+    assert busy == [True, False]
+    executor.shutdown()
+
+def test_timeouts():
+    """A queued call that times out never runs; a running one is reported and its late result delivered"""
+    root = FakeRoot()
+    executor = DatabaseExecutor(root)
+    release = threading.Event()
+    ran = []
+    outcomes = []
+
+    def slow_checkout():
+        release.wait(5)
+        ran.append("checkout")
+        return "invoice 1"
+
+    executor.call(slow_checkout, on_success=lambda result: outcomes.append(("ok", result)),
+                  on_error=lambda error: outcomes.append(("error", error)),
+                  on_timeout=lambda: outcomes.append(("still running", None)), timeout=0.05)
+    # Queued behind the checkout, so it has not started when its deadline passes
+    executor.call(lambda: ran.append("lookup"), on_error=lambda error: outcomes.append(("error", error)),
+                  timeout=0.05)
+
+    root.run_until(lambda: len(outcomes) == 2)
+    assert outcomes[0] == ("still running", None)
+    assert isinstance(outcomes[1][1], DatabaseTimeoutError)
+    assert executor.is_busy()
+
+    # The checkout commits late: its result is delivered, not dropped
+    release.set()
+    root.run_until(lambda: not executor.is_busy())
+    assert outcomes[2:] == [("ok", "invoice 1")]
+    executor.shutdown()
+    assert ran == ["checkout"]
+
+if __name__ == "__main__":
+    test_results_and_errors()
+    test_timeouts()
+    print("\nDatabase executor test completed!")
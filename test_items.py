@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test script for the items table: name interning and the backfill of item ids into existing lines
+"""
+
+import sys
+import os
+import tempfile
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from items import ItemIds
+from models import Database
+from partitions import archive_partitions
+from config import DB_CONFIG
+
+# A month far in the past so the test never touches real sales
+MONTH = date(2008, 1, 1)
+PARTITION = "invoice_items_p2008_01"
+
+def insert_invoice(db, created_at, items):
+    """Insert an invoice with a fixed date, its lines written by name as a till without item ids would"""
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, 0, %s, %s) RETURNING id
+    """, (100 * len(items), 100 * len(items), created_at))
+    invoice_id = db.cursor.fetchone()[0]
+    for name in items:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, 1, 100, 100, %s)
+        """, (invoice_id, name, created_at))
+    db.conn.commit()
+    return invoice_id
+
+def drop_test_month(db):
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2008, 2, 1), directory, drop=True)
+
+def line_items(db):
+    """(item_id, item_name, name from items) of every test line"""
+    db.cursor.execute(f"""
+        SELECT ii.item_id, ii.item_name, items.name FROM {PARTITION} ii
+        LEFT JOIN items ON items.id = ii.item_id ORDER BY ii.id
+    """)
+    rows = [tuple(row) for row in db.cursor.fetchall()]
+    db.conn.commit()
+    return rows
+
+def test_interning():
+    """Names get one id each, whether interned by the app or by a legacy insert"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_month(db)
+    db.ensure_invoice_partitions(MONTH, MONTH)
+
+    item_ids = ItemIds()
+    names = ["Items Test Tea", "Items Test Rice"]
+    assert item_ids.missing(names + names) == sorted(names)
+    found = item_ids.intern(db.cursor, names)
+    db.conn.commit()
+    item_ids.remember(found)
+    assert sorted(found) == sorted(names) and item_ids.missing(names) == [] and len(item_ids) == 2
+    assert ItemIds().intern(db.cursor, names) == found
+    db.conn.commit()
+
+    # The trigger turns a name into the same id and keeps no copy of the name
+    insert_invoice(db, datetime(2008, 1, 5, 12), ["Items Test Tea", "Items Test Salt"])
+    rows = line_items(db)
+    assert rows[0] == (found["Items Test Tea"], None, "Items Test Tea")
+    assert rows[1][1:] == (None, "Items Test Salt")
+
+    assert ItemIds.shared(db.conn.dsn) is db.item_ids
+    drop_test_month(db)
+    db.close()
+
+def test_backfill():
+    """Lines written before item ids existed are rewritten with ids, and reports read them by id"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_month(db)
+    db.ensure_invoice_partitions(MONTH, MONTH)
+
+    # Lines as they were before the items table: a name and no id
+    db.cursor.execute("ALTER TABLE invoice_items ALTER COLUMN item_id DROP NOT NULL")
+    db.cursor.execute(f"ALTER TABLE {PARTITION} DISABLE TRIGGER invoice_items_item_id")
+    db.conn.commit()
+    insert_invoice(db, datetime(2008, 1, 10, 12), ["Items Test Milk", "Items Test Bread"])
+    insert_invoice(db, datetime(2008, 1, 11, 12), ["Items Test Milk"])
+    assert [row[:2] for row in line_items(db)] == [(None, "Items Test Milk"), (None, "Items Test Bread"),
+                                                    (None, "Items Test Milk")]
+    assert not db.schema_is_current()
+    assert db.item_ids_pending(MONTH)
+
+    assert db.backfill_item_ids(MONTH) == 3
+    rows = line_items(db)
+    assert [name for _, _, name in rows] == ["Items Test Milk", "Items Test Bread", "Items Test Milk"]
+    assert rows[0][0] == rows[2][0] and all(item_name is None for _, item_name, _ in rows)
+    assert not db.item_ids_pending(MONTH)
+    assert db.backfill_item_ids(MONTH) == 0
+
+    # The other months only have item_id made NOT NULL again
+    assert db.backfill_item_ids() == 0
+    assert db.schema_is_current()
+
+    # The rewritten partition is attached with the trigger and reports read it
+    insert_invoice(db, datetime(2008, 1, 12, 12), ["Items Test Milk"])
+    assert line_items(db)[-1][1:] == (None, "Items Test Milk")
+    report = db.generate_sales_report("2008-01-01", "2008-01-31 23:59:59")
+    assert [(item["name"], item["quantity"]) for item in report["top_items"]] == [
+        ("Items Test Milk", 3), ("Items Test Bread", 1)
+    ]
+
+    drop_test_month(db)
+    db.close()
+
+if __name__ == "__main__":
+    test_interning()
+    test_backfill()
+    print("\nItems test completed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for local-first checkout: SQLite journal and background sync
+"""
+
+import sys
+import os
+import tempfile
+import uuid
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine
+from db_pool import DatabasePool
+from local_journal import CheckoutJournal, JournalSyncer
+from models import Database
+from config import DB_CONFIG
+
+TEST_MOBILE = "9000000037"
+# Nothing listens here: stands in for a server that is down
+UNREACHABLE = "host=localhost port=1 connect_timeout=1"
+
+def invoices_with_keys(db, keys):
+    db.cursor.execute("SELECT COUNT(*) FROM invoices WHERE invoice_key = ANY(%s)", (keys,))
+    count = db.cursor.fetchone()[0]
+    db.conn.commit()
+    return count
+
+def test_checkout_while_offline():
+    """Checkouts succeed against the journal and are replayed exactly once"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    db.save_customer("Journal Test", TEST_MOBILE, "", "")
+    starting_points = db.get_customer_by_mobile(TEST_MOBILE)["points"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = CheckoutJournal(os.path.join(directory, "journal.db"))
+        CheckoutEngine(db, journal=journal).lookup_customer(TEST_MOBILE)
+
+        # The server goes away: the till prices from the cached customer
+        engine = CheckoutEngine(DatabasePool(UNREACHABLE, max_connections=1), journal=journal)
+        keys, earned = [], 0
+        for _ in range(3):
+            session = engine.open_session()
+            session.set_customer("Journal Test", TEST_MOBILE)
+            session.add_item("Milk", 2, 60)
+            session.add_item("Bread", 1, 40)
+            invoice = session.checkout()
+            keys.append(invoice["invoice_key"])
+            earned += invoice["points_earned"]
+        assert earned > 0
+        batch = journal.pending()
+        assert [checkout["invoice_key"] for checkout in batch] == keys
+
+        offline = JournalSyncer(journal, UNREACHABLE)
+        try:
+            offline.sync_once()
+            assert False, "expected ConnectionError"
+        except ConnectionError as e:
+            print(f"  offline: {e}")
+        status = journal.status()
+        assert status["pending"] == 3 and status["last_error"]
+
+        # The server is back
+        syncer = JournalSyncer(journal, DB_CONFIG)
+        assert syncer.sync_once() == 3
+        assert journal.status() == {"pending": 0, "lag_seconds": 0.0, "last_error": None, "parked": 0}
+        assert invoices_with_keys(db, keys) == 3
+        points = db.get_customer_by_mobile(TEST_MOBILE)["points"]
+        assert points == starting_points + earned
+
+        # Replaying a batch the server already has changes nothing
+        assert syncer.db.replay_checkouts(batch) == 0
+        assert invoices_with_keys(db, keys) == 3
+        assert db.get_customer_by_mobile(TEST_MOBILE)["points"] == points
+
+        syncer.db.close()
+        journal.close()
+    db.close()
+
+def journal_checkout(subtotal=100):
+    """A walk-in checkout as the engine journals it"""
+    return {
+        "invoice_key": uuid.uuid4().hex,
+        "created_at": datetime.now().isoformat(sep=" "),
+        "customer_mobile": None,
+        "subtotal": subtotal,
+        "discount": 0,
+        "final": subtotal,
+        "items": [{"name": "Journal Test Tea", "quantity": 1, "price": subtotal, "total": subtotal}],
+        "bill_content": None,
+        "points_earned": 0
+    }
+
+def test_rejected_checkout_is_parked():
+    """A checkout the server rejects does not hold up the ones behind it, and is parked after max_attempts"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+
+    with tempfile.TemporaryDirectory() as directory:
+        journal = CheckoutJournal(os.path.join(directory, "journal.db"))
+        checkouts = [journal_checkout(), journal_checkout("not a number"), journal_checkout()]
+        for checkout in checkouts:
+            journal.record(checkout)
+        good = [checkouts[0]["invoice_key"], checkouts[2]["invoice_key"]]
+        bad = checkouts[1]["invoice_key"]
+
+        syncer = JournalSyncer(journal, DB_CONFIG, max_attempts=2)
+        assert syncer.sync_once() == 2
+        assert invoices_with_keys(db, good) == 2
+        status = journal.status()
+        assert status["pending"] == 1 and status["parked"] == 0 and status["last_error"]
+
+        # Rejected again: parked, and no longer pending
+        assert syncer.sync_once() == 0
+        status = journal.status()
+        assert status["pending"] == 0 and status["parked"] == 1
+        assert [(key, attempts) for key, _, attempts, _ in journal.parked()] == [(bad, 2)]
+
+        journal.unpark([bad])
+        assert [checkout["invoice_key"] for checkout in journal.pending()] == [bad]
+        assert invoices_with_keys(db, [bad]) == 0
+
+        syncer.db.close()
+        journal.close()
+    db.close()
+
+if __name__ == "__main__":
+    test_checkout_while_offline()
+    test_rejected_checkout_is_parked()
+    print("\nLocal journal test completed!")
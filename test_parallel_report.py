@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the date-sharded parallel sales report
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_pool import DatabasePool
+from models import Database
+from partitions import archive_partitions
+from parallel_report import date_shards, generate_sales_report_parallel, merge_top_items
+from config import DB_CONFIG
+
+# Months far in the past so the test never touches real sales
+MONTHS = [date(2005, 1, 1), date(2005, 2, 1), date(2005, 3, 1)]
+
+class CountingSlots:
+    """A semaphore that records the most holders it had at once"""
+
+    def __init__(self, value):
+        self.semaphore = threading.BoundedSemaphore(value)
+        self.lock = threading.Lock()
+        self.held = self.most_held = 0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self.lock:
+            self.held += 1
+            self.most_held = max(self.most_held, self.held)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.held -= 1
+        self.semaphore.release()
+
+def insert_invoice(db, created_at, items, discount=0):
+    """Insert an invoice with a fixed date; items are (name, quantity, price)"""
+    total = sum(quantity * price for _, quantity, price in items)
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, %s, %s, %s) RETURNING id
+    """, (total, discount, total - discount, created_at))
+    invoice_id = db.cursor.fetchone()[0]
+    for name, quantity, price in items:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (invoice_id, name, quantity, price, quantity * price, created_at))
+    db.conn.commit()
+
+def drop_test_months(db):
+    """Remove the test months' partitions"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2005, 4, 1), directory, drop=True)
+
+def test_merge_is_exact():
+    """An item that leads no shard can still lead the whole range"""
+    shards = [
+        [("A", 10, 100), ("B", 9, 90), ("Steady", 8, 80)],
+        [("C", 10, 100), ("D", 9, 90), ("Steady", 8, 80)],
+        [("E", 10, 100), ("F", 9, 90), ("Steady", 8, 80)]
+    ]
+    assert merge_top_items(shards, top=2) == [
+        {"name": "Steady", "quantity": 24, "sales": 240},
+        {"name": "A", "quantity": 10, "sales": 100}
+    ]
+
+def test_shards_cover_range():
+    """Shards are contiguous and end exactly at the end of the range"""
+    start, end = datetime(2005, 1, 1), datetime(2005, 3, 31, 23, 59, 59)
+    shards = date_shards(start, end, 4)
+    assert shards[0][0] == start and shards[-1][1] == end
+    assert all(a[1] == b[0] for a, b in zip(shards, shards[1:]))
+    assert [last for _, _, last in shards] == [False, False, False, True]
+
+def test_parallel_matches_single_query():
+    """Sharded and single-query reports agree, including on the range boundaries"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_months(db)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+
+    insert_invoice(db, datetime(2005, 1, 1), [("Steady", 3, 10), ("Jan Rush", 9, 10)])
+    insert_invoice(db, datetime(2005, 2, 10, 8), [("Steady", 3, 10), ("Feb Rush", 8, 10)], discount=5)
+    insert_invoice(db, datetime(2005, 3, 20, 19), [("Steady", 4, 10), ("Mar Rush", 7, 10)])
+    insert_invoice(db, datetime(2005, 3, 31, 23, 59, 59), [("Steady", 1, 10)])
+    insert_invoice(db, datetime(2005, 3, 31, 23, 59, 59, 500000), [("Too Late", 50, 10)])
+
+    start, end = "2005-01-01", "2005-03-31 23:59:59"
+    expected = db.generate_sales_report(start, end)
+    pool = DatabasePool(DB_CONFIG, max_connections=4)
+    try:
+        for shards in (2, 3, 7):
+            report = generate_sales_report_parallel(pool, start, end, shards=shards, min_days=0)
+            assert report.pop("shards") == shards
+            assert report == expected
+        # Reports sharing slots run no more shard queries at once than there are slots
+        slots = CountingSlots(2)
+        report = generate_sales_report_parallel(pool, start, end, shards=7, min_days=0, slots=slots)
+        assert report.pop("shards") == 7 and report == expected
+        assert 1 <= slots.most_held <= 2
+        assert expected["invoice_count"] == 4
+        assert [item["name"] for item in expected["top_items"]][:2] == ["Steady", "Jan Rush"]
+
+        # Short ranges run the single-query report
+        report = generate_sales_report_parallel(pool, "2005-02-01", "2005-02-28", shards=4)
+        assert report["shards"] == 1 and report["invoice_count"] == 1
+    finally:
+        pool.close()
+
+    drop_test_months(db)
+    db.close()
+
+if __name__ == "__main__":
+    test_merge_is_exact()
+    test_shards_cover_range()
+    test_parallel_matches_single_query()
+    print("\nParallel report test completed!")
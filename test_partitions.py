@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for monthly invoice partitions: pruning and archiving
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database
+from partitions import archive_partitions, explain_sales_report, scanned_partitions
+from config import DB_CONFIG
+
+# Months far in the past so the test never touches real sales
+MONTHS = [date(2001, 1, 1), date(2001, 2, 1), date(2001, 3, 1)]
+
+def insert_invoice(db, created_at, items):
+    """Insert an invoice with a fixed date and its items"""
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, 0, %s, %s) RETURNING id
+    """, (100 * len(items), 100 * len(items), created_at))
+    invoice_id = db.cursor.fetchone()[0]
+    for name in items:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, 1, 100, 100, %s)
+        """, (invoice_id, name, created_at))
+    db.conn.commit()
+    return invoice_id
+
+def drop_test_months(db):
+    """Remove the test months' partitions"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2001, 4, 1), directory, drop=True)
+
+def test_report_prunes_partitions():
+    """A one-month report reads only that month's partitions"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_months(db)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+
+    for month in MONTHS:
+        insert_invoice(db, datetime(month.year, month.month, 15, 12), ["Milk", "Bread"])
+
+    report = db.generate_sales_report("2001-02-01", "2001-02-28 23:59:59")
+    assert report["invoice_count"] == 1
+    assert {item["name"] for item in report["top_items"]} == {"Milk", "Bread"}
+
+    summary_plan, items_plan = explain_sales_report(db, "2001-02-01", "2001-02-28 23:59:59")
+    print(summary_plan)
+    print(items_plan)
+    assert scanned_partitions(summary_plan) == ["invoices_p2001_02"]
+    assert scanned_partitions(items_plan) == ["invoice_items_p2001_02"]
+
+    drop_test_months(db)
+    db.close()
+
+def test_archive_old_partitions():
+    """Archiving detaches and exports old months and leaves newer ones attached"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_months(db)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+    invoice_id = insert_invoice(db, datetime(2001, 1, 20), ["Eggs", "Rice", "Tea"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = archive_partitions(db, date(2001, 3, 1), directory, drop=True)
+        names = sorted(os.path.basename(path) for path in paths)
+        assert "invoices_p2001_01.csv.gz" in names and "invoice_items_p2001_02.csv.gz" in names
+
+        with gzip.open(os.path.join(directory, "invoice_items_p2001_01.csv.gz"), "rt") as f:
+            rows = [line for line in f.read().splitlines()[1:] if line.split(",")[1] == str(invoice_id)]
+        assert sorted(row.split(",")[2] for row in rows) == ["Eggs", "Rice", "Tea"]
+
+    months = {p["month"] for p in db.get_invoice_partitions()}
+    assert date(2001, 1, 1) not in months and date(2001, 2, 1) not in months
+    assert date(2001, 3, 1) in months
+
+    drop_test_months(db)
+    db.close()
+
+if __name__ == "__main__":
+    test_report_prunes_partitions()
+    test_archive_old_partitions()
+    print("\nPartition test completed!")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for in-memory PDF invoices: document structure, pagination and batch rendering
+"""
+
+import sys
+import os
+import re
+import tempfile
+import zlib
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database
+from partitions import archive_partitions
+from pdf_invoice import render_batch, render_invoice_pdf
+from config import DB_CONFIG
+
+# Months far in the past so the test never touches real sales
+MONTHS = [date(2004, 1, 1)]
+
+def make_invoice(invoice_id, items):
+    """An invoice in CheckoutEngine's format; items are (name, quantity, price)"""
+    subtotal = sum(quantity * price for _, quantity, price in items)
+    return {
+        "id": invoice_id,
+        "date": "2004-01-10 12:00:00",
+        "customer_name": "Pdf (Test)",
+        "customer_mobile": "9000000042",
+        "subtotal": subtotal,
+        "discount": subtotal * 0.05,
+        "total": subtotal * 0.95,
+        "items": [
+            {"name": name, "quantity": quantity, "price": price, "total": quantity * price}
+            for name, quantity, price in items
+        ],
+        "reward_tier_applied": "Bronze"
+    }
+
+def page_text(pdf):
+    """Decompressed content streams of a PDF, one per page"""
+    streams = re.findall(rb"/FlateDecode >>\nstream\n(.*?)\nendstream", pdf, re.S)
+    return [zlib.decompress(stream).decode("cp1252") for stream in streams]
+
+def check_structure(pdf):
+    """Header, trailer and every cross-reference offset point where they should"""
+    assert pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n")
+    xref = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+    assert pdf[xref:xref + 4] == b"xref"
+    offsets = re.findall(rb"(\d{10}) 00000 n", pdf[xref:])
+    for number, offset in enumerate(offsets, 1):
+        assert pdf[int(offset):].startswith(b"%d 0 obj" % number)
+
+def test_render_invoice():
+    """An invoice renders to a valid document with its lines and totals, paginated when long"""
+    pdf = render_invoice_pdf(make_invoice(7, [("Milk", 2, 50), ("Bread (Brown)", 1, 40)]))
+    check_structure(pdf)
+    [text] = page_text(pdf)
+    assert r"(Customer: Pdf \(Test\))" in text and "(Reward Tier: Bronze)" in text
+    assert r"(Bread \(Brown\))" in text and "(Rs. 100.00)" in text
+    assert "(Rs. -7.00)" in text and "(Rs. 133.00)" in text
+
+    long_pdf = render_invoice_pdf(make_invoice(8, [(f"Item {n}", 1, 10) for n in range(120)]))
+    check_structure(long_pdf)
+    pages = page_text(long_pdf)
+    assert b"/Count %d" % len(pages) in long_pdf and len(pages) >= 3
+    assert all("(Qty)" in text for text in pages)
+    assert "(Item 119)" in pages[-1] and "(Rs. 1140.00)" in pages[-1]
+
+def test_batch_matches_single():
+    """The process pool renders the same documents, in order"""
+    invoices = [make_invoice(n, [("Tea", n % 5 + 1, 100)]) for n in range(1, 301)]
+    rendered = list(render_batch(invoices, workers=2, chunksize=16))
+    assert [invoice_id for invoice_id, _ in rendered] == list(range(1, 301))
+    assert all(pdf == render_invoice_pdf(invoice) for (_, pdf), invoice in zip(rendered, invoices))
+
+def test_invoice_documents_from_database():
+    """Stored invoices of a date range come back ready to render"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2004, 2, 1), directory, drop=True)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+
+    created_at = datetime(2004, 1, 10, 12)
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (140, 7, 133, %s) RETURNING id
+    """, (created_at,))
+    invoice_id = db.cursor.fetchone()[0]
+    for name, quantity, price in (("Milk", 2, 50), ("Bread", 1, 40)):
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (invoice_id, name, quantity, price, quantity * price, created_at))
+    db.conn.commit()
+
+    [invoice] = db.get_invoice_documents(date(2004, 1, 10), date(2004, 1, 10))
+    assert invoice["id"] == invoice_id and invoice["reward_tier_applied"] == "Bronze"
+    assert [item["name"] for item in invoice["items"]] == ["Milk", "Bread"]
+    assert db.get_invoice_documents(date(2004, 1, 11), date(2004, 1, 31)) == []
+    [text] = page_text(render_invoice_pdf(invoice))
+    assert "(Rs. 133.00)" in text
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2004, 2, 1), directory, drop=True)
+    db.close()
+
+if __name__ == "__main__":
+    test_render_invoice()
+    test_batch_matches_single()
+    test_invoice_documents_from_database()
+    print("\nPDF invoice test completed!")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test script for prepared statements: re-prepared after the server drops them
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from psycopg2 import errors
+
+from models import Database
+from config import DB_CONFIG
+
+TEST_MOBILE = "9000000031"
+
+def discard_all(db):
+    """Drop the session's prepared statements, as a pooler does between clients"""
+    db.conn.commit()
+    db.conn.autocommit = True
+    db.cursor.execute("DISCARD ALL")
+    db.conn.autocommit = False
+
+def test_reprepare_after_discard():
+    """Statements dropped by DISCARD ALL are prepared again instead of failing the call"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    assert db.save_customer("Prepared Test", TEST_MOBILE, "01/01/1990")
+    assert db.get_customer_by_mobile(TEST_MOBILE)["name"] == "Prepared Test"
+    assert "customer_by_mobile" in db._prepared
+
+    discard_all(db)
+    assert db.get_customer_by_mobile(TEST_MOBILE)["name"] == "Prepared Test"
+    discard_all(db)
+    assert db.save_customer("Prepared Test", TEST_MOBILE, "02/01/1990")
+    assert db.get_customer_by_mobile(TEST_MOBILE)["dob"] == "02/01/1990"
+
+    # Later in a transaction the statements before it are already lost, so the error reaches the caller
+    db.execute_prepared("customer_id_by_mobile", (TEST_MOBILE,))
+    discard_all(db)
+    db.cursor.execute("SELECT 1")
+    try:
+        db.execute_prepared("customer_id_by_mobile", (TEST_MOBILE,))
+        raise AssertionError("A statement lost mid-transaction was retried")
+    except errors.InvalidSqlStatementName:
+        pass
+    assert "customer_id_by_mobile" not in db._prepared
+    assert db.get_customer_by_mobile(TEST_MOBILE)["name"] == "Prepared Test"
+    db.close()
+
+if __name__ == "__main__":
+    test_reprepare_after_discard()
+    print("\nPrepared statements test completed!")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for routing reads to a streaming replica
+
+Needs a standby of the primary in DB_CONFIG, listed in config.py, e.g.:
+    DB_REPLICAS = ["host=localhost port=5433 dbname=shopping_cart user=postgres"]
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import config
+from db_metrics import QueryMetrics
+from models import Database
+from config import DB_CONFIG
+
+DB_REPLICAS = getattr(config, "DB_REPLICAS", None)
+TEST_MOBILE = "9000000034"
+
+requires_replica = pytest.mark.skipif(not DB_REPLICAS, reason="DB_REPLICAS is not configured")
+
+def routes(metrics):
+    """Routing counters as {(kind, target, reason): calls}"""
+    return {(r["kind"], r["target"], r["reason"]): r["calls"] for r in metrics.snapshot()["routes"]}
+
+def replica_sql(query, params=None):
+    """Run a statement directly on the first replica; returns its first row, if any"""
+    replica = Database(DB_REPLICAS[0])
+    replica.conn.autocommit = True
+    replica.cursor.execute(query, params)
+    row = replica.cursor.fetchone() if replica.cursor.description else None
+    replica.close()
+    return row
+
+def wait_for_receiver(streaming, timeout=30):
+    """Wait until the replica's WAL receiver is (or is no longer) streaming"""
+    deadline = time.monotonic() + timeout
+    while replica_sql("SELECT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')")[0] != streaming:
+        assert time.monotonic() < deadline, "The replica's WAL receiver did not change state"
+        time.sleep(0.2)
+
+@requires_replica
+def test_read_write_split():
+    """Reads go to a fresh replica, writes and read-your-writes to the primary"""
+    writer = Database(DB_CONFIG, replicas=DB_REPLICAS, metrics=QueryMetrics())
+    writer.setup_database()
+    writer.save_customer("Replica Reader", TEST_MOBILE, "01/01/1990", None)
+
+    # This connection just wrote, so its reads stay on the primary
+    assert writer.get_customer_by_mobile(TEST_MOBILE)["name"] == "Replica Reader"
+    assert routes(writer.metrics)[("read", "primary", "recent_write")] == 1
+    assert routes(writer.metrics)[("write", "primary", "write")] == 2
+
+    # Another lane reads from the replica once it has replayed the write
+    time.sleep(0.5)
+    metrics = QueryMetrics()
+    reader = Database(DB_CONFIG, replicas=DB_REPLICAS, metrics=metrics)
+    assert reader.get_customer_by_mobile(TEST_MOBILE)["name"] == "Replica Reader"
+    assert reader.search_customers_by_mobile(TEST_MOBILE) == [TEST_MOBILE]
+    assert routes(metrics) == {("read", "replica", "fresh"): 2}
+
+    print(f"  routes: {routes(metrics)}")
+    reader.close()
+    writer.close()
+
+@requires_replica
+def test_stale_replica_falls_back():
+    """A replica lagging more than the bound is skipped"""
+    metrics = QueryMetrics()
+    reader = Database(DB_CONFIG, replicas=DB_REPLICAS, metrics=metrics, max_replica_lag=0.2)
+    reader.router.check_interval = 0
+
+    replica_sql("SELECT pg_wal_replay_pause()")
+    try:
+        writer = Database(DB_CONFIG)
+        writer.update_customer_points(TEST_MOBILE, 123)
+        writer.close()
+        time.sleep(0.5)
+
+        assert reader.get_customer_by_mobile(TEST_MOBILE)["points"] == 123
+        assert routes(metrics) == {("read", "primary", "stale"): 1}
+    finally:
+        replica_sql("SELECT pg_wal_replay_resume()")
+
+    time.sleep(0.5)
+    assert reader.get_customer_by_mobile(TEST_MOBILE)["points"] == 123
+    assert routes(metrics)[("read", "replica", "fresh")] == 1
+    reader.close()
+
+@requires_replica
+def test_disconnected_replica_is_stale():
+    """A replica that has replayed all it received but lost its primary is not taken as fresh"""
+    conninfo = replica_sql("SHOW primary_conninfo")[0]
+    metrics = QueryMetrics()
+    reader = Database(DB_CONFIG, replicas=DB_REPLICAS, metrics=metrics, max_replica_lag=0.2)
+    reader.router.check_interval = 0
+
+    replica_sql("ALTER SYSTEM SET primary_conninfo = ''")
+    replica_sql("SELECT pg_reload_conf()")
+    try:
+        wait_for_receiver(False)
+        writer = Database(DB_CONFIG)
+        writer.update_customer_points(TEST_MOBILE, 456)
+        writer.close()
+        time.sleep(0.5)
+
+        assert reader.get_customer_by_mobile(TEST_MOBILE)["points"] == 456
+        assert routes(metrics) == {("read", "primary", "stale"): 1}
+    finally:
+        replica_sql("ALTER SYSTEM SET primary_conninfo = %s", (conninfo,))
+        replica_sql("SELECT pg_reload_conf()")
+        wait_for_receiver(True)
+    reader.close()
+
+def test_unreachable_replica_falls_back():
+    """Reads use the primary when no replica can be reached"""
+    metrics = QueryMetrics()
+    reader = Database(DB_CONFIG, replicas=["host=localhost port=1 connect_timeout=1"], metrics=metrics)
+
+    reader.get_customer_by_mobile(TEST_MOBILE)
+    reader.get_customer_by_mobile(TEST_MOBILE)
+    assert routes(metrics) == {("read", "primary", "unavailable"): 2}
+    reader.close()
+
+if __name__ == "__main__":
+    if DB_REPLICAS:
+        test_read_write_split()
+        test_stale_replica_falls_back()
+        test_disconnected_replica_is_stale()
+    test_unreachable_replica_falls_back()
+    print("\nReplica routing test completed!")
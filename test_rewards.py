@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for atomic reward points accrual under concurrent checkouts
+"""
+
+import sys
+import os
+import threading
+import numpy as np
+from psycopg2 import extensions
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine
+from db_pool import DatabasePool
+from models import Database
+from points_rollup import PointsRollup
+from tier_recompute import compute_tiers, recompute_tiers
+from utils import RewardSystem
+from config import DB_CONFIG
+
+TEST_MOBILE = "9000000032"
+
+def expected_balance(start_points, subtotals):
+    """Balance after applying the purchases one at a time"""
+    points = start_points
+    for subtotal in subtotals:
+        discount = subtotal * RewardSystem.get_discount_percentage(RewardSystem.get_reward_tier(points))
+        points += RewardSystem.calculate_points(subtotal - discount)
+    return points
+
+def test_parallel_checkouts_same_customer():
+    """Parallel lanes checking out the same family must not lose points"""
+    pool = DatabasePool(DB_CONFIG, max_connections=8)
+    pool.setup_database()
+    pool.save_customer("Family Account", TEST_MOBILE, "01/01/1980", None)
+    pool.update_customer_points(TEST_MOBILE, 0)
+
+    engine = CheckoutEngine(pool)
+    checkouts = 40
+    subtotal = 1000
+    barrier = threading.Barrier(8)
+    errors = []
+
+    print("Testing parallel checkouts for one customer...\n")
+
+    def lane(count):
+        try:
+            barrier.wait()
+            for _ in range(count):
+                session = engine.open_session()
+                session.set_customer("Family Account", TEST_MOBILE)
+                session.add_item("Groceries", 1, subtotal)
+                invoice = session.checkout()
+                assert invoice["points_earned"] > 0
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=lane, args=(checkouts // 8,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+
+    balance = pool.get_customer_by_mobile(TEST_MOBILE)["points"]
+    expected = expected_balance(0, [subtotal] * checkouts)
+    print(f"  balance after {checkouts} parallel checkouts: {balance} (expected {expected})")
+    assert balance == expected
+
+    earned = sum(invoice["points_earned"] for invoice in engine.invoices.values())
+    assert earned == expected
+
+    pool.close()
+    print("\nRewards test completed!")
+
+def test_rollup_during_checkouts():
+    """Folding the ledger while lanes check out must not change any balance"""
+    pool = DatabasePool(DB_CONFIG, max_connections=5)
+    pool.setup_database()
+    pool.save_customer("Family Account", TEST_MOBILE, "01/01/1980", None)
+    pool.update_customer_points(TEST_MOBILE, 450)
+
+    engine = CheckoutEngine(pool)
+    rollup = PointsRollup(pool, interval=0.005, batch_size=3)
+    checkouts = 24
+    subtotal = 700
+
+    print("Testing ledger rollup during checkouts...\n")
+
+    def lane(count):
+        for _ in range(count):
+            session = engine.open_session()
+            session.set_customer("Family Account", TEST_MOBILE)
+            session.add_item("Groceries", 1, subtotal)
+            session.checkout()
+
+    rollup.start()
+    threads = [threading.Thread(target=lane, args=(checkouts // 4,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rollup.stop()
+    rollup.run_once()
+
+    expected = expected_balance(450, [subtotal] * checkouts)
+    balance = pool.get_customer_by_mobile(TEST_MOBILE)["points"]
+    print(f"  balance after rollup: {balance} (expected {expected})")
+    assert balance == expected
+
+    history = pool.get_points_history(TEST_MOBILE, limit=checkouts)
+    assert all(entry["folded"] and entry["reason"] == "purchase" for entry in history)
+    assert sum(entry["delta"] for entry in history) == expected - 450
+
+    pool.close()
+
+def test_recompute_tiers():
+    """The vectorized tiers match RewardSystem and are stored for changed customers only"""
+    tiers = sorted(RewardSystem.TIERS, key=lambda tier: tier[1])
+    balances = np.arange(-10, 2000, dtype=np.int32)
+    codes = compute_tiers(balances, np.array([minimum for _, minimum, _ in tiers]))
+    assert [tiers[code - 1][0] for code in codes] == [RewardSystem.get_reward_tier(int(b)) for b in balances]
+    for minimums in ([], [500, 0, 1000]):
+        try:
+            compute_tiers(balances, np.array(minimums))
+            raise AssertionError(f"Tier minimums {minimums} were accepted")
+        except ValueError:
+            pass
+
+    pool = DatabasePool(DB_CONFIG, max_connections=1)
+    pool.setup_database()
+    pool.save_customer("Family Account", TEST_MOBILE, "01/01/1980", None)
+
+    with pool.connection() as db:
+        db.cursor.execute("UPDATE customers SET tier = NULL WHERE mobile = %s", (TEST_MOBILE,))
+        db.conn.commit()
+        for points, tier in ((1200, "Gold"), (600, "Silver")):
+            db.update_customer_points(TEST_MOBILE, points)
+            stats = recompute_tiers(db)
+            assert stats["changed"] >= 1
+            db.cursor.execute("SELECT tier FROM customers WHERE mobile = %s", (TEST_MOBILE,))
+            assert db.cursor.fetchone()[0] == tier
+            db.conn.commit()
+
+        # Nothing changed since the last run
+        assert recompute_tiers(db)["changed"] == 0
+        # Every page was committed and the recompute lock released
+        assert db.conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        other = Database(DB_CONFIG)
+        other.cursor.execute("SELECT pg_try_advisory_lock(hashtext('reward_tier_recompute'))")
+        assert other.cursor.fetchone()[0]
+        other.close()
+        distribution = {row["tier"]: row["customers"] for row in db.get_tier_distribution()}
+        assert sum(distribution.values()) == stats["customers"]
+        print(f"  tier distribution: {distribution}")
+
+    pool.close()
+
+if __name__ == "__main__":
+    test_parallel_checkouts_same_customer()
+    test_rollup_during_checkouts()
+    test_recompute_tiers()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the live dashboard's sales counters and their reconciliation with the server
+"""
+
+import sys
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine
+from db_pool import DatabasePool
+from models import Database
+from partitions import archive_partitions
+from sales_counters import SalesCounters
+from config import DB_CONFIG
+
+# A day far in the past so the test never touches real sales
+NOW = datetime(2007, 1, 10, 14, 30)
+
+def insert_invoice(db, created_at, subtotal, discount, invoice_key=None):
+    db.cursor.execute("""
+        INSERT INTO invoices (invoice_key, total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (invoice_key, subtotal, discount, subtotal - discount, created_at))
+    db.conn.commit()
+
+def drop_test_month(db):
+    """Remove the test month's partitions"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2007, 2, 1), directory, drop=True)
+
+def test_counters_roll_over():
+    """Checkouts count towards the current hour and day only"""
+    counters = SalesCounters()
+    counters.record({"subtotal": 100, "discount": 10, "total": 90}, NOW - timedelta(hours=1))
+    counters.record({"subtotal": 50, "discount": 0, "total": 50}, NOW)
+
+    snapshot = counters.snapshot(NOW)
+    assert snapshot["today"]["invoices"] == 2 and snapshot["today"]["net"] == Decimal(140)
+    assert snapshot["hour"]["invoices"] == 1 and snapshot["hour"]["gross"] == Decimal(50)
+    assert snapshot["today"]["average_basket"] == Decimal(70)
+
+    snapshot = counters.snapshot(NOW + timedelta(days=1))
+    assert snapshot["today"]["invoices"] == 0 and snapshot["today"]["average_basket"] == 0
+
+def test_reconcile_with_server():
+    """Reconciling counts other tills' sales once and keeps checkouts the server has not seen yet"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_month(db)
+    db.ensure_invoice_partitions(date(2007, 1, 1), date(2007, 1, 1))
+
+    counters = SalesCounters()
+    # Replayed to the server already, still in the journal, and another till's sale
+    counters.record({"invoice_key": "dash-synced", "subtotal": 100, "discount": 10, "total": 90}, NOW)
+    counters.record({"invoice_key": "dash-pending", "subtotal": 40, "discount": 0, "total": 40}, NOW)
+    insert_invoice(db, NOW, 100, 10, "dash-synced")
+    insert_invoice(db, NOW - timedelta(hours=3), 200, 20)
+    insert_invoice(db, NOW - timedelta(days=1), 999, 0)
+
+    assert counters.reconcile(db, NOW)
+    snapshot = counters.snapshot(NOW)
+    assert snapshot["today"]["invoices"] == 3
+    assert snapshot["today"]["gross"] == Decimal(340) and snapshot["today"]["discount"] == Decimal(30)
+    assert snapshot["hour"]["invoices"] == 2 and snapshot["hour"]["net"] == Decimal(130)
+    assert list(counters.pending) == ["dash-pending"]
+
+    # Once the journal entry is replayed it is counted from the server only
+    insert_invoice(db, NOW, 40, 0, "dash-pending")
+    assert counters.reconcile(db, NOW)
+    assert counters.snapshot(NOW) == snapshot and not counters.pending
+
+    drop_test_month(db)
+    db.close()
+
+def test_checkout_updates_counters():
+    """Every checkout is counted as it is recorded"""
+    pool = DatabasePool(DB_CONFIG, max_connections=2)
+    pool.setup_database()
+    counters = SalesCounters()
+    engine = CheckoutEngine(pool, sales_counters=counters)
+    for price in (10, 30):
+        session = engine.open_session()
+        session.add_item("Dashboard Tea", 2, price)
+        session.checkout()
+
+    snapshot = counters.snapshot()
+    assert snapshot["hour"]["invoices"] == snapshot["today"]["invoices"] == 2
+    assert snapshot["today"]["gross"] == Decimal(80) and snapshot["today"]["average_basket"] == Decimal(40)
+    pool.close()
+
+if __name__ == "__main__":
+    test_counters_roll_over()
+    test_reconcile_with_server()
+    test_checkout_updates_counters()
+    print("\nSales counters test completed!")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-memory sales cube: group-bys, filters and incremental refresh
+"""
+
+import sys
+import os
+import tempfile
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database
+from partitions import archive_partitions
+from sales_cube import SalesCube
+from config import DB_CONFIG
+
+# Months far in the past so the test never touches real sales
+MONTHS = [date(2002, 1, 1), date(2002, 2, 1)]
+
+def insert_invoice(db, created_at, items, discount=0, commit=True):
+    """Insert an invoice with a fixed date; items are (name, quantity, price)"""
+    total = sum(quantity * price for _, quantity, price in items)
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, %s, %s, %s) RETURNING id
+    """, (total, discount, total - discount, created_at))
+    invoice_id = db.cursor.fetchone()[0]
+    for name, quantity, price in items:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (invoice_id, name, quantity, price, quantity * price, created_at))
+    if commit:
+        db.conn.commit()
+
+def drop_test_months(db):
+    """Remove the test months' partitions and the items only their lines use"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2002, 3, 1), directory, drop=True)
+    db.cursor.execute("DELETE FROM items WHERE name LIKE 'Cube Late %%'")
+    db.conn.commit()
+
+def test_cube_queries_and_refresh():
+    """The cube answers group-bys like SQL and picks up new lines on refresh"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_months(db)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+
+    insert_invoice(db, datetime(2002, 1, 7, 9, 30), [("Cube Milk", 2, 50), ("Cube Bread", 1, 40)])
+    insert_invoice(db, datetime(2002, 1, 8, 18, 5), [("Cube Milk", 1, 50)], discount=2.5)  # Bronze, 5%
+    insert_invoice(db, datetime(2002, 2, 3, 9, 45), [("Cube Tea", 3, 100)], discount=45)   # Gold, 15%
+
+    cube = SalesCube(db)
+    assert cube.refresh() >= 4
+    january = ("2002-01-01", "2002-01-31")
+
+    assert sorted(cube.query(("item",), *january), key=lambda row: row["item"]) == [
+        {"item": "Cube Bread", "lines": 1, "quantity": 1, "sales": 40.0},
+        {"item": "Cube Milk", "lines": 2, "quantity": 3, "sales": 150.0}
+    ]
+    assert cube.query(("hour",), "2002-01-01", "2002-02-28") == [
+        {"hour": 9, "lines": 3, "quantity": 6, "sales": 440.0},
+        {"hour": 18, "lines": 1, "quantity": 1, "sales": 50.0}
+    ]
+    assert cube.query(("tier", "month"), "2002-01-01", "2002-02-28", tiers=["Gold", "Bronze"]) == [
+        {"tier": "Bronze", "month": "2002-01", "lines": 1, "quantity": 1, "sales": 50.0},
+        {"tier": "Gold", "month": "2002-02", "lines": 1, "quantity": 3, "sales": 300.0}
+    ]
+    assert cube.query(("week",), *january, items=["Cube Milk"]) == [
+        {"week": date(2002, 1, 7), "lines": 2, "quantity": 3, "sales": 150.0}
+    ]
+    assert cube.query((), *january) == [{"lines": 3, "quantity": 4, "sales": 190.0}]
+    assert cube.query(("day",), *january, top=1) == [{"day": date(2002, 1, 7), "lines": 2, "quantity": 3, "sales": 140.0}]
+
+    # Only lines added since the last refresh are loaded
+    loaded = len(cube)
+    insert_invoice(db, datetime(2002, 1, 9, 12), [("Cube Bread", 4, 40)])
+    assert cube.refresh() == 1 and len(cube) == loaded + 1
+    assert cube.refresh() == 0
+    assert cube.query(("item",), *january, items=["Cube Bread"])[0]["quantity"] == 5
+
+    # A line that commits after a higher id has been loaded is still picked up
+    till = Database(DB_CONFIG)
+    insert_invoice(till, datetime(2002, 1, 10, 8), [("Cube Tea", 1, 100)], commit=False)
+    insert_invoice(db, datetime(2002, 1, 10, 9), [("Cube Tea", 2, 100)])
+    assert cube.refresh() == 1
+    till.conn.commit()
+    till.close()
+    assert cube.refresh() == 1 and cube.refresh() == 0
+    assert cube.query(("item",), *january, items=["Cube Tea"])[0]["quantity"] == 3
+
+    # So is a new item whose id commits after a higher one has been loaded
+    till = Database(DB_CONFIG)
+    insert_invoice(till, datetime(2002, 1, 11, 8), [("Cube Late Jam", 1, 60)], commit=False)
+    insert_invoice(db, datetime(2002, 1, 11, 9), [("Cube Late Soap", 1, 30)])
+    assert cube.refresh() == 1
+    till.conn.commit()
+    till.close()
+    assert cube.refresh() == 1
+    assert cube.query(("item",), *january, items=["Cube Late Jam", "Cube Late Soap"]) == [
+        {"item": "Cube Late Jam", "lines": 1, "quantity": 1, "sales": 60.0},
+        {"item": "Cube Late Soap", "lines": 1, "quantity": 1, "sales": 30.0}
+    ]
+
+    # The whole cube agrees with SQL
+    db.cursor.execute("SELECT items.name, COUNT(*), SUM(quantity), SUM(total) FROM invoice_items "
+                      "JOIN items ON items.id = invoice_items.item_id GROUP BY items.name")
+    expected = {name: (lines, quantity, float(total)) for name, lines, quantity, total in db.cursor.fetchall()}
+    db.conn.commit()
+    assert {row["item"]: (row["lines"], row["quantity"], row["sales"]) for row in cube.query(("item",))} == expected
+
+    drop_test_months(db)
+    db.close()
+
+if __name__ == "__main__":
+    test_cube_queries_and_refresh()
+    print("\nSales cube test completed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming CSV export of invoices, items and customers
+"""
+
+import sys
+import os
+import csv
+import gzip
+import tempfile
+from datetime import date, datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import Database
+from partitions import archive_partitions
+from sales_export import export_sales
+from config import DB_CONFIG
+
+# Months far in the past so the test never touches real sales
+MONTHS = [date(2003, 1, 1), date(2003, 2, 1)]
+TEST_MOBILE = "9000000041"
+
+def insert_invoice(db, created_at, items, customer_id=None):
+    """Insert an invoice with a fixed date and its items"""
+    db.cursor.execute("""
+        INSERT INTO invoices (customer_id, total_amount, discount_amount, final_amount, created_at)
+        VALUES (%s, %s, 0, %s, %s) RETURNING id
+    """, (customer_id, 100 * len(items), 100 * len(items), created_at))
+    invoice_id = db.cursor.fetchone()[0]
+    for name in items:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, 1, 100, 100, %s)
+        """, (invoice_id, name, created_at))
+    db.conn.commit()
+    return invoice_id
+
+def drop_test_months(db):
+    """Remove the test months' partitions"""
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2003, 3, 1), directory, drop=True)
+
+def read_csv(path):
+    with (gzip.open(path, "rt", newline="") if path.endswith(".gz") else open(path, newline="")) as f:
+        return list(csv.DictReader(f))
+
+def test_export_date_range():
+    """Only the range's invoices, their items and their customers are exported, plain or gzip"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    drop_test_months(db)
+    db.ensure_invoice_partitions(MONTHS[0], MONTHS[-1])
+
+    db.cursor.execute("DELETE FROM customers WHERE mobile = %s", (TEST_MOBILE,))
+    db.cursor.execute("""
+        INSERT INTO customers (name, mobile, email) VALUES ('Export, "Test"', %s, 'export@example.com')
+        RETURNING id
+    """, (TEST_MOBILE,))
+    customer_id = db.cursor.fetchone()[0]
+    db.conn.commit()
+
+    inside = insert_invoice(db, datetime(2003, 1, 31, 23, 59), ["Milk", "Bread"], customer_id)
+    insert_invoice(db, datetime(2003, 1, 15, 10), ["Tea"])
+    insert_invoice(db, datetime(2003, 2, 1, 0, 0), ["Rice"])  # The day after the range
+
+    with tempfile.TemporaryDirectory() as directory:
+        for compress in (False, True):
+            result = export_sales(DB_CONFIG, date(2003, 1, 1), date(2003, 1, 31), directory, compress=compress)
+            suffix = "_20030101_20030131.csv" + (".gz" if compress else "")
+
+            invoices = read_csv(os.path.join(directory, "invoices" + suffix))
+            items = read_csv(os.path.join(directory, "invoice_items" + suffix))
+            customers = read_csv(os.path.join(directory, "customers" + suffix))
+            assert len(invoices) == 2 and str(inside) in {row["id"] for row in invoices}
+            assert sorted(row["item_name"] for row in items) == ["Bread", "Milk", "Tea"]
+            assert [(row["name"], row["mobile"]) for row in customers] == [('Export, "Test"', TEST_MOBILE)]
+
+            assert {table: stats["rows"] for table, stats in result["tables"].items()} == {
+                "invoices": 2, "invoice_items": 3, "customers": 1
+            }
+            assert result["bytes"] > 0 and result["mb_per_sec"] > 0
+
+    drop_test_months(db)
+    db.cursor.execute("DELETE FROM customers WHERE mobile = %s", (TEST_MOBILE,))
+    db.conn.commit()
+    db.close()
+
+if __name__ == "__main__":
+    test_export_date_range()
+    print("\nSales export test completed!")
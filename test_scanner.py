@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for scanner input mode: scans told apart from typing, and cart redraws coalesced
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from catalog import ProductCatalog
+from checkout import CheckoutEngine
+from scanner import ScanBuffer, ScanInput
+
+def keys(text, start, gap):
+    """(key, time) pairs for text typed from start with gap ms between keys"""
+    return [(char, start + index * gap) for index, char in enumerate(text)]
+
+def feed(buffer, pairs):
+    results = []
+    for char, time_ms in pairs:
+        results += buffer.feed(char, time_ms)
+    return results
+
+def test_scans_and_typing():
+    """Fast bursts ending in Enter are scans; slow keys, short bursts and stalled scans are typing"""
+    buffer = ScanBuffer(max_gap_ms=30, min_length=4)
+    # Two codes back to back are not merged
+    assert feed(buffer, keys("8901234567890\n8901234567891\n", 0, 3)) == [
+        ("scan", "8901234567890"), ("scan", "8901234567891")
+    ]
+    # A word typed by hand comes back a key at a time
+    assert feed(buffer, keys("milk\n", 1000, 120)) == [("keys", "m"), ("keys", "i"), ("keys", "l"), ("keys", "k"),
+                                                       ("keys", "\n")]
+    # A scanner stall splits a code, so neither half is taken as a scan
+    stalled = keys("890123", 2000, 3) + keys("4567890\n", 2100, 3)
+    assert feed(buffer, stalled) == [("keys", "890123"), ("scan", "4567890")]
+    assert feed(buffer, keys("12\n", 3000, 3)) == [("keys", "12\n")]
+    assert feed(buffer, keys("abc", 4000, 3)) == [] and buffer.pending
+    assert buffer.flush() == [("keys", "abc")] and not buffer.pending
+
+def test_scan_input_coalesces_redraws():
+    """Scans go straight into the cart, and a burst of them is drawn in one frame"""
+    catalog = ProductCatalog()
+    catalog.apply([("TEST-048-1", "8900000000481", "Scanner Soap", 30.0),
+                   ("TEST-048-2", "8900000000482", "Scanner Salt", 20.0)], ["TEST-048-1", "TEST-048-2"])
+    session = CheckoutEngine(None, catalog=catalog).open_session()
+
+    clock = [0.0]
+    timers = []
+    redraws = []
+    typed = []
+
+    def run_due(until):
+        while timers and min(timers)[0] <= until:
+            timers.sort(key=lambda timer: timer[0])
+            due, function = timers.pop(0)
+            clock[0] = max(clock[0], due)
+            function()
+        clock[0] = until
+
+    def add_code(code):
+        try:
+            session.add_product(code)
+            return True
+        except Exception:
+            return False
+
+    scan_input = ScanInput(add_code, lambda: redraws.append(len(session.cart)), typed.append,
+                           lambda delay, function: timers.append((clock[0] + delay, function)),
+                           max_gap_ms=30, frame_ms=16, clock=lambda: clock[0])
+
+    # The first scan is drawn as soon as the UI thread is free
+    for char, time_ms in keys("8900000000481\n", 0, 2):
+        clock[0] = time_ms
+        scan_input.key(char, time_ms)
+    run_due(30)
+    assert redraws == [1]
+
+    # Three more within one frame (keys queued behind a busy handler) are drawn together
+    clock[0] = 40
+    for char, time_ms in keys("8900000000482\n8900000000481\n0000000000000\nTEST-048-2\n", 32, 0.1):
+        scan_input.key(char, time_ms)
+    run_due(100)
+    assert redraws == [1, 4]
+    assert [item["sku"] for item in session.cart] == ["TEST-048-1", "TEST-048-2", "TEST-048-1", "TEST-048-2"]
+    assert scan_input.scans == 5 and scan_input.rejected == 1
+
+    # Keys typed by hand are handed back once it is clear they are not a scan
+    for char, time_ms in keys("tea", 200, 150):
+        run_due(time_ms)
+        scan_input.key(char, time_ms)
+    run_due(700)
+    assert "".join(typed) == "tea" and redraws == [1, 4]
+
+if __name__ == "__main__":
+    test_scans_and_typing()
+    test_scan_input_coalesces_redraws()
+    print("\nScanner test completed!")
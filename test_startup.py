@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test script for fast startup: deferred imports and skipping DDL on a current schema
+"""
+
+import sys
+import os
+import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_metrics import QueryMetrics
+from models import Database, SCHEMA_VERSION
+from config import DB_CONFIG
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def test_no_ddl_when_schema_is_current():
+    """A second setup_database only checks the schema version"""
+    db = Database(DB_CONFIG)
+    db.setup_database(force=True)
+    assert db.schema_is_current()
+
+    metrics = QueryMetrics()
+    db.enable_metrics(metrics)
+    db.setup_database()
+    statements = metrics.snapshot()["execute"]["calls"]
+    print(f"  current schema: {statements} statements")
+    assert statements <= 2
+
+    # An older schema is upgraded
+    db.cursor.execute("UPDATE schema_info SET version = %s", (SCHEMA_VERSION - 1,))
+    db.conn.commit()
+    assert not db.schema_is_current()
+    db.setup_database()
+    assert db.schema_is_current()
+    db.close()
+
+def test_startup_imports():
+    """Launching the application does not import psycopg2 or the mail modules"""
+    code = "import sys, main; print(' '.join(m for m in ('psycopg2', 'models', 'smtplib', 'email.mime.text') if m in sys.modules))"
+    loaded = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == "", loaded
+
+if __name__ == "__main__":
+    test_no_ddl_when_schema_is_current()
+    test_startup_imports()
+    print("\nStartup test completed!")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming top-selling items tracker, validated against SQL
+"""
+
+import sys
+import os
+import random
+import tempfile
+from collections import Counter
+from datetime import date, datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from checkout import CheckoutEngine
+from db_pool import DatabasePool
+from models import Database, TOP_ITEMS_SQL
+from partitions import archive_partitions
+from top_items import SpaceSaving, TopItemsTracker, store_top_items
+from config import DB_CONFIG
+
+# A day far in the past so the test never touches real sales
+DAY = datetime(2006, 1, 10)
+SOURCES = ("test-lane-1", "test-lane-2")
+
+def synthetic_lines(count, items=60, seed=44):
+    """(created_at, name, quantity) lines through DAY with Zipf-like item popularity"""
+    rng = random.Random(seed)
+    names = [f"Item {n:02d}" for n in range(items)]
+    weights = [1 / (rank + 1) ** 1.2 for rank in range(items)]
+    return [
+        (DAY + timedelta(seconds=rng.randint(0, 86399)), rng.choices(names, weights)[0], rng.randint(1, 3))
+        for _ in range(count)
+    ]
+
+def test_space_saving_bounds():
+    """Every count is an upper bound within total / capacity, and heavy hitters are kept"""
+    sketch = SpaceSaving(capacity=20)
+    exact = Counter()
+    for _, name, quantity in synthetic_lines(5000):
+        sketch.add(name, quantity)
+        exact[name] += quantity
+
+    bound = sketch.total / sketch.capacity
+    for name, count, error in sketch.top(20):
+        assert exact[name] <= count <= exact[name] + error and error <= bound
+    assert [name for name, _, _ in sketch.top(5)] == [name for name, _ in exact.most_common(5)]
+
+def test_tracker_matches_sql():
+    """The day's top items from the tracker, checkpointed and merged across tills, agree with SQL"""
+    db = Database(DB_CONFIG)
+    db.setup_database()
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2006, 2, 1), directory, drop=True)
+    db.ensure_invoice_partitions(date(2006, 1, 1), date(2006, 1, 1))
+    db.cursor.execute("DELETE FROM item_sketches WHERE source = ANY(%s)", (list(SOURCES),))
+    db.conn.commit()
+
+    lines = sorted(synthetic_lines(3000))
+    db.cursor.execute("""
+        INSERT INTO invoices (total_amount, discount_amount, final_amount, created_at)
+        VALUES (1, 0, 1, %s) RETURNING id
+    """, (DAY,))
+    invoice_id = db.cursor.fetchone()[0]
+    for created_at, name, quantity in lines:
+        db.cursor.execute("""
+            INSERT INTO invoice_items (invoice_id, item_name, quantity, price, total, created_at)
+            VALUES (%s, %s, %s, 1, %s, %s)
+        """, (invoice_id, name, quantity, quantity, DAY))
+    db.conn.commit()
+    db.cursor.execute(TOP_ITEMS_SQL, (DAY, DAY + timedelta(days=1)))
+    expected = [(name, quantity) for name, quantity, _ in db.cursor.fetchall()]
+    db.conn.commit()
+
+    # Two tills each see half of the checkouts
+    trackers = [TopItemsTracker(capacity=25, source=source) for source in SOURCES]
+    for index, (created_at, name, quantity) in enumerate(lines):
+        trackers[index % 2].record([{"name": name, "quantity": quantity}], created_at)
+    end_of_day = DAY + timedelta(hours=23, minutes=59)
+    for tracker in trackers:
+        assert tracker.checkpoint(db)
+
+    merged = store_top_items(db, 5, "day", now=end_of_day, capacity=25)
+    assert [row["name"] for row in merged] == [name for name, _ in expected]
+    for row, (_, quantity) in zip(merged, expected):
+        assert quantity <= row["quantity"] <= quantity + row["error"]
+    assert merged[0]["guaranteed"]
+
+    # The last hour only holds that hour's lines
+    last_hour = Counter()
+    for created_at, name, quantity in lines:
+        if created_at.hour == 23:
+            last_hour[name] += quantity
+    hour_top = trackers[0].top(3, "hour", now=end_of_day)
+    assert all(row["quantity"] <= last_hour[row["name"]] for row in hour_top)
+
+    # A restarted till picks up its checkpoint
+    restored = TopItemsTracker(capacity=25, source=SOURCES[0])
+    restored.restore(db, now=end_of_day)
+    assert restored.top(5, now=end_of_day) == trackers[0].top(5, now=end_of_day)
+
+    db.cursor.execute("DELETE FROM item_sketches WHERE source = ANY(%s)", (list(SOURCES),))
+    db.conn.commit()
+    with tempfile.TemporaryDirectory() as directory:
+        archive_partitions(db, date(2006, 2, 1), directory, drop=True)
+    db.close()
+
+def test_checkout_updates_tracker():
+    """Every checkout's items are counted as it is recorded"""
+    pool = DatabasePool(DB_CONFIG, max_connections=2)
+    pool.setup_database()
+    tracker = TopItemsTracker(source="test-engine")
+    engine = CheckoutEngine(pool, top_items=tracker)
+    for quantity in (2, 3):
+        session = engine.open_session()
+        session.add_item("Tracker Tea", quantity, 10)
+        session.add_item("Tracker Milk", 1, 50)
+        session.checkout()
+
+    assert tracker.top(2) == tracker.top(2, "hour") == [
+        {"name": "Tracker Tea", "quantity": 5, "error": 0, "guaranteed": True},
+        {"name": "Tracker Milk", "quantity": 2, "error": 0, "guaranteed": True}
+    ]
+    pool.close()
+
+if __name__ == "__main__":
+    test_space_saving_bounds()
+    test_tracker_matches_sql()
+    test_checkout_updates_tracker()
+    print("\nTop items test completed!")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# tier_recompute.py - Batch job recomputing every customer's persisted reward tier with NumPy
+
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from copy_arrays import binary_row_dtype, copy_to_array
+from models import Database
+
+# Balances include ledger entries not yet folded into customers.points
+BALANCES_COPY = """
+    COPY (
+        SELECT c.id, (c.points + COALESCE(l.delta, 0))::integer, COALESCE(array_position({names}, c.tier), 0)
+        FROM customers c
+        LEFT JOIN (
+            SELECT customer_id, SUM(delta) AS delta FROM points_ledger WHERE NOT folded GROUP BY customer_id
+        ) l ON l.customer_id = c.id
+    ) TO STDOUT WITH (FORMAT binary)
+"""
+
+BALANCE_ROW = binary_row_dtype([("id", ">i4"), ("balance", ">i4"), ("tier", ">i4")])
+
+# One UPDATE ... FROM (VALUES ...) per page of changed customers, in id order: a single
+# statement carrying millions of rows exhausts the server's memory while it is parsed.
+# The id range lets each page read its slice of the primary key instead of the whole table.
+# Each page commits on its own, so checkouts accruing points for its customers only wait
+# for that page.
+DEFAULT_PAGE_SIZE = 50000
+UPDATE_TIERS = """
+    UPDATE customers c SET tier = v.tier
+    FROM (VALUES %s) AS v (id, tier)
+    WHERE c.id = v.id AND c.id BETWEEN {first} AND {last}
+"""
+
+
+def compute_tiers(balances, minimums):
+    """Vectorized tier codes: 1 + index into minimums (ascending) of each balance's tier
+
+    Balances below the lowest minimum get the lowest tier, as in
+    RewardSystem.get_reward_tier.
+    """
+    if not len(minimums):
+        raise ValueError("There are no reward tiers")
+    if np.any(np.diff(minimums) < 0):
+        raise ValueError("Reward tier minimums must be in ascending order")
+    return np.maximum(np.searchsorted(minimums, balances, side="right"), 1).astype(np.int32)
+
+
+def load_tiers(db):
+    """(names, minimums) of reward_tiers, lowest tier first, read on db's own connection
+
+    Not Database.get_reward_tiers: that may read a replica, and returns an
+    empty list on error.
+    """
+    db.cursor.execute("SELECT name, min_points FROM reward_tiers")
+    tiers = sorted(db.cursor.fetchall(), key=lambda tier: (tier[1], tier[0]))
+    db.conn.commit()
+    if not tiers:
+        raise RuntimeError("reward_tiers is empty; run setup_database first")
+    return [name for name, _ in tiers], np.array([minimum for _, minimum in tiers], dtype=np.int64)
+
+
+def load_balances(db, names):
+    """Load (ids, balances, current tier codes) as NumPy arrays with one binary COPY
+
+    A tier code is 1 + the index of the tier in names, or 0 if none is stored.
+    """
+    names_sql = db.cursor.mogrify("%s::text[]", (list(names),)).decode()
+    rows = copy_to_array(db.cursor, BALANCES_COPY.format(names=names_sql), BALANCE_ROW)
+    return rows["id"].astype(np.int32), rows["balance"].astype(np.int32), rows["tier"].astype(np.int32)
+
+
+def recompute_tiers(db, page_size=DEFAULT_PAGE_SIZE):
+    """Recompute every customer's tier and write back the ones that changed
+
+    Points are loaded with one binary COPY, tiers are computed with one
+    vectorized pass over thresholds read from reward_tiers, and changed tiers
+    are written with one UPDATE ... FROM (VALUES ...) per page_size rows,
+    each committed on its own. Only one recompute runs at a time. Returns
+    timings and counts, or None if another recompute holds the lock.
+    """
+    names, minimums = load_tiers(db)
+    stats = {}
+
+    # A session lock, as the recompute spans many transactions
+    db.cursor.execute("SELECT pg_try_advisory_lock(hashtext('reward_tier_recompute'))")
+    locked = db.cursor.fetchone()[0]
+    db.conn.commit()
+    if not locked:
+        return None
+
+    try:
+        start = time.perf_counter()
+        ids, balances, current = load_balances(db, names)
+        db.conn.commit()
+        stats["load_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        codes = compute_tiers(balances, minimums)
+        changed = np.flatnonzero(codes != current)
+        stats["compute_seconds"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        changed = changed[np.argsort(ids[changed], kind="stable")]
+        tier_names = np.array(names, dtype=object)
+        for page in range(0, len(changed), page_size):
+            rows = changed[page:page + page_size]
+            page_ids = ids[rows]
+            query = UPDATE_TIERS.format(first=int(page_ids[0]), last=int(page_ids[-1]))
+            execute_values(db.cursor, query, list(zip(page_ids.tolist(), tier_names[codes[rows] - 1].tolist())),
+                           page_size=len(rows))
+            db.conn.commit()
+        stats["write_seconds"] = time.perf_counter() - start
+
+    except Exception as e:
+        db.conn.rollback()
+        print(f"Database error: {e}")
+        raise
+
+    finally:
+        db.cursor.execute("SELECT pg_advisory_unlock(hashtext('reward_tier_recompute'))")
+        db.conn.commit()
+
+    stats["customers"] = len(ids)
+    stats["changed"] = len(changed)
+    counts = np.bincount(codes, minlength=len(names) + 1)[1:]
+    stats["distribution"] = {name: int(count) for name, count in zip(names, counts)}
+    return stats
+
+
+def main():
+    from config import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Recompute and store every customer's reward tier")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Rows per UPDATE statement")
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    db.setup_database()
+
+    try:
+        stats = recompute_tiers(db, args.page_size)
+        if stats is None:
+            print("Another tier recompute is running")
+            return
+        print(f"{stats['customers']} customers, {stats['changed']} tiers changed "
+              f"(load {stats['load_seconds']:.2f}s, compute {stats['compute_seconds']:.3f}s, "
+              f"write {stats['write_seconds']:.2f}s)")
+        for name, count in stats["distribution"].items():
+            print(f"  {name:<8} {count}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# top_items.py - Streaming top-selling items per hour and per day (Space-Saving sketch)
+
+import argparse
+import heapq
+import os
+import socket
+import sys
+import threading
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Counters per sketch. A count overestimates an item's quantity by at most
+# total quantity / capacity, and no item is missed if its true share exceeds that
+DEFAULT_CAPACITY = 200
+WINDOWS = ("hour", "day")
+
+
+def window_start(window, when):
+    """Start of the hour or day containing when"""
+    if window == "hour":
+        return when.replace(minute=0, second=0, microsecond=0)
+    if window == "day":
+        return when.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown window: {window}")
+
+
+class SpaceSaving:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """Space-Saving heavy hitters sketch over weighted items
+
+        At most capacity items are counted. An item that is not counted
+        takes over the smallest counter, inheriting its count as error, so
+        every count is an upper bound: true <= count <= true + error, and
+        error never exceeds total / capacity. Adding is O(log capacity) and
+        top(n) reads only the counters, whatever the length of the stream.
+        """
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+        self.total = 0
+        self._heap = []  # (count, item) entries, stale ones skipped when found
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[item] = [0, 0]
+            else:
+                minimum, evicted = self._pop_minimum()
+                del self.counters[evicted]
+                counter = self.counters[item] = [minimum, minimum]
+        counter[0] += weight
+        heapq.heappush(self._heap, (counter[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, name) for name, (count, _) in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_minimum(self):
+        """Remove and return the smallest current (count, item)"""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+
+    def minimum(self):
+        """Largest count an item that is not counted can have"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def top(self, n):
+        """The n largest counters as (item, count, error), largest first"""
+        best = heapq.nsmallest(n, self.counters.items(), key=lambda entry: (-entry[1][0], entry[0]))
+        return [(item, count, error) for item, (count, error) in best]
+
+    def merge(self, other):
+        """Add another sketch's counts (e.g. another till's) into this one
+
+        An item missing from one full sketch may have up to that sketch's
+        minimum there, which is added to its count and error; the largest
+        capacity counters are kept.
+        """
+        floors = (self.minimum(), other.minimum())
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count = error = 0
+            for counters, floor in ((self.counters, floors[0]), (other.counters, floors[1])):
+                counter = counters.get(item)
+                if counter is None:
+                    count, error = count + floor, error + floor
+                else:
+                    count, error = count + counter[0], error + counter[1]
+            merged[item] = [count, error]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: entry[1][0])
+        self.counters = {item: counter for item, counter in kept}
+        self.total += other.total
+        self._heap = [(count, item) for item, (count, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def to_dict(self):
+        return {"total": self.total, "counters": {item: list(counter) for item, counter in self.counters.items()}}
+
+    @classmethod
+    def from_dict(cls, data, capacity=DEFAULT_CAPACITY):
+        sketch = cls(capacity)
+        sketch.total = data["total"]
+        sketch.counters = {item: list(counter) for item, counter in data["counters"].items()}
+        sketch._heap = [(count, item) for item, (count, _) in sketch.counters.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
+
+
+def top_rows(sketch, n):
+    """A sketch's top n as report rows; guaranteed means the item is certainly among the top n"""
+    best = sketch.top(n + 1)
+    threshold = best[n][1] if len(best) > n else sketch.minimum()
+    return [
+        {"name": item, "quantity": count, "error": error, "guaranteed": count - error >= threshold}
+        for item, count, error in best[:n]
+    ]
+
+
+class TopItemsTracker:
+    def __init__(self, capacity=DEFAULT_CAPACITY, source=None):
+        """Top-selling items of the current hour and day, updated on every checkout
+
+        One Space-Saving sketch per window is kept in memory and replaced
+        when its hour or day ends. checkpoint() upserts the current sketches
+        into item_sketches under source (one row per till or service,
+        defaulting to the host name) and restore() reloads them after a
+        restart. store_top_items merges every source's checkpoints.
+        """
+        self.capacity = capacity
+        self.source = source or socket.gethostname()
+        self.windows = {}  # window -> (start, SpaceSaving)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sketch(self, window, when):
+        """The sketch of window containing when, starting a new one when the window has moved on"""
+        start = window_start(window, when)
+        current = self.windows.get(window)
+        if current is None or current[0] < start:
+            current = self.windows[window] = (start, SpaceSaving(self.capacity))
+        return current[0], current[1]
+
+    def record(self, items, when=None):
+        """Count a checkout's cart items (dicts with name and quantity)"""
+        when = when or datetime.now()
+        with self._lock:
+            for window in WINDOWS:
+                start, sketch = self._sketch(window, when)
+                if start == window_start(window, when):
+                    for item in items:
+                        sketch.add(item["name"], item["quantity"])
+
+    def top(self, n=5, window="day", now=None):
+        """Top n items by quantity in the current hour or day
+
+        Rows have the estimated quantity, its maximum overestimate (error)
+        and whether the item is certainly in the top n.
+        """
+        with self._lock:
+            start, sketch = self._sketch(window, now or datetime.now())
+            return top_rows(sketch, n)
+
+    def checkpoint(self, db):
+        """Save the sketches to the database (a window that has just ended is saved in full)"""
+        with self._lock:
+            rows = [(window, start, sketch.to_dict()) for window, (start, sketch) in self.windows.items()]
+        return db.save_item_sketches(self.source, rows) if rows else True
+
+    def restore(self, db, now=None):
+        """Reload this source's checkpoints of the current windows"""
+        now = now or datetime.now()
+        for window in WINDOWS:
+            start = window_start(window, now)
+            for row in db.get_item_sketches(window, start):
+                if row["source"] == self.source:
+                    with self._lock:
+                        self.windows[window] = (start, SpaceSaving.from_dict(row["sketch"], self.capacity))
+
+    def start(self, db, interval=30.0):
+        """Checkpoint every interval seconds on a daemon thread"""
+        self._thread = threading.Thread(target=self.run_forever, args=(db, interval), name="top-items", daemon=True)
+        self._thread.start()
+
+    def stop(self, db=None, wait=True):
+        """Stop the checkpoint thread, then write a last checkpoint if db is given"""
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+        if db is not None:
+            self.checkpoint(db)
+
+    def run_forever(self, db, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.checkpoint(db)
+            except Exception as e:
+                print(f"Top items checkpoint error: {e}")
+
+
+def store_top_items(db, n=5, window="day", now=None, capacity=DEFAULT_CAPACITY):
+    """Top n items of the current hour or day across every source's last checkpoint"""
+    merged = SpaceSaving(capacity)
+    for row in db.get_item_sketches(window, window_start(window, now or datetime.now())):
+        merged.merge(SpaceSaving.from_dict(row["sketch"], capacity))
+    return top_rows(merged, n)
+
+
+def main():
+    from config import DB_CONFIG
+    from models import Database
+
+    parser = argparse.ArgumentParser(description="Top-selling items of this hour or today from the checkpoints")
+    parser.add_argument("--database", help="Database name (defaults to DB_CONFIG)")
+    parser.add_argument("--window", choices=WINDOWS, default="day")
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    db_config = dict(DB_CONFIG)
+    if args.database:
+        db_config["database"] = args.database
+    db = Database(db_config)
+    try:
+        for row in store_top_items(db, args.top, args.window):
+            print(f"{row['name']:<30} {row['quantity']:>8} (+/- {row['error']})"
+                  f"{'' if row['guaranteed'] else '  not certain'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,28 @@ class ShoppingCartUI:
         )
         self.title_label.pack(pady=(0, 20))
         
+        # Busy indicator shown while database calls run in the background
+        self.busy_var = tk.StringVar()
+        self.busy_label = tk.Label(
+            self.main_frame,
+            textvariable=self.busy_var,
+            font=self.normal_font,
+            bg="#f0f0f0",
+            fg="#2196F3"
+        )
+        self.busy_label.pack(side="bottom", anchor="e")
+
+        # Local journal sync lag (only shown when checkouts are journaled)
+        self.sync_var = tk.StringVar()
+        self.sync_label = tk.Label(
+            self.main_frame,
+            textvariable=self.sync_var,
+            font=self.normal_font,
+            bg="#f0f0f0",
+            fg="#666666"
+        )
+        self.sync_label.pack(side="bottom", anchor="e")
+        
         # Create tab control
         self.tab_control = ttk.Notebook(self.main_frame)
         
@@ -44,20 +66,37 @@ class ShoppingCartUI:
         self.view_tab = tk.Frame(self.tab_control, bg="#f0f0f0")
         self.bill_tab = tk.Frame(self.tab_control, bg="#f0f0f0")
         self.history_tab = tk.Frame(self.tab_control, bg="#f0f0f0")
+        self.dashboard_tab = tk.Frame(self.tab_control, bg="#f0f0f0")
 
         # Add tabs to notebook
         self.tab_control.add(self.add_tab, text="Add Item")
         self.tab_control.add(self.view_tab, text="View Cart")
         self.tab_control.add(self.bill_tab, text="Bill")
         self.tab_control.add(self.history_tab, text="Invoice History")
+        self.tab_control.add(self.dashboard_tab, text="Dashboard")
 
         self.tab_control.pack(expand=1, fill="both")
 
-        # Setup tabs
-        self.setup_add_tab()
-        self.setup_view_tab()
-        self.setup_bill_tab()
-        self.setup_history_tab()
+        # Setup tabs: only the first before the window appears, the rest when first selected
+        self._tab_builders = {
+            str(self.add_tab): self.setup_add_tab,
+            str(self.view_tab): self.setup_view_tab,
+            str(self.bill_tab): self.setup_bill_tab,
+            str(self.history_tab): self.setup_history_tab,
+            str(self.dashboard_tab): self.setup_dashboard_tab
+        }
+        self.build_tab(self.add_tab)
+        self.tab_control.bind("<<NotebookTabChanged>>", lambda event: self.build_tab(self.tab_control.select()))
+    
+    def build_tab(self, tab):
+        """Build a tab's widgets unless they have been built already"""
+        builder = self._tab_builders.pop(str(tab), None)
+        if builder:
+            builder()
+    
+    def is_built(self, tab):
+        """Return True once a tab's widgets exist"""
+        return str(tab) not in self._tab_builders
     
     def setup_add_tab(self):
         """Setup the add item tab"""
@@ -69,9 +108,10 @@ class ShoppingCartUI:
         name_frame = tk.Frame(add_frame, bg="#f0f0f0")
         name_frame.pack(fill="x", pady=5)
         
-        tk.Label(name_frame, text="Item Name:", font=self.normal_font, bg="#f0f0f0", width=15, anchor="w").pack(side="left")
+        tk.Label(name_frame, text="Item / Barcode:", font=self.normal_font, bg="#f0f0f0", width=15, anchor="w").pack(side="left")
         self.name_var = tk.StringVar()
-        tk.Entry(name_frame, textvariable=self.name_var, font=self.normal_font, width=30).pack(side="left", padx=5)
+        self.name_entry = tk.Entry(name_frame, textvariable=self.name_var, font=self.normal_font, width=30)
+        self.name_entry.pack(side="left", padx=5)
         
         # Item quantity
         quantity_frame = tk.Frame(add_frame, bg="#f0f0f0")
@@ -79,7 +119,8 @@ class ShoppingCartUI:
         
         tk.Label(quantity_frame, text="Quantity:", font=self.normal_font, bg="#f0f0f0", width=15, anchor="w").pack(side="left")
         self.quantity_var = tk.StringVar()
-        tk.Entry(quantity_frame, textvariable=self.quantity_var, font=self.normal_font, width=30).pack(side="left", padx=5)
+        self.quantity_entry = tk.Entry(quantity_frame, textvariable=self.quantity_var, font=self.normal_font, width=30)
+        self.quantity_entry.pack(side="left", padx=5)
         
         # Item price
         price_frame = tk.Frame(add_frame, bg="#f0f0f0")
@@ -87,7 +128,8 @@ class ShoppingCartUI:
         
         tk.Label(price_frame, text="Price (₹):", font=self.normal_font, bg="#f0f0f0", width=15, anchor="w").pack(side="left")
         self.price_var = tk.StringVar()
-        tk.Entry(price_frame, textvariable=self.price_var, font=self.normal_font, width=30).pack(side="left", padx=5)
+        self.price_entry = tk.Entry(price_frame, textvariable=self.price_var, font=self.normal_font, width=30)
+        self.price_entry.pack(side="left", padx=5)
         
         # Add button
         add_button = tk.Button(
@@ -146,6 +188,9 @@ class ShoppingCartUI:
             pady=5
         )
         reset_button.pack(side="left", padx=10)
+        
+        # Show items added before the tab was first opened
+        self.update_cart_view(self.controller.session.cart)
     
     def setup_bill_tab(self):
         """Setup the bill tab"""
@@ -313,6 +358,52 @@ class ShoppingCartUI:
         self.invoice_details_text = tk.Text(details_frame, height=10, width=70, font=self.normal_font)
         self.invoice_details_text.pack(fill="both", expand=True, pady=5)
     
+    
+    def setup_dashboard_tab(self):
+        """Setup the live sales dashboard tab"""
+        # Create frame for the dashboard
+        dashboard_frame = tk.Frame(self.dashboard_tab, bg="#f0f0f0", padx=20, pady=20)
+        dashboard_frame.pack(fill=tk.BOTH, expand=True)
+        
+        tk.Label(dashboard_frame, text="Live Sales", font=self.header_font, bg="#f0f0f0").grid(
+            row=0, column=0, sticky="w", pady=(0, 10)
+        )
+        
+        # One row per counter, one column per window
+        windows = (("hour", "This Hour"), ("today", "Today"))
+        rows = (("invoices", "Invoices"), ("gross", "Gross Sales"), ("discount", "Discounts"),
+                ("net", "Net Sales"), ("average_basket", "Average Basket"))
+        for column, (_, title) in enumerate(windows, start=1):
+            tk.Label(dashboard_frame, text=title, font=self.header_font, bg="#f0f0f0", width=15).grid(
+                row=0, column=column, pady=(0, 10)
+            )
+        
+        self.dashboard_vars = {}
+        for row, (field, label) in enumerate(rows, start=1):
+            tk.Label(dashboard_frame, text=f"{label}:", font=self.normal_font, bg="#f0f0f0").grid(
+                row=row, column=0, sticky="w", pady=2
+            )
+            for column, (window, _) in enumerate(windows, start=1):
+                var = self.dashboard_vars[(window, field)] = tk.StringVar(value="-")
+                tk.Label(dashboard_frame, textvariable=var, font=self.normal_font, bg="#f0f0f0").grid(
+                    row=row, column=column, sticky="e", pady=2
+                )
+        
+        # When the counters were last checked against the server
+        self.dashboard_status_var = tk.StringVar(value="Not yet reconciled with the server")
+        tk.Label(dashboard_frame, textvariable=self.dashboard_status_var, font=self.normal_font,
+                 bg="#f0f0f0", fg="#666666").grid(row=len(rows) + 1, column=0, columnspan=3, sticky="w", pady=(10, 0))
+    
+    def update_dashboard(self, snapshot, reconciled_at=None):
+        """Update the dashboard counters from a SalesCounters snapshot"""
+        if not self.is_built(self.dashboard_tab):
+            return
+        
+        for (window, field), var in self.dashboard_vars.items():
+            value = snapshot[window][field]
+            var.set(str(value) if field == "invoices" else PriceFormatter.format_price(value))
+        if reconciled_at:
+            self.dashboard_status_var.set(f"Reconciled with the server at {reconciled_at:%H:%M:%S}")
             
     def show_customer_info_dialog(self):
         """Show dialog to add customer info from bill tab"""
@@ -577,6 +668,9 @@ class ShoppingCartUI:
     
     def update_cart_view(self, cart):
         """Update the cart view"""
+        if not self.is_built(self.view_tab):
+            return  # Filled in when the tab is first opened
+        
         # Clear existing items
         for item in self.cart_tree.get_children():
             self.cart_tree.delete(item)
@@ -592,8 +686,39 @@ class ShoppingCartUI:
                 )
             )
     
+    def append_cart_view(self, cart):
+        """Add the cart's new items to the end of the cart view (a full redraw if items were removed)"""
+        if not self.is_built(self.view_tab):
+            return
+        shown = len(self.cart_tree.get_children())
+        if shown > len(cart):
+            self.update_cart_view(cart)
+            return
+        for item in cart[shown:]:
+            self.cart_tree.insert(
+                "", "end", values=(
+                    item['name'],
+                    item['quantity'],
+                    PriceFormatter.format_price(item['price']),
+                    PriceFormatter.format_price(item['total'])
+                )
+            )
+    
+    def enable_scanner(self, on_key):
+        """Send key presses in the Add Item fields to on_key before the fields handle them
+
+        on_key returns "break" for keys it takes (see scanner.ScanInput).
+        """
+        self.root.bind_class("Scanner", "<KeyPress>", on_key)
+        for entry in (self.name_entry, self.quantity_entry, self.price_entry):
+            entry.bindtags(("Scanner",) + entry.bindtags())
+        self.name_entry.focus_set()
+    
     def update_bill_view(self, bill_text):
         """Update the bill view"""
+        if not self.is_built(self.bill_tab):
+            return
+        
         # Clear previous bill
         self.bill_text.delete(1.0, tk.END)
         
@@ -692,6 +817,16 @@ class ShoppingCartUI:
         for item in report_data['top_items']:
             self.report_text.insert(tk.END, f"{item['name']:<30} {item['quantity']:<10} {PriceFormatter.format_price(item['sales']):<10}\n")
     
+    def set_busy(self, busy):
+        """Show or hide the busy indicator"""
+        self.busy_var.set("Working..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+    
+    def set_sync_status(self, text, lagging=False):
+        """Show the local journal sync status"""
+        self.sync_var.set(text)
+        self.sync_label.config(fg="#F44336" if lagging else "#666666")
+    
     def show_message(self, title, message, error=False):
         """Show a message dialog"""
         if error:
@@ -707,8 +842,9 @@ class ShoppingCartUI:
         """Update name suggestions for autocomplete"""
         current_text = combobox.get()
         if len(current_text) >= 2:  # Start suggesting after 2 characters
-            suggestions = self.controller.get_customer_name_suggestions(current_text)
-            combobox['values'] = suggestions
+            self.controller.get_customer_name_suggestions(
+                current_text, lambda suggestions: self.set_suggestions(combobox, current_text, suggestions)
+            )
         else:
             combobox['values'] = []
 
@@ -716,7 +852,13 @@ class ShoppingCartUI:
         """Update mobile suggestions for autocomplete"""
         current_text = combobox.get()
         if len(current_text) >= 3:  # Start suggesting after 3 characters
-            suggestions = self.controller.get_customer_mobile_suggestions(current_text)
-            combobox['values'] = suggestions
+            self.controller.get_customer_mobile_suggestions(
+                current_text, lambda suggestions: self.set_suggestions(combobox, current_text, suggestions)
+            )
         else:
-            combobox['values'] = []
\ No newline at end of file
+            combobox['values'] = []
+
+    def set_suggestions(self, combobox, prefix, suggestions):
+        """Apply autocomplete suggestions unless the user has typed on since they were requested"""
+        if combobox.winfo_exists() and combobox.get() == prefix:
+            combobox['values'] = suggestions
\ No newline at end of file
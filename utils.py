@@ -1,6 +1,9 @@
 # utils.py - Utility functions for the shopping cart application
 
 import re
+import threading
+import zlib
+from collections import OrderedDict
 from datetime import datetime
 
 class Validator:
@@ -44,30 +47,54 @@ class Validator:
 
 
 class RewardSystem:
+    # Reward tiers from highest to lowest: (tier, minimum points, discount)
+    TIERS = (
+        ("Gold", 1000, 0.15),    # 15% discount
+        ("Silver", 500, 0.10),   # 10% discount
+        ("Bronze", 0, 0.05),     # 5% discount
+    )
+    POINTS_PER_100 = 10
+
     @staticmethod
     def calculate_points(amount):
         """Calculate reward points (10 points per ₹100)"""
-        return int(amount / 100) * 10
+        return int(amount / 100) * RewardSystem.POINTS_PER_100
     
     @staticmethod
     def get_reward_tier(points):
         """Get reward tier based on points"""
-        if points >= 1000:
-            return "Gold"
-        elif points >= 500:
-            return "Silver"
-        else:
-            return "Bronze"
+        for tier, minimum, discount in RewardSystem.TIERS:
+            if points >= minimum:
+                return tier
+        return RewardSystem.TIERS[-1][0]
     
     @staticmethod
     def get_discount_percentage(tier):
         """Get discount percentage based on tier"""
-        if tier == "Gold":
-            return 0.15  # 15% discount
-        elif tier == "Silver":
-            return 0.10  # 10% discount
-        else:
-            return 0.05  # 5% discount
+        for name, minimum, discount in RewardSystem.TIERS:
+            if name == tier:
+                return discount
+        return RewardSystem.TIERS[-1][2]
+
+    @staticmethod
+    def get_tier_for_discount(subtotal, discount):
+        """Get the reward tier whose discount was applied to a stored invoice"""
+        if not subtotal or not discount or discount <= 0:
+            return "None"
+        rate = float(discount) / float(subtotal)
+        return min(RewardSystem.TIERS, key=lambda tier: abs(tier[2] - rate))[0]
+
+    @staticmethod
+    def tier_sql(column):
+        """SQL CASE expression giving the reward tier for a points column"""
+        cases = " ".join(f"WHEN {column} >= {minimum} THEN '{tier}'" for tier, minimum, _ in RewardSystem.TIERS[:-1])
+        return f"(CASE {cases} ELSE '{RewardSystem.TIERS[-1][0]}' END)"
+
+    @staticmethod
+    def discount_sql(column):
+        """SQL CASE expression giving the discount fraction for a points column"""
+        cases = " ".join(f"WHEN {column} >= {minimum} THEN {discount}" for _, minimum, discount in RewardSystem.TIERS[:-1])
+        return f"(CASE {cases} ELSE {RewardSystem.TIERS[-1][2]} END)"
 
 
 class PriceFormatter:
@@ -106,4 +133,55 @@ class PriceFormatter:
         if final is not None:
             bill += f"Final Amount: {PriceFormatter.format_price(final)}\n"
         
-        return bill
\ No newline at end of file
+        return bill
+
+
+class BillStorage:
+    # How invoice bill text is kept: as text, zlib-compressed, or not at all
+    # (re-rendered from the invoice items when needed)
+    MODES = ("text", "zlib", "none")
+
+    @staticmethod
+    def compress(bill):
+        """Compress bill text for storage"""
+        return zlib.compress(bill.encode("utf-8"), 6)
+
+    @staticmethod
+    def decompress(data):
+        """Restore bill text stored by compress"""
+        return zlib.decompress(bytes(data)).decode("utf-8")
+
+
+class RenderCache:
+    def __init__(self, maxsize=256):
+        """Thread-safe LRU cache of rendered bills keyed by invoice id"""
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a cached value or None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used one when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()